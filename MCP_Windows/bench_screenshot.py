@@ -0,0 +1,130 @@
+"""
+Microbenchmark of the take_screenshot encode path at 1080p, 1440p and 4K.
+Compares the old temp-file round trip (save JPEG to the temp directory, read it back,
+base64) with the in-memory path from screenshot_pipeline, then measures capture-to-base64
+latency (capture, downscale, grid, JPEG, base64) of each preset against the original
+full-range Lanczos + optimize pipeline. Frames are synthetic desktop-like images, so the
+benchmark runs without a display; --live captures the real screen with pyautogui instead
+(only at its native resolution).
+"""
+
+import argparse
+import base64
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from screenshot_pipeline import PRESETS, apply_grid, downscale, encode_jpeg, to_base64
+
+RESOLUTIONS = {"1080p": (1920, 1080), "1440p": (2560, 1440), "4K": (3840, 2160)}
+
+
+def synthetic_frame(width: int, height: int, seed: int = 1) -> Image.Image:
+    """Flat panels, text-like strokes and a noisy 'photo' area - roughly what a desktop compresses like."""
+    rng = random.Random(seed)
+    frame = Image.new("RGB", (width, height), (240, 240, 240))
+    draw = ImageDraw.Draw(frame)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(80, width // 3), rng.randrange(40, height // 3)
+        draw.rectangle([x, y, x + w, y + h], fill=tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(height // 6):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.text((x, y), "Lorem ipsum dolor sit amet 0123456789", fill=(20, 20, 20))
+    photo = Image.effect_noise((width // 4, height // 4), 64).convert("RGB")
+    frame.paste(photo, (width // 2, height // 2))
+    return frame
+
+
+def prepare(frame: Image.Image, max_width: int) -> Image.Image:
+    """Same resize as take_screenshot."""
+    if frame.width > max_width:
+        new_height = int(frame.height / (frame.width / max_width))
+        return frame.resize((max_width, new_height), Image.Resampling.LANCZOS)
+    return frame
+
+
+def via_temp_file(image: Image.Image, quality: int) -> str:
+    filepath = os.path.join(tempfile.gettempdir(), "bench_screenshot.jpg")
+    image.save(filepath, format='JPEG', optimize=True, quality=quality)
+    with open(filepath, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8')
+
+
+def in_memory(image: Image.Image, quality: int) -> str:
+    return to_base64(encode_jpeg(image, quality=quality))
+
+
+def capture_to_base64(grab, max_width: int, preset=None) -> str:
+    """take_screenshot with grid; preset=None is the original LANCZOS, quality 70, optimize=True path."""
+    frame = grab()
+    if frame.mode != 'RGB':
+        frame = frame.convert('RGB')
+    scale_factor = frame.width / max_width
+    size = (max_width, int(frame.height / scale_factor))
+    if preset is None:
+        image = frame.resize(size, Image.Resampling.LANCZOS)
+        return to_base64(encode_jpeg(apply_grid(image, 100, scale_factor), quality=70, optimize=True))
+    image = apply_grid(downscale(frame, size, preset), 100, scale_factor)
+    return to_base64(encode_jpeg(image, quality=preset.quality, optimize=preset.optimize))
+
+
+def measure(function, repeat: int) -> float:
+    """Median wall time in ms."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-width", type=int, default=1024, help="Resize target as in take_screenshot")
+    parser.add_argument("--quality", type=int, default=70)
+    parser.add_argument("--live", action="store_true", help="Capture the real screen with pyautogui")
+    args = parser.parse_args()
+
+    if args.live:
+        import pyautogui
+        frames = {"screen": pyautogui.screenshot}
+    else:
+        frames = {name: (lambda size=size: synthetic_frame(*size)) for name, size in RESOLUTIONS.items()}
+
+    print(f"{'frame':<8} {'size':>10} | {'resize':>8} | {'temp file':>10} | {'in memory':>10} | {'saved':>7} | {'base64 KB':>9}")
+    for name, grab in frames.items():
+        frame = grab()
+        if frame.mode != 'RGB':
+            frame = frame.convert('RGB')
+        resize_ms = measure(lambda: prepare(frame, args.max_width), args.repeat)
+        image = prepare(frame, args.max_width)
+        temp_ms = measure(lambda: via_temp_file(image, args.quality), args.repeat)
+        memory_ms = measure(lambda: in_memory(image, args.quality), args.repeat)
+        encoded = in_memory(image, args.quality)
+        assert encoded == via_temp_file(image, args.quality)
+        print(f"{name:<8} {frame.width:>5}x{frame.height:<4} | {resize_ms:6.1f}ms | {temp_ms:8.2f}ms | "
+              f"{memory_ms:8.2f}ms | {temp_ms - memory_ms:5.2f}ms | {len(encoded) / 1024:9.1f}")
+
+    print(f"\nCapture-to-base64 (max_width {args.max_width}, grid on), median ms / base64 KB")
+    pipelines = {"original": None, **PRESETS}
+    print(f"{'frame':<8} | " + " | ".join(f"{name:>16}" for name in pipelines))
+    for name, grab in frames.items():
+        # Syntetický snímek se vytvoří jednou, "zachycení" je jeho kopie
+        if not args.live:
+            grab = grab().copy
+        cells = []
+        for preset in pipelines.values():
+            ms = measure(lambda: capture_to_base64(grab, args.max_width, preset), args.repeat)
+            size_kb = len(capture_to_base64(grab, args.max_width, preset)) / 1024
+            cells.append(f"{ms:7.1f} / {size_kb:6.1f}")
+        print(f"{name:<8} | " + " | ".join(f"{cell:>16}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
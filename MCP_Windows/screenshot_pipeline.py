@@ -0,0 +1,271 @@
+"""
+Image helpers shared by the screenshot tools in windows_control.py.
+Frames are downscaled with a speed/quality preset and encoded to JPEG in memory and base64-encoded straight from the buffer;
+writing the file to disk is optional and never read back. Frame diffs compare
+tiles of consecutive captures so only changed screen regions need to be sent, and
+downscaled signatures let the wait tools poll the screen cheaply. The coordinate
+grid is rendered once per size and pasted onto each frame.
+"""
+
+import base64
+import functools
+import io
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+@dataclass(frozen=True)
+class ScreenshotPreset:
+    """
+    Speed/quality trade-off of the downscale and JPEG encode. `reducing_gap` limits the integer
+    box pre-shrink (Image.reduce): the frame is reduced by the largest factor that still leaves
+    at least this much scaling to the final `resample` filter (1.0 = shrink as far as possible).
+    """
+    resample: int
+    reducing_gap: float
+    quality: int
+    optimize: bool
+
+
+PRESETS = {
+    # Box pre-shrink + bilinear, no Huffman optimisation - for tight automation loops
+    "fast": ScreenshotPreset(Image.Resampling.BILINEAR, 1.0, 60, False),
+    # Box pre-shrink + Lanczos for the last < 2x step - text stays sharp at a fraction of the cost;
+    # optimize stays on, it costs ~2 ms and saves ~10 % of the base64 payload
+    "balanced": ScreenshotPreset(Image.Resampling.LANCZOS, 1.0, 70, True),
+    # Lanczos over (nearly) the whole range, higher quality, optimised JPEG - for reading small text
+    "detail": ScreenshotPreset(Image.Resampling.LANCZOS, 3.0, 85, True),
+}
+DEFAULT_PRESET = "balanced"
+
+
+def get_preset(name: str) -> ScreenshotPreset:
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset '{name}' (available: {', '.join(PRESETS)})")
+    return PRESETS[name]
+
+
+def downscale(image: Image.Image, size: tuple[int, int], preset: ScreenshotPreset) -> Image.Image:
+    """Integer box pre-shrink (cheap, already antialiased) followed by the preset's filter for the rest."""
+    factor = int(min(image.width / size[0], image.height / size[1]) / preset.reducing_gap)
+    if factor >= 2:
+        image = image.reduce(factor)
+    if image.size != size:
+        image = image.resize(size, preset.resample)
+    return image
+
+
+def encode_jpeg(image, quality: int, optimize: bool = True) -> bytes:
+    """Encodes a PIL image to JPEG bytes without touching the filesystem."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=optimize)
+    return buffer.getvalue()
+
+
+def to_base64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def screenshot_path(filename: str, default: str) -> str:
+    """Path in the temp directory for an opt-in copy on disk (always .jpg, no path components)."""
+    if not filename.endswith(('.jpg', '.jpeg')):
+        filename = filename.rsplit('.', 1)[0] + '.jpg'
+    if ".." in filename or "/" in filename or "\\" in filename:
+        filename = default
+    return os.path.join(tempfile.gettempdir(), filename)
+
+
+def save_jpeg(data: bytes, filename: str, default: str = "screenshot.jpg") -> str:
+    """Writes already encoded JPEG bytes to the temp directory and returns the path."""
+    filepath = screenshot_path(filename, default)
+    with open(filepath, "wb") as f:
+        f.write(data)
+    return filepath
+
+
+# --- Grid overlay ---
+GRID_COLOR = (255, 0, 0, 255)
+
+
+class GridOverlay:
+    """
+    Coordinate grid rendered once into a transparent RGBA layer. The layer is kept as its
+    non-empty pieces - 1 px line boxes (filled directly) and label sprites cropped from the
+    layer (pasted with their alpha) - because compositing the whole layer costs more than
+    the grid itself on large frames.
+    """
+
+    def __init__(self, size: tuple[int, int], step: int, scale_factor: float, label_every: int = 1):
+        self.size = width, height = size
+        layer = Image.new("RGBA", size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        self.lines = []
+        label_boxes = []
+        for index, x in enumerate(range(0, width, step)):
+            draw.line([(x, 0), (x, height)], fill=GRID_COLOR, width=1)
+            self.lines.append((x, 0, x + 1, height))
+            if index % label_every == 0:
+                label_boxes.append(self._label(draw, (x + 2, 2), int(x * scale_factor)))
+        for index, y in enumerate(range(0, height, step)):
+            draw.line([(0, y), (width, y)], fill=GRID_COLOR, width=1)
+            self.lines.append((0, y, width, y + 1))
+            if index % label_every == 0:
+                label_boxes.append(self._label(draw, (2, y + 2), int(y * scale_factor)))
+        # Výřezy až z hotové vrstvy - překrývající se popisky (0 v rohu) i čáry pod nimi sedí
+        self.labels = [(box[:2], layer.crop(box)) for box in label_boxes if box[2] > box[0] and box[3] > box[1]]
+
+    def _label(self, draw: ImageDraw.ImageDraw, xy: tuple[int, int], value: int) -> tuple[int, int, int, int]:
+        """Draws a label with the REAL coordinate and returns its box clipped to the layer."""
+        draw.text(xy, str(value), fill=GRID_COLOR)
+        left, top, right, bottom = draw.textbbox(xy, str(value))
+        width, height = self.size
+        return max(0, left), max(0, top), min(width, right), min(height, bottom)
+
+    def apply(self, image: Image.Image) -> Image.Image:
+        """Composites the grid onto an RGB frame of the same size, in place."""
+        for box in self.lines:
+            image.paste(GRID_COLOR[:3], box)
+        for xy, sprite in self.labels:
+            image.paste(sprite, xy, sprite)
+        return image
+
+
+@functools.lru_cache(maxsize=8)
+def grid_overlay(size: tuple[int, int], step: int, scale_factor: float, label_every: int = 1) -> GridOverlay:
+    """Grid for one (size, step, scale, label density) - depends only on these, so it is built once."""
+    return GridOverlay(size, step, scale_factor, label_every)
+
+
+def apply_grid(image: Image.Image, step: int, scale_factor: float, label_every: int = 1) -> Image.Image:
+    """Grid lines every `step` px of the scaled image, labels with REAL coordinates on every `label_every`-th line."""
+    return grid_overlay(image.size, step, scale_factor, label_every).apply(image)
+
+
+# --- Frame diff ---
+# Tile edge in screen pixels for change detection
+DIFF_TILE = 32
+# Per-channel difference ignored as noise (cursor blink antialiasing, subpixel text)
+DIFF_THRESHOLD = 8
+# Above this changed fraction a single full screenshot is cheaper than region crops
+FULL_FRAME_FRACTION = 0.5
+# More separate regions than this are merged into their bounding box
+MAX_DIFF_REGIONS = 8
+
+
+def changed_tiles(previous: np.ndarray, current: np.ndarray, tile: int, threshold: int) -> np.ndarray:
+    """Boolean (rows, cols) grid of tiles where any pixel channel differs by more than `threshold`."""
+    # |a - b| in uint8 without widening the whole frame to int16
+    changed = (np.maximum(previous, current) - np.minimum(previous, current)) > threshold
+    height, width, channels = changed.shape
+    # Channels stay interleaved in the row - a tile is `tile` rows x `tile * channels` values,
+    # which avoids a slow reduction over the short last axis
+    changed = changed.reshape(height, width * channels)
+    rows, cols = -(-height // tile), -(-width // tile)
+    if height % tile or width % tile:
+        padded = np.zeros((rows * tile, cols * tile * channels), dtype=bool)
+        padded[:height, :width * channels] = changed
+        changed = padded
+    return changed.reshape(rows, tile, cols, tile * channels).any(axis=(1, 3))
+
+
+def tile_rects(mask: np.ndarray, tile: int, width: int, height: int,
+               max_regions: int = MAX_DIFF_REGIONS) -> list[tuple[int, int, int, int]]:
+    """Connected groups of changed tiles as (x, y, width, height) rectangles in screen pixels."""
+    seen = np.zeros_like(mask)
+    boxes = []
+    for row, col in zip(*np.nonzero(mask)):
+        if seen[row, col]:
+            continue
+        seen[row, col] = True
+        stack = [(row, col)]
+        top, left, bottom, right = row, col, row, col
+        while stack:
+            r, c = stack.pop()
+            top, left, bottom, right = min(top, r), min(left, c), max(bottom, r), max(right, c)
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < mask.shape[0] and 0 <= nc < mask.shape[1] and mask[nr, nc] and not seen[nr, nc]:
+                    seen[nr, nc] = True
+                    stack.append((nr, nc))
+        boxes.append((top, left, bottom, right))
+    if len(boxes) > max_regions:
+        boxes = [(min(b[0] for b in boxes), min(b[1] for b in boxes),
+                  max(b[2] for b in boxes), max(b[3] for b in boxes))]
+    rects = []
+    for top, left, bottom, right in boxes:
+        x, y = int(left) * tile, int(top) * tile
+        rects.append((x, y, min(width, (int(right) + 1) * tile) - x, min(height, (int(bottom) + 1) * tile) - y))
+    return rects
+
+
+class FrameDiffer:
+    """
+    Keeps the last full-screen frame the agent received and reports which tiles changed since.
+    Every capture replaces the baseline, so a diff is always relative to the previous screenshot.
+    A plain capture only keeps a reference (store); the NumPy copy is made when a diff or a wait
+    actually compares against it.
+    """
+
+    def __init__(self, tile: int = DIFF_TILE, threshold: int = DIFF_THRESHOLD):
+        self.tile = tile
+        self.threshold = threshold
+        self._previous = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _array(frame) -> np.ndarray | None:
+        if frame is None or isinstance(frame, np.ndarray):
+            return frame
+        return np.array(frame if frame.mode == "RGB" else frame.convert("RGB"))
+
+    def store(self, image):
+        """Makes the frame the next baseline without comparing; the caller must not modify it afterwards."""
+        with self._lock:
+            self._previous = image
+
+    def update(self, image) -> np.ndarray | None:
+        """Stores the frame; returns the changed-tile grid, or None without a comparable previous frame."""
+        current = self._array(image)
+        with self._lock:
+            previous, self._previous = self._previous, current
+        previous = self._array(previous)
+        if previous is None or previous.shape != current.shape:
+            return None
+        return changed_tiles(previous, current, self.tile, self.threshold)
+
+    def reset(self):
+        with self._lock:
+            self._previous = None
+
+    def previous_frame(self) -> np.ndarray | None:
+        with self._lock:
+            self._previous = self._array(self._previous)
+            return self._previous
+
+
+# --- Screen change detection ---
+# Width of the grayscale signature a sampled frame is reduced to
+SIGNATURE_WIDTH = 256
+
+
+def screen_signature(image) -> np.ndarray:
+    """
+    Cheap fingerprint of a frame for polling: integer box reduction (Image.reduce) to about
+    SIGNATURE_WIDTH pixels wide, then grayscale. A change the size of a button moves a few
+    signature pixels by tens of levels, single-pixel noise is averaged away.
+    """
+    factor = max(1, image.width // SIGNATURE_WIDTH)
+    if factor > 1:
+        image = image.reduce(factor)
+    return np.asarray(image.convert("L"), dtype=np.int16)
+
+
+def signature_difference(previous: np.ndarray, current: np.ndarray) -> int:
+    """Largest per-pixel difference of two signatures (0-255); a different size counts as a full change."""
+    if previous.shape != current.shape:
+        return 255
+    return int(np.abs(previous - current).max())
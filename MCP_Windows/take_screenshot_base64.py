@@ -1,5 +1,5 @@
 @mcp.tool()
-def take_screenshot_base64(filename: str = "screenshot.jpg", max_width: int = 400):
+def take_screenshot_base64(filename: str = "screenshot.jpg", max_width: int = 400, save_to_disk: bool = False):
     """
     Takes a VERY small screenshot with base64 encoding for AI vision analysis.
     WARNING: Only use when absolutely necessary due to token limits!
@@ -7,20 +7,12 @@ def take_screenshot_base64(filename: str = "screenshot.jpg", max_width: int = 40
     Args:
         filename: The desired filename. Defaults to 'screenshot.jpg'.
         max_width: Maximum width (default 400px - very small!).
+        save_to_disk: Also write the JPEG to the temp directory as `filename`.
 
     Returns:
-        A JSON string with 'filepath' and 'image_base64' keys.
+        A JSON string with 'filepath' (None unless saved) and 'image_base64' keys.
     """
     try:
-        if not filename.endswith('.jpg') and not filename.endswith('.jpeg'):
-            filename = filename.rsplit('.', 1)[0] + '.jpg'
-        
-        if ".." in filename or "/" in filename or "\\" in filename:
-            filename = "screenshot.jpg"
-
-        temp_dir = tempfile.gettempdir()
-        filepath = os.path.join(temp_dir, filename)
-
         # Take screenshot
         screenshot = pyautogui.screenshot()
         
@@ -34,16 +26,14 @@ def take_screenshot_base64(filename: str = "screenshot.jpg", max_width: int = 40
             new_height = int((max_width / width) * height)
             screenshot = screenshot.resize((max_width, new_height))
         
-        # Save with very aggressive compression
-        screenshot.save(filepath, format='JPEG', optimize=True, quality=30)
+        # Encode in memory with very aggressive compression
+        data = encode_jpeg(screenshot, quality=30)
+        filepath = save_jpeg(data, filename) if save_to_disk else None
 
-        with open(filepath, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        
         output = {
-            "message": f"Small screenshot saved: {filepath} ({screenshot.size[0]}x{screenshot.size[1]})",
+            "message": f"Small screenshot {'saved: ' + filepath if filepath else 'captured'} ({screenshot.size[0]}x{screenshot.size[1]})",
             "filepath": filepath,
-            "image_base64": encoded_string,
+            "image_base64": to_base64(data),
             "width": screenshot.size[0],
             "height": screenshot.size[1],
             "warning": "Very low quality for token efficiency"
@@ -0,0 +1,118 @@
+"""
+Tile math of the frame diff and the screen signature, on synthetic frames (no screen access).
+Run: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from screenshot_pipeline import (FrameDiffer, changed_tiles, screen_signature, signature_difference,
+                                 tile_rects)
+
+
+def frame(width: int = 256, height: int = 160) -> np.ndarray:
+    return np.full((height, width, 3), 40, dtype=np.uint8)
+
+
+class ChangedTilesTest(unittest.TestCase):
+    def test_identical_frames(self):
+        self.assertFalse(changed_tiles(frame(), frame(), 32, 8).any())
+
+    def test_change_marks_its_tile(self):
+        current = frame()
+        current[70, 100, 2] = 255
+        mask = changed_tiles(frame(), current, 32, 8)
+        self.assertEqual(mask.shape, (5, 8))
+        self.assertEqual(list(zip(*np.nonzero(mask))), [(2, 3)])
+
+    def test_difference_within_threshold_is_noise(self):
+        current = frame()
+        current[:, :] += 8
+        self.assertFalse(changed_tiles(frame(), current, 32, 8).any())
+        current[0, 0, 0] += 1
+        self.assertTrue(changed_tiles(frame(), current, 32, 8)[0, 0])
+
+    def test_darker_pixel_counts_without_wraparound(self):
+        current = frame()
+        current[5, 5] = 0
+        self.assertTrue(changed_tiles(frame(), current, 32, 8)[0, 0])
+
+    def test_partial_edge_tiles(self):
+        previous, current = frame(100, 70), frame(100, 70)
+        current[69, 99] = 255
+        mask = changed_tiles(previous, current, 32, 8)
+        self.assertEqual(mask.shape, (3, 4))
+        self.assertEqual(list(zip(*np.nonzero(mask))), [(2, 3)])
+
+
+class TileRectsTest(unittest.TestCase):
+    def test_connected_tiles_form_one_rect(self):
+        mask = np.zeros((5, 8), dtype=bool)
+        mask[1, 2:5] = True
+        mask[2, 4] = True
+        self.assertEqual(tile_rects(mask, 32, 256, 160), [(64, 32, 96, 64)])
+
+    def test_separate_groups_and_screen_edge(self):
+        mask = np.zeros((3, 4), dtype=bool)
+        mask[0, 0] = True
+        mask[2, 3] = True
+        self.assertEqual(sorted(tile_rects(mask, 32, 100, 70)), [(0, 0, 32, 32), (96, 64, 4, 6)])
+
+    def test_too_many_regions_merge_into_bounding_box(self):
+        mask = np.zeros((5, 8), dtype=bool)
+        mask[0, 0] = mask[0, 7] = mask[4, 0] = True
+        self.assertEqual(tile_rects(mask, 32, 256, 160, max_regions=2), [(0, 0, 256, 160)])
+
+
+class FrameDifferTest(unittest.TestCase):
+    def test_first_frame_has_no_diff(self):
+        differ = FrameDiffer(tile=32)
+        self.assertIsNone(differ.update(Image.fromarray(frame())))
+
+    def test_stored_frame_is_baseline_for_next_diff(self):
+        differ = FrameDiffer(tile=32)
+        differ.store(Image.fromarray(frame()))
+        current = frame()
+        current[10:20, 200:210] = 255
+        mask = differ.update(Image.fromarray(current))
+        self.assertEqual(tile_rects(mask, 32, 256, 160), [(192, 0, 32, 32)])
+        self.assertFalse(differ.update(Image.fromarray(current)).any())
+
+    def test_previous_frame_from_stored_image(self):
+        differ = FrameDiffer()
+        differ.store(Image.fromarray(frame()))
+        previous = differ.previous_frame()
+        self.assertIsInstance(previous, np.ndarray)
+        self.assertEqual(previous.shape, (160, 256, 3))
+
+    def test_size_change_has_no_diff(self):
+        differ = FrameDiffer()
+        differ.store(Image.fromarray(frame()))
+        self.assertIsNone(differ.update(Image.fromarray(frame(128, 80))))
+
+
+class SignatureTest(unittest.TestCase):
+    def test_signature_reduces_large_frames(self):
+        signature = screen_signature(Image.fromarray(frame(1920, 1080)))
+        # Celočíselný faktor 1920 // 256 = 7
+        self.assertEqual(signature.shape, (155, 275))
+
+    def test_button_sized_change_is_visible(self):
+        current = frame(1920, 1080)
+        current[500:540, 900:1000] = 255
+        difference = signature_difference(screen_signature(Image.fromarray(frame(1920, 1080))),
+                                          screen_signature(Image.fromarray(current)))
+        self.assertGreater(difference, 100)
+
+    def test_different_size_is_full_change(self):
+        self.assertEqual(signature_difference(np.zeros((2, 2), np.int16), np.zeros((3, 3), np.int16)), 255)
+
+
+if __name__ == "__main__":
+    unittest.main()
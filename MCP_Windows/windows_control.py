@@ -3,11 +3,11 @@ This script implements a FastMCP server for Windows GUI automation using pyautog
 It provides tools for controlling the mouse, keyboard, and taking screenshots.
 """
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
+import asyncio
 import os
-import tempfile
+import time
 from typing import List
-import base64
 import json
 from pathlib import Path
 import ctypes # <--- NOVÝ IMPORT
@@ -15,6 +15,10 @@ import ctypes # <--- NOVÝ IMPORT
 import pyautogui
 from fastmcp import FastMCP
 
+from screenshot_pipeline import (DEFAULT_PRESET, FULL_FRAME_FRACTION, FrameDiffer, apply_grid, downscale,
+                                 encode_jpeg, get_preset, save_jpeg, screen_signature, signature_difference,
+                                 tile_rects, to_base64)
+
 # --- Windows DPI Fix (KRITICKÁ OPRAVA PRO PŘESNOST MYŠI) ---
 try:
     # Zkusíme novější API pro Windows 8.1+
@@ -30,6 +34,15 @@ except Exception:
 # --- Safety ---
 pyautogui.FAILSAFE = True
 
+# Výchozí preset zmenšení a JPEG (fast | balanced | detail), nástroje ho mohou přepsat parametrem 'preset'
+SCREENSHOT_PRESET = os.environ.get("MCP_SCREENSHOT_PRESET", DEFAULT_PRESET)
+
+# Poslední celý snímek obrazovky pro take_screenshot(diff=True)
+frame_differ = FrameDiffer()
+# Nejdelší povolené čekání wait_for_screen_* (s) a nejkratší interval vzorkování
+MAX_WAIT_TIMEOUT = 120.0
+MIN_WAIT_INTERVAL = 0.02
+
 # --- MCP Server Initialization ---
 mcp = FastMCP(
     name="Windows GUI Control",
@@ -256,15 +269,14 @@ def mouse_drag_to(x: int, y: int, duration: float = 0.5, button: str = "left", s
 
 
 @mcp.tool()
-def take_screenshot_region(x: int, y: int, width: int, height: int, filename: str = "screenshot_region.jpg", max_width: int = 640):
+def take_screenshot_region(x: int, y: int, width: int, height: int, filename: str = "screenshot_region.jpg", max_width: int = 640, save_to_disk: bool = False, preset: str = None):
+    """
+    Takes a screenshot of a screen region. The JPEG is encoded in memory;
+    with save_to_disk=True a copy is also written to the temp directory as `filename`.
+    preset: 'fast', 'balanced' or 'detail' (resampling filter, JPEG quality, optimisation).
+    """
     try:
-        from PIL import Image
-        if not filename.endswith('.jpg') and not filename.endswith('.jpeg'):
-            filename = filename.rsplit('.', 1)[0] + '.jpg'
-        if ".." in filename or "/" in filename or "\\" in filename:
-            filename = "screenshot_region.jpg"
-        temp_dir = tempfile.gettempdir()
-        filepath = os.path.join(temp_dir, filename)
+        settings = get_preset(preset or SCREENSHOT_PRESET)
         screenshot = pyautogui.screenshot(region=(x, y, width, height))
         original_width, original_height = screenshot.size
         if screenshot.mode != 'RGB':
@@ -272,16 +284,15 @@ def take_screenshot_region(x: int, y: int, width: int, height: int, filename: st
         if original_width > max_width:
             scale_factor = original_width / max_width
             new_height = int(original_height / scale_factor)
-            screenshot = screenshot.resize((max_width, new_height), 1)
+            screenshot = downscale(screenshot, (max_width, new_height), settings)
         else:
             scale_factor = 1.0
-        screenshot.save(filepath, format='JPEG', optimize=True, quality=60)
-        with open(filepath, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+        data = encode_jpeg(screenshot, quality=settings.quality, optimize=settings.optimize)
+        filepath = save_jpeg(data, filename, "screenshot_region.jpg") if save_to_disk else None
         output = {
-            "message": f"Region screenshot saved to: {filepath}",
+            "message": f"Region screenshot saved to: {filepath}" if filepath else "Region screenshot captured.",
             "filepath": filepath,
-            "image_base64": encoded_string,
+            "image_base64": to_base64(data),
             "original_width": original_width,
             "original_height": original_height,
             "resized_width": screenshot.size[0],
@@ -434,70 +445,214 @@ def delete_file(filepath: str):
 def take_screenshot(
     filename: str = "screenshot.jpg", 
     max_width: int = 1024, # Zvýšil jsem default na 1024 pro lepší detaily
-    grid: bool = True      # Nový parametr pro mřížku
+    grid: bool = True,     # Nový parametr pro mřížku
+    save_to_disk: bool = False,
+    diff: bool = False,
+    grid_step: int = 100,
+    grid_label_every: int = 1,
+    preset: str = None
 ) -> str:
     """
-    Takes a screenshot. If grid=True, overlays a coordinate grid to help AI accuracy.
+    Takes a screenshot. If grid=True, overlays a coordinate grid to help AI accuracy
+    (a line every grid_step px of the scaled image, a label on every grid_label_every-th line).
+    The JPEG is encoded in memory; save_to_disk=True also writes it to the temp directory.
+    With diff=True only the regions changed since the previous take_screenshot are returned
+    (each with its REAL screen coordinates), or "changed": false when nothing changed.
+    preset: 'fast', 'balanced' or 'detail' - resampling filter, JPEG quality and optimisation
+    (default from MCP_SCREENSHOT_PRESET, otherwise 'balanced').
     """
     try:
-        # 1. Clean filename & Path (stejné jako předtím)
-        if not filename.endswith(('.jpg', '.jpeg')):
-            filename = filename.rsplit('.', 1)[0] + '.jpg'
-        temp_dir = tempfile.gettempdir()
-        filepath = os.path.join(temp_dir, filename)
+        settings = get_preset(preset or SCREENSHOT_PRESET)
 
-        # 2. Capture
+        # 1. Capture
         screenshot = pyautogui.screenshot()
         orig_w, orig_h = screenshot.size
         
-        # 3. Convert
+        # 2. Convert
         if screenshot.mode != 'RGB':
             screenshot = screenshot.convert('RGB')
+
+        scale_factor = orig_w / max_width if orig_w > max_width else 1.0
+
+        # Každý snímek se stává základem pro příští diff, porovnává se jen s diff=True
+        changes = None
+        if diff:
+            changes = frame_differ.update(screenshot)
+        else:
+            frame_differ.store(screenshot)
+        if changes is not None:
+            rects = tile_rects(changes, frame_differ.tile, orig_w, orig_h)
+            changed_fraction = float(changes.mean())
+            if changed_fraction <= FULL_FRAME_FRACTION:
+                return _diff_output(screenshot, rects, changed_fraction, scale_factor, settings)
         
-        # 4. Resize
+        # 3. Resize - celočíselné předzmenšení (reduce) a filtr presetu na zbytek
         if orig_w > max_width:
-            scale_factor = orig_w / max_width
             new_height = int(orig_h / scale_factor)
-            screenshot = screenshot.resize((max_width, new_height), Image.Resampling.LANCZOS)
-        else:
-            scale_factor = 1.0
+            screenshot = downscale(screenshot, (max_width, new_height), settings)
+        elif grid and not diff:
+            # Nezmenšený snímek je uložený jako základ diffu - mřížka se kreslí do kopie
+            screenshot = screenshot.copy()
 
-        # 5. GRID OVERLAY (VYLEPŠENÍ)
+        # 4. GRID OVERLAY - vrstva se kreslí jednou pro (velikost, krok, měřítko), pak se jen vkládá
         if grid:
-            draw = ImageDraw.Draw(screenshot)
-            # Velikost mřížky na zmenšeném obrázku (např. každých 100px)
-            step = 100 
-            w, h = screenshot.size
-            
-            # Kreslení čar
-            for x in range(0, w, step):
-                draw.line([(x, 0), (x, h)], fill=(255, 0, 0), width=1)
-                draw.text((x + 2, 2), str(int(x * scale_factor)), fill=(255, 0, 0)) # Píšeme REÁLNOU souřadnici
-                
-            for y in range(0, h, step):
-                draw.line([(0, y), (w, y)], fill=(255, 0, 0), width=1)
-                draw.text((2, y + 2), str(int(y * scale_factor)), fill=(255, 0, 0))
-
-        # 6. Save
-        screenshot.save(filepath, format='JPEG', optimize=True, quality=70)
-
-        # 7. Encode
-        with open(filepath, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-        
+            apply_grid(screenshot, max(10, grid_step), scale_factor, max(1, grid_label_every))
+
+        # 5. Encode v paměti, na disk jen na vyžádání
+        data = encode_jpeg(screenshot, quality=settings.quality, optimize=settings.optimize)
+        filepath = save_jpeg(data, filename) if save_to_disk else None
+
         output = {
-            "message": f"Screenshot saved ({'with grid' if grid else 'clean'}).",
-            "image_base64": encoded_string,
+            "message": f"Screenshot {'saved to ' + filepath if filepath else 'captured'} ({'with grid' if grid else 'clean'}).",
+            "image_base64": to_base64(data),
             "original_size": [orig_w, orig_h],
             "scaled_size": screenshot.size,
             "scale_factor": scale_factor,
             "note": "Red grid lines show REAL coordinates. Use these numbers for mouse_click."
         }
+        if filepath:
+            output["filepath"] = filepath
+        if diff:
+            output["changed"] = True
+            output["diff"] = "full frame" if changes is not None else "no previous frame, full frame returned"
         return json.dumps(output)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
+def _diff_output(frame: Image.Image, rects: list, changed_fraction: float, scale_factor: float, settings) -> str:
+    """Changed regions cropped from the full-resolution frame, scaled like the full screenshot."""
+    if not rects:
+        return json.dumps({
+            "changed": False,
+            "message": "No change since the previous screenshot.",
+            "original_size": list(frame.size)
+        })
+    regions = []
+    for x, y, width, height in rects:
+        crop = frame.crop((x, y, x + width, y + height))
+        if scale_factor > 1.0:
+            crop = downscale(crop, (max(1, round(width / scale_factor)), max(1, round(height / scale_factor))), settings)
+        regions.append({
+            "x": x, "y": y, "width": width, "height": height,
+            "scaled_size": list(crop.size),
+            "image_base64": to_base64(encode_jpeg(crop, quality=settings.quality, optimize=settings.optimize))
+        })
+    return json.dumps({
+        "changed": True,
+        "message": f"{len(regions)} changed region(s), {changed_fraction:.1%} of the screen.",
+        "regions": regions,
+        "original_size": list(frame.size),
+        "scale_factor": scale_factor,
+        "note": "Region x/y/width/height are REAL screen coordinates; images are scaled by scale_factor."
+    })
+
+
+def _screen_region(x, y, width, height):
+    if None in (x, y, width, height):
+        return None
+    return (x, y, width, height)
+
+
+def _capture_signature(region):
+    """Signature of the screen (or region) - only the reduced grayscale copy is kept."""
+    return screen_signature(pyautogui.screenshot(region=region) if region else pyautogui.screenshot())
+
+
+def _last_screenshot_signature(region):
+    """Signature of the frame from the previous take_screenshot, cropped to the region."""
+    frame = frame_differ.previous_frame()
+    if frame is None:
+        return None
+    if region:
+        x, y, width, height = region
+        frame = frame[y:y + height, x:x + width]
+    return screen_signature(Image.fromarray(frame))
+
+
+async def _wait_for_screen(region, timeout: float, interval: float, tolerance: int,
+                           stable_for: float = None, since_last_screenshot: bool = False) -> dict:
+    """
+    Samples the screen every `interval` s. Without `stable_for` returns on the first sample
+    that differs from the baseline by more than `tolerance`; with it returns once no sample
+    has changed for `stable_for` s. Captures run in a worker thread, the wait does not block the server.
+    """
+    timeout = min(max(timeout, 0.0), MAX_WAIT_TIMEOUT)
+    interval = max(interval, MIN_WAIT_INTERVAL)
+    started = last_change = time.monotonic()
+    baseline = _last_screenshot_signature(region) if since_last_screenshot else None
+    samples, difference = 0, 0
+    while True:
+        current = await asyncio.to_thread(_capture_signature, region)
+        samples += 1
+        now = time.monotonic()
+        if baseline is not None:
+            difference = signature_difference(baseline, current)
+            if difference > tolerance:
+                if stable_for is None:
+                    return {"changed": True, "elapsed_s": round(now - started, 3),
+                            "samples": samples, "difference": difference}
+                last_change = now
+        # Změna se měří proti výchozímu snímku, stabilita proti poslednímu vzorku
+        if baseline is None or stable_for is not None:
+            baseline = current
+        if stable_for is not None and now - last_change >= stable_for:
+            return {"stable": True, "elapsed_s": round(now - started, 3), "samples": samples}
+        if now - started >= timeout:
+            result = {"timed_out": True, "elapsed_s": round(now - started, 3), "samples": samples,
+                      "last_difference": difference}
+            return {**result, "stable": False} if stable_for is not None else {**result, "changed": False}
+        await asyncio.sleep(min(interval, timeout - (now - started)))
+
+
+@mcp.tool()
+async def wait_for_screen_change(timeout: float = 10.0, interval: float = 0.1, tolerance: int = 32,
+                                 x: int = None, y: int = None, width: int = None, height: int = None,
+                                 since_last_screenshot: bool = True) -> str:
+    """
+    Blocks until the screen (or the x/y/width/height region) changes, or until timeout.
+    Use after a click instead of polling take_screenshot; then call take_screenshot(diff=True).
+
+    Args:
+        timeout: Maximum wait in seconds (at most 120).
+        interval: Sampling interval in seconds.
+        tolerance: Ignored brightness difference (0-255) in the downscaled comparison
+            (the default ignores a blinking caret, not a toggled checkbox).
+        since_last_screenshot: Compare against the previous take_screenshot frame, so a change
+            that already happened before this call counts. False = compare against the first sample.
+    """
+    try:
+        result = await _wait_for_screen(_screen_region(x, y, width, height), timeout, interval, tolerance,
+                                        since_last_screenshot=since_last_screenshot)
+        result["message"] = "Screen changed." if result["changed"] else "No change before timeout."
+        return json.dumps(result)
+    except Exception as e:
+        return json.dumps({"error": f"Error waiting for screen change: {e}"})
+
+
+@mcp.tool()
+async def wait_for_screen_stable(stable_for: float = 0.5, timeout: float = 10.0, interval: float = 0.1,
+                                 tolerance: int = 32, x: int = None, y: int = None,
+                                 width: int = None, height: int = None) -> str:
+    """
+    Blocks until the screen (or the x/y/width/height region) stops changing for `stable_for`
+    seconds - e.g. an animation, page load or progress dialog has settled - or until timeout.
+
+    Args:
+        stable_for: Seconds without change that count as settled.
+        timeout: Maximum wait in seconds (at most 120).
+        interval: Sampling interval in seconds.
+        tolerance: Ignored brightness difference (0-255), e.g. a blinking caret.
+    """
+    try:
+        result = await _wait_for_screen(_screen_region(x, y, width, height), timeout, interval, tolerance,
+                                        stable_for=stable_for)
+        result["message"] = "Screen is stable." if result["stable"] else f"Screen not stable for {stable_for}s before timeout."
+        return json.dumps(result)
+    except Exception as e:
+        return json.dumps({"error": f"Error waiting for stable screen: {e}"})
+
+
 # --- Main Execution ---
 if __name__ == "__main__":
     import sys
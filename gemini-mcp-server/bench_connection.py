@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark latence volání: nové TCP spojení pro každý příkaz vs. sdílený pool
+a propustnost sekvenčních vs. souběžně multiplexovaných příkazů.
+Bez parametru --real běží proti lokálnímu falešnému bridge, jinak proti Godot Editoru.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from godot_connection import GodotConnectionPool
+
+PROBE_COMMAND = {"cmd": "get_collision_layers", "type": "3D"}
+
+
+async def fake_bridge(host: str, port: int, close_after_reply: bool, accept_delay: float, frame: float = 0.0):
+    """
+    Minimální náhrada Godot bridge - na každý řádek odpoví {"status": "ok"} a vrátí request_id.
+    S `frame` > 0 zpracovává příkazy jako Godot v _process: vše, co přišlo, jednou za snímek.
+    """
+    def reply(line: bytes) -> bytes:
+        request_id = json.loads(line).get("request_id")
+        return (json.dumps({"status": "ok", "message": "pong", "request_id": request_id}) + "\n").encode('utf-8')
+
+    async def serve_per_frame(reader, writer):
+        reading = asyncio.ensure_future(reader.readline())
+        while True:
+            await asyncio.sleep(frame)
+            lines = []
+            while reading.done():
+                line = reading.result()
+                if not line:
+                    return
+                lines.append(line)
+                reading = asyncio.ensure_future(reader.readline())
+                await asyncio.sleep(0)
+            for line in lines:
+                writer.write(reply(line))
+            await writer.drain()
+            if lines and close_after_reply:
+                reading.cancel()
+                return
+
+    async def serve_immediately(reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            writer.write(reply(line))
+            await writer.drain()
+            if close_after_reply:
+                return
+
+    async def handle(reader, writer):
+        try:
+            if accept_delay:
+                await asyncio.sleep(accept_delay)
+            await (serve_per_frame if frame else serve_immediately)(reader, writer)
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def connect_per_call(host: str, port: int, command: dict) -> dict:
+    """Původní chování: spojení otevřené a zavřené kolem každého příkazu."""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps(command) + "\n").encode('utf-8'))
+    await writer.drain()
+    response_data = b""
+    while True:
+        chunk = await reader.read(4096)
+        if not chunk:
+            break
+        response_data += chunk
+    writer.close()
+    await writer.wait_closed()
+    return json.loads(response_data.decode('utf-8'))
+
+
+async def measure(label: str, call, calls: int) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<26} mean {statistics.mean(samples):7.3f} ms | p50 {samples[len(samples) // 2]:7.3f} ms | p99 {p99:7.3f} ms")
+    return samples
+
+
+async def measure_pipelined(label: str, pool: GodotConnectionPool, calls: int, concurrency: int):
+    start = time.perf_counter()
+    for offset in range(0, calls, concurrency):
+        batch = min(concurrency, calls - offset)
+        await asyncio.gather(*(pool.request(PROBE_COMMAND) for _ in range(batch)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {calls / elapsed:9.0f} příkazů/s | {elapsed * 1000.0 / calls:7.3f} ms/příkaz")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4243)
+    parser.add_argument("--accept-delay-ms", type=float, default=0.0,
+                        help="Simulovaná prodleva přijetí spojení (Godot TCPServer se dotazuje jednou za snímek)")
+    parser.add_argument("--frame-ms", type=float, default=0.0,
+                        help="Simulovaná délka snímku editoru - bridge zpracuje příchozí příkazy jednou za snímek")
+    parser.add_argument("--concurrency", type=int, default=32, help="Počet souběžných příkazů při multiplexovaném měření")
+    parser.add_argument("--real", action="store_true", help="Měřit proti běžícímu Godot bridge na --host/--port")
+    args = parser.parse_args()
+
+    servers = []
+    per_call_port, pool_port = args.port, args.port
+    if not args.real:
+        delay = args.accept_delay_ms / 1000.0
+        frame = args.frame_ms / 1000.0
+        per_call_port, pool_port = args.port, args.port + 1
+        servers.append(await fake_bridge(args.host, per_call_port, True, delay, frame))
+        servers.append(await fake_bridge(args.host, pool_port, False, delay, frame))
+
+    pool = GodotConnectionPool(args.host, pool_port)
+    try:
+        before = await measure("connect-per-call", lambda: connect_per_call(args.host, per_call_port, PROBE_COMMAND), args.calls)
+        after = await measure("pooled connection", lambda: pool.request(PROBE_COMMAND), args.calls)
+        print(f"Zrychlení (mean): {statistics.mean(before) / statistics.mean(after):.1f}x")
+        await measure_pipelined("sequential (1 in flight)", pool, args.calls, 1)
+        await measure_pipelined(f"multiplexed ({args.concurrency} in flight)", pool, args.calls, args.concurrency)
+    finally:
+        await pool.close()
+        for server in servers:
+            server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark propustnosti convert_heightmap.py: syntetický RAW (výchozí 8192x8192 uint16,
+hladký terén s jemným šumem) se převede do každého výstupního formátu a vypíše se MB/s.
+Pro srovnání se měří i převod přes celé pole v paměti (Pillow), pokud je dostupný.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from convert_heightmap import DEFAULT_BAND_ROWS, convert
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+def write_synthetic(path: str, size: int, big_endian: bool, band_rows: int = 512):
+    """Hladká heightmapa po pásech, aby ani generování nedrželo celý obraz v paměti."""
+    rng = np.random.default_rng(1)
+    x = np.linspace(0, 6 * np.pi, size, dtype=np.float32)
+    dtype = ">u2" if big_endian else "<u2"
+    with open(path, "wb") as f:
+        for start in range(0, size, band_rows):
+            y = np.linspace(0, 6 * np.pi, size, dtype=np.float32)[start:start + band_rows, np.newaxis]
+            band = 0.5 + 0.3 * np.sin(x) * np.cos(y) + 0.1 * np.sin(x * 0.37 + y * 0.21)
+            band += rng.normal(0, 0.002, band.shape).astype(np.float32)
+            f.write(np.round(np.clip(band, 0, 1) * 65535).astype(dtype).tobytes())
+
+
+def in_memory_png(input_path: str, output_path: str, size: int) -> float:
+    """Původní postup: celý RAW do paměti a uložení přes Pillow."""
+    start = time.perf_counter()
+    data = np.fromfile(input_path, dtype="<u2").reshape(size, size)
+    Image.fromarray(data).save(output_path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=8192)
+    parser.add_argument("--band-rows", type=int, default=DEFAULT_BAND_ROWS)
+    parser.add_argument("--big-endian", action="store_true", help="Vstup big-endian (ověří i autodetekci)")
+    parser.add_argument("--dir", default=None, help="Adresář pro dočasné soubory (výchozí: systémový temp)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        source = os.path.join(tmp, "synthetic.raw")
+        write_synthetic(source, args.size, args.big_endian)
+        print(f"Vstup: {args.size}x{args.size} uint16, {os.path.getsize(source) / 1e6:.0f} MB")
+
+        for extension in (".r16", ".exr", ".png"):
+            stats = convert(source, os.path.join(tmp, "out" + extension), band_rows=args.band_rows)
+            print(f"{extension:<6} {stats['seconds']:7.2f} s | {stats['mb_per_s']:7.1f} MB/s | "
+                  f"výstup {stats['output_mb']:7.1f} MB | endian {stats['endian']}")
+
+        if Image is not None and not args.big_endian:
+            seconds = in_memory_png(source, os.path.join(tmp, "pillow.png"), args.size)
+            print(f"Pillow (celý obraz v paměti) .png {seconds:7.2f} s | "
+                  f"{os.path.getsize(source) / 1e6 / seconds:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
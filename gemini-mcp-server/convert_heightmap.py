@@ -1,2 +1,277 @@
-from unity_raw_to_exr import raw_to_exr
-raw_to_exr("c:\\Users\\PCDELL6KC\\Documents\\Godot\\life-sim1\\world\\melnik.raw")
\ No newline at end of file
+#!/usr/bin/env python3
+"""
+Převod RAW/R16 heightmap (např. export terénu z Unity) na EXR, 16-bit PNG nebo R16 pro Terrain3D.
+Vstup se čte memory-mapped a zpracovává po pásech řádků, výstup se zapisuje průběžně,
+takže ani soubory o stovkách MB se nenačítají celé do paměti.
+
+Použití z příkazové řádky:
+    python convert_heightmap.py melnik.raw melnik.exr
+    python convert_heightmap.py terrain.raw terrain.png --endian big --flip-y
+    python convert_heightmap.py terrain.raw terrain.r16 --width 4097 --height 4097
+"""
+
+import argparse
+import math
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+# Počet řádků zpracovaných najednou (pás) - určuje špičkovou spotřebu paměti
+DEFAULT_BAND_ROWS = 256
+
+OUTPUT_FORMATS = (".exr", ".png", ".r16", ".raw")
+
+
+class ConvertError(ValueError):
+    """Vstup nelze převést (neznámé rozměry, formát, ...)."""
+
+
+# ----------------------------------------------------------------------------
+# Vstup
+# ----------------------------------------------------------------------------
+def infer_layout(size: int, width: int | None = None, height: int | None = None,
+                 bits: int | None = None) -> tuple[int, int, int]:
+    """
+    Rozměry a bitová hloubka RAW souboru. Bez rozměrů se předpokládá čtverec
+    (Unity ukládá 2^n + 1), bez hloubky se zkusí nejdřív 16 bitů, pak 8.
+    """
+    for depth in ([bits] if bits else [16, 8]):
+        pixels, rest = divmod(size, depth // 8)
+        if rest:
+            continue
+        if width and height:
+            if width * height == pixels:
+                return width, height, depth
+            continue
+        if width or height:
+            known = width or height
+            if pixels % known == 0:
+                return (known, pixels // known, depth) if width else (pixels // known, known, depth)
+            continue
+        side = math.isqrt(pixels)
+        if side * side == pixels:
+            return side, side, depth
+    raise ConvertError(f"Nelze odvodit rozměry pro {size} B - zadejte width/height (případně bits)")
+
+
+def detect_endianness(data: np.ndarray) -> str:
+    """
+    Odhad pořadí bajtů 16bitových dat: správná interpretace má mezi sousedními
+    pixely malé rozdíly, prohozené bajty dávají šum. Stačí vzorek řádků.
+    """
+    sample = np.asarray(data[::max(1, data.shape[0] // 64)][:64])
+    rows = sample.astype(np.int64)
+    swapped = sample.byteswap().astype(np.int64)
+
+    def roughness(values):
+        return float(np.abs(np.diff(values, axis=1)).mean()) if values.shape[1] > 1 else 0.0
+
+    return "little" if roughness(rows) <= roughness(swapped) else "big"
+
+
+def open_raw(path: str, width: int | None = None, height: int | None = None, bits: int | None = None,
+             endian: str = "auto") -> tuple[np.ndarray, float, dict]:
+    """
+    Memory-mapped vstup. Vrací (pole height x width, násobitel na 0..1, popis rozložení).
+    """
+    if not os.path.isfile(path):
+        raise ConvertError(f"Soubor neexistuje: {path}")
+    width, height, depth = infer_layout(os.path.getsize(path), width, height, bits)
+    if depth == 8:
+        data = np.memmap(path, dtype=np.uint8, mode="r", shape=(height, width))
+        return data, 1.0 / 255.0, {"width": width, "height": height, "bits": 8, "endian": None}
+    if endian == "auto":
+        endian = detect_endianness(np.memmap(path, dtype="<u2", mode="r", shape=(height, width)))
+    if endian not in ("little", "big"):
+        raise ConvertError(f"Neznámé pořadí bajtů '{endian}' (auto, little, big)")
+    dtype = "<u2" if endian == "little" else ">u2"
+    data = np.memmap(path, dtype=dtype, mode="r", shape=(height, width))
+    return data, 1.0 / 65535.0, {"width": width, "height": height, "bits": 16, "endian": endian}
+
+
+# ----------------------------------------------------------------------------
+# Výstupy - zapisovače přijímají pásy normalizovaných hodnot 0..1 (float32)
+# ----------------------------------------------------------------------------
+class R16Writer:
+    """Terrain3D R16: uint16 little-endian bez hlavičky."""
+
+    def __init__(self, path: str, width: int, height: int):
+        self.file = open(path, "wb")
+
+    def write(self, band: np.ndarray):
+        self.file.write(np.round(band * 65535.0).astype("<u2").tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class Png16Writer:
+    """
+    16bitový šedotónový PNG zapisovaný průběžně: IDAT bloky vznikají z komprese
+    pásů řádků, takže se nikdy nedrží celý obraz. Řádky používají filtr Up
+    (rozdíl proti předchozímu řádku), který u heightmap výrazně zmenší výstup.
+    """
+
+    SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+    def __init__(self, path: str, width: int, height: int, level: int = 1):
+        self.file = open(path, "wb")
+        self.width = width
+        self.compressor = zlib.compressobj(level)
+        self.previous = np.zeros(width * 2, dtype=np.uint8)
+        self.file.write(self.SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 16, 0, 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write(self, band: np.ndarray):
+        rows = np.round(band * 65535.0).astype(">u2").view(np.uint8).reshape(band.shape[0], self.width * 2)
+        above = np.vstack([self.previous[np.newaxis, :], rows[:-1]])
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        filtered[:, 1:] = rows - above
+        self.previous = rows[-1].copy()
+        data = self.compressor.compress(filtered.tobytes())
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        self._chunk(b"IDAT", self.compressor.flush())
+        self._chunk(b"IEND", b"")
+        self.file.close()
+
+
+class ExrWriter:
+    """
+    OpenEXR bez komprese, jeden kanál R ve float32 (formát, který Terrain3D importuje).
+    U nekomprimovaného scanline souboru jsou velikosti bloků předem známé,
+    takže tabulka offsetů se zapíše hned za hlavičku a řádky pak průběžně.
+    """
+
+    MAGIC = 20000630
+
+    def __init__(self, path: str, width: int, height: int, scale: float = 1.0):
+        self.file = open(path, "wb")
+        self.width = width
+        self.scale = np.float32(scale)
+        self.y = 0
+
+        def attribute(name: str, kind: str, value: bytes) -> bytes:
+            return name.encode() + b"\0" + kind.encode() + b"\0" + struct.pack("<i", len(value)) + value
+
+        box = struct.pack("<iiii", 0, 0, width - 1, height - 1)
+        # chlist: název, typ pixelu (2 = FLOAT), pLinear + rezerva, xSampling, ySampling; ukončeno nulou
+        channels = b"R\0" + struct.pack("<iB3xii", 2, 0, 1, 1) + b"\0"
+        header = b"".join([
+            struct.pack("<ii", self.MAGIC, 2),
+            attribute("channels", "chlist", channels),
+            attribute("compression", "compression", b"\0"),
+            attribute("dataWindow", "box2i", box),
+            attribute("displayWindow", "box2i", box),
+            attribute("lineOrder", "lineOrder", b"\0"),
+            attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0)),
+            attribute("screenWindowCenter", "v2f", struct.pack("<ff", 0.0, 0.0)),
+            attribute("screenWindowWidth", "float", struct.pack("<f", 1.0)),
+            b"\0"
+        ])
+        block = 8 + width * 4
+        first = len(header) + 8 * height
+        offsets = np.arange(height, dtype="<u8") * block + first
+        self.file.write(header)
+        self.file.write(offsets.tobytes())
+
+    def write(self, band: np.ndarray):
+        rows = band.shape[0]
+        # Každý řádek: int32 y, int32 délka dat, float32 hodnoty kanálu R
+        out = np.empty((rows, 2 + self.width), dtype="<u4")
+        out[:, 0] = np.arange(self.y, self.y + rows, dtype=np.uint32)
+        out[:, 1] = self.width * 4
+        out[:, 2:] = (band.astype("<f4") * self.scale).view("<u4")
+        self.file.write(out.tobytes())
+        self.y += rows
+
+    def close(self):
+        self.file.close()
+
+
+def convert(input_path: str, output_path: str, width: int | None = None, height: int | None = None,
+            bits: int | None = None, endian: str = "auto", flip_y: bool = False, exr_scale: float = 1.0,
+            png_level: int = 1, band_rows: int = DEFAULT_BAND_ROWS, progress=None) -> dict:
+    """
+    Převede RAW/R16 na formát podle přípony výstupu (.exr, .png, .r16/.raw).
+    EXR obsahuje hodnoty 0..1 vynásobené `exr_scale` (např. maximální výška terénu).
+    """
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in OUTPUT_FORMATS:
+        raise ConvertError(f"Nepodporovaný výstup '{extension}' ({', '.join(OUTPUT_FORMATS)})")
+    if os.path.abspath(input_path) == os.path.abspath(output_path):
+        raise ConvertError("Vstup a výstup nesmí být stejný soubor")
+    data, factor, layout = open_raw(input_path, width, height, bits, endian)
+    width, height = layout["width"], layout["height"]
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    started = time.perf_counter()
+    if extension == ".exr":
+        writer = ExrWriter(output_path, width, height, exr_scale)
+    elif extension == ".png":
+        writer = Png16Writer(output_path, width, height, png_level)
+    else:
+        writer = R16Writer(output_path, width, height)
+    try:
+        bands = range(0, height, band_rows)
+        for done, start in enumerate(bands, start=1):
+            if flip_y:
+                # Převrácený obraz: pás od konce vstupu, řádky v opačném pořadí
+                stop = height - start
+                band = data[max(0, stop - band_rows):stop][::-1]
+            else:
+                band = data[start:start + band_rows]
+            writer.write(band.astype(np.float32) * np.float32(factor))
+            if progress is not None:
+                progress(done, len(bands))
+    finally:
+        writer.close()
+        del data
+
+    seconds = time.perf_counter() - started
+    input_mb = os.path.getsize(input_path) / 1e6
+    return {
+        **layout,
+        "output": output_path,
+        "input_mb": round(input_mb, 1),
+        "output_mb": round(os.path.getsize(output_path) / 1e6, 1),
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(input_mb / seconds, 1) if seconds else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Vstupní RAW/R16 soubor")
+    parser.add_argument("output", help="Výstup (.exr, .png, .r16, .raw)")
+    parser.add_argument("--width", type=int)
+    parser.add_argument("--height", type=int)
+    parser.add_argument("--bits", type=int, choices=[8, 16], help="Bitová hloubka vstupu (výchozí: odvodit)")
+    parser.add_argument("--endian", choices=["auto", "little", "big"], default="auto",
+                        help="Pořadí bajtů 16bitového vstupu (Unity: Windows = little, Mac = big)")
+    parser.add_argument("--flip-y", action="store_true", help="Převrátit svisle (Unity ukládá od spodního řádku)")
+    parser.add_argument("--exr-scale", type=float, default=1.0, help="Násobitel hodnot 0..1 v EXR (např. max výška)")
+    parser.add_argument("--png-level", type=int, default=1, choices=range(0, 10), help="Úroveň zlib komprese PNG")
+    parser.add_argument("--band-rows", type=int, default=DEFAULT_BAND_ROWS)
+    args = parser.parse_args()
+
+    stats = convert(args.input, args.output, args.width, args.height, args.bits, args.endian, args.flip_y,
+                    args.exr_scale, args.png_level, args.band_rows)
+    print(f"Převedeno: {stats['output']} ({stats['width']}x{stats['height']}, {stats['bits']} bit, "
+          f"{stats['endian'] or '-'}) {stats['input_mb']} MB za {stats['seconds']} s = {stats['mb_per_s']} MB/s")
+
+
+if __name__ == "__main__":
+    main()
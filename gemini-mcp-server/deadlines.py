@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Časové rozpočty volání nástrojů.
+Každý nástroj má rozpočet podle rodiny (případně vlastní), volání ho může přepsat
+argumentem 'timeout'. Z historie latencí příkazů se odvozuje adaptivní timeout
+(násobek p99), takže při zaseknutém editoru levné příkazy selžou rychle a pomalé
+operace dostanou celý rozpočet.
+"""
+
+import contextvars
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+
+# Počet posledních latencí držených pro každý příkaz
+LATENCY_WINDOW = 200
+# Adaptivní timeout se použije až od tohoto počtu vzorků
+MIN_SAMPLES = 20
+# Adaptivní timeout = p99 * P99_FACTOR, nejméně MIN_ADAPTIVE_TIMEOUT (snímek editoru může trvat déle)
+P99_FACTOR = 4.0
+MIN_ADAPTIVE_TIMEOUT = 2.0
+
+
+@dataclass
+class CallBudget:
+    """
+    Rozpočet jednoho volání nástroje. U nástrojů přeložených na příkaz Godot platí
+    jeden deadline pro celé volání (spojení, odeslání i odpověď, případně více příkazů);
+    lokální nástroje (výpočet na serveru + příkazy) mají rozpočet na každý příkaz.
+    """
+    tool: str
+    timeout: float
+    explicit: bool = False
+    deadline: float | None = None
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            return self.timeout
+        return max(0.0, self.deadline - time.monotonic())
+
+
+# Rozpočet volání, v jehož kontextu se právě posílají příkazy do Godot
+current_call: contextvars.ContextVar[CallBudget | None] = contextvars.ContextVar("current_call", default=None)
+
+
+def parse_timeouts(spec: str) -> dict[str, float]:
+    """'terrain=60,godot_terrain_bake_mesh=300' -> {'terrain': 60.0, 'godot_terrain_bake_mesh': 300.0}"""
+    timeouts = {}
+    for item in spec.split(","):
+        key, _, value = item.partition("=")
+        if key.strip() and value.strip():
+            timeouts[key.strip()] = float(value)
+    return timeouts
+
+
+class LatencyTracker:
+    """Klouzavé okno latencí podle příkazu a z něj odvozený adaptivní timeout."""
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = MIN_SAMPLES,
+                 factor: float = P99_FACTOR, floor: float = MIN_ADAPTIVE_TIMEOUT):
+        self.window = window
+        self.min_samples = min_samples
+        self.factor = factor
+        self.floor = floor
+        self._samples: dict[str, deque] = {}
+        # p99 se přepočítává jen po nových vzorcích
+        self._p99: dict[str, float | None] = {}
+        self.timeouts: dict[str, int] = {}
+
+    def record(self, key: str, seconds: float):
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+        self._p99.pop(key, None)
+
+    def timed_out(self, key: str):
+        """Po timeoutu se historie zahodí - další volání dostane znovu celý rozpočet."""
+        self.timeouts[key] = self.timeouts.get(key, 0) + 1
+        self._samples.pop(key, None)
+        self._p99.pop(key, None)
+
+    def p99(self, key: str) -> float | None:
+        if key not in self._p99:
+            samples = sorted(self._samples.get(key, ()))
+            self._p99[key] = samples[min(len(samples) - 1, math.ceil(len(samples) * 0.99) - 1)] \
+                if len(samples) >= self.min_samples else None
+        return self._p99[key]
+
+    def timeout(self, key: str, budget: float) -> float:
+        """Adaptivní timeout příkazu, nikdy víc než rozpočet volání."""
+        p99 = self.p99(key)
+        if p99 is None:
+            return budget
+        return min(budget, max(self.floor, p99 * self.factor))
+
+    def stats(self) -> dict:
+        return {
+            key: {
+                "samples": len(self._samples.get(key, ())),
+                "p99_ms": round(self.p99(key) * 1000.0, 2) if self.p99(key) is not None else None,
+                "timeouts": self.timeouts.get(key, 0)
+            }
+            for key in sorted(set(self._samples) | set(self.timeouts))
+        }
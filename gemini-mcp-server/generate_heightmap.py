@@ -1,21 +1,330 @@
-from PIL import Image
+#!/usr/bin/env python3
+"""
+Generátor heightmap skládaný z primitiv (kopce, hřbety, fraktální šum, eroze).
+Vše je vektorizované přes NumPy a počítá se po dlaždicích, takže velikost
+výstupu není omezená pamětí. Výstup: PNG 16-bit, R16/RAW (uint16), float32 .npy / .f32.
+
+Použití z příkazové řádky:
+    python generate_heightmap.py                       # jeden kopec 513x513 -> terrain/heightmap.png
+    python generate_heightmap.py --preset mountains --size 4097 --output world.r16
+    python generate_heightmap.py --spec vrstvy.json --output world.npy
+"""
+
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+
 import numpy as np
 
-# Create a 513x513 grayscale image
-width, height = 513, 513
-# Create a numpy array with a simple gradient
-array = np.zeros((height, width), dtype=np.uint8)
-for y in range(height):
-    for x in range(width):
-        # A simple hill in the middle
-        distance_to_center = np.sqrt((x - width/2)**2 + (y - height/2)**2)
-        # Normalize distance to 0-1
-        normalized_distance = distance_to_center / (np.sqrt(2) * width/2)
-        # Invert so center is high, edges are low, and scale to 0-255
-        value = 255 * (1 - normalized_distance)
-        array[y, x] = int(value)
-
-
-img = Image.fromarray(array, 'L')
-img.save('terrain/heightmap.png')
-print("Heightmap generated.")
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Výchozí velikost dlaždice (pixely na stranu) - určuje špičkovou spotřebu paměti
+DEFAULT_TILE_SIZE = 1024
+
+FORMATS = {".png": "uint16", ".r16": "uint16", ".raw": "uint16", ".npy": "float32", ".f32": "float32"}
+
+# Hotové sestavy vrstev pro rychlé vyzkoušení
+PRESETS = {
+    # Původní chování skriptu: kužel s vrcholem uprostřed a lineárním spádem k rohům
+    "hill": [{"type": "hill", "center": [0.5, 0.5], "radius": math.sqrt(2) / 2, "height": 1.0, "falloff": "linear"}],
+    "mountains": [
+        {"type": "noise", "octaves": 7, "frequency": 3.0, "amplitude": 0.6, "persistence": 0.5},
+        {"type": "ridge", "start": [0.15, 0.3], "end": [0.85, 0.65], "width": 0.12, "height": 0.5},
+        {"type": "hill", "center": [0.3, 0.75], "radius": 0.25, "height": 0.35},
+        {"type": "noise", "octaves": 4, "frequency": 12.0, "amplitude": 0.08, "ridged": True},
+        {"type": "erosion", "iterations": 12, "talus": 0.0015, "strength": 0.5}
+    ]
+}
+
+# Jednotkové gradienty Perlinova šumu
+_GRADIENTS = np.array([[math.cos(a), math.sin(a)] for a in np.arange(8) * math.pi / 4])
+
+
+class HeightmapSpecError(ValueError):
+    """Neplatná definice vrstev heightmapy."""
+
+
+# ----------------------------------------------------------------------------
+# Primitiva - funkce globálních normalizovaných souřadnic (u, v), takže dlaždice na sebe navazují
+# ----------------------------------------------------------------------------
+def _falloff(t, kind: str):
+    """t = vzdálenost / poloměr (0 ve středu); vrací 0..1."""
+    t = np.clip(t, 0.0, 1.0)
+    if kind == "linear":
+        return 1.0 - t
+    if kind == "gaussian":
+        return np.exp(-4.0 * t * t) * (1.0 - t)
+    if kind == "cosine":
+        return 0.5 + 0.5 * np.cos(np.pi * t)
+    raise HeightmapSpecError(f"Neznámý spád '{kind}' (linear, gaussian, cosine)")
+
+
+def hill(u, v, layer: dict, rng_seed: int):
+    cu, cv = layer.get("center", [0.5, 0.5])
+    radius = float(layer.get("radius", 0.3))
+    t = np.hypot(u - cu, v - cv) / radius
+    return float(layer.get("height", 1.0)) * _falloff(t, layer.get("falloff", "cosine"))
+
+
+def ridge(u, v, layer: dict, rng_seed: int):
+    """Hřbet podél úsečky start-end s profilem podle vzdálenosti od ní."""
+    (su, sv), (eu, ev) = layer.get("start", [0.2, 0.5]), layer.get("end", [0.8, 0.5])
+    du, dv = eu - su, ev - sv
+    length2 = du * du + dv * dv or 1e-12
+    s = np.clip(((u - su) * du + (v - sv) * dv) / length2, 0.0, 1.0)
+    distance = np.hypot(u - (su + s * du), v - (sv + s * dv))
+    return float(layer.get("height", 1.0)) * _falloff(distance / float(layer.get("width", 0.1)),
+                                                      layer.get("falloff", "cosine"))
+
+
+def _permutation(seed: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Permutační tabulka (zdvojená, bez maskování indexů) a složky gradientu pro každý hash."""
+    perm = np.random.default_rng(seed).permutation(256)
+    perm = np.concatenate([perm, perm])
+    grad = _GRADIENTS[perm & 7].astype(np.float32)
+    return perm, grad[:, 0].copy(), grad[:, 1].copy()
+
+
+def perlin(x, y, table):
+    """
+    2D gradientní (Perlinův) šum v bodech (x, y), hodnoty přibližně -1..1.
+    Pro mřížku předanou jako řádek x a sloupec y se vše kromě samotných rohů
+    počítá jen jednorozměrně a 2D pole vznikají až broadcastingem.
+    """
+    perm, grad_x, grad_y = table
+    xi = np.floor(x).astype(np.int64)
+    yi = np.floor(y).astype(np.int64)
+    xf = (x - xi).astype(np.float32)
+    yf = (y - yi).astype(np.float32)
+    px0 = perm[xi & 255]
+    px1 = perm[(xi + 1) & 255]
+    yi0 = yi & 255
+    yi1 = (yi + 1) & 255
+    xf1 = xf - 1
+    yf1 = yf - 1
+
+    def corner(px, yy, dx, dy):
+        h = px + yy
+        return grad_x[h] * dx + grad_y[h] * dy
+
+    fu = xf * xf * xf * (xf * (xf * 6 - 15) + 10)
+    fv = yf * yf * yf * (yf * (yf * 6 - 15) + 10)
+    c00 = corner(px0, yi0, xf, yf)
+    top = c00 + fu * (corner(px1, yi0, xf1, yf) - c00)
+    c01 = corner(px0, yi1, xf, yf1)
+    bottom = c01 + fu * (corner(px1, yi1, xf1, yf1) - c01)
+    return (top + fv * (bottom - top)) * np.float32(math.sqrt(2))
+
+
+def noise(u, v, layer: dict, rng_seed: int):
+    """Fraktální šum (fBm) z `octaves` oktáv; ridged=True dává ostré hřebeny."""
+    octaves = int(layer.get("octaves", 6))
+    frequency = float(layer.get("frequency", 4.0))
+    persistence = float(layer.get("persistence", 0.5))
+    lacunarity = float(layer.get("lacunarity", 2.0))
+    ridged = bool(layer.get("ridged", False))
+    seed = int(layer.get("seed", rng_seed))
+    total = np.zeros(np.broadcast(u, v).shape, dtype=np.float32)
+    amplitude, norm = 1.0, 0.0
+    for octave in range(octaves):
+        value = perlin(u * frequency, v * frequency, _permutation(seed + octave))
+        if ridged:
+            value = 1.0 - np.abs(value)
+            value = value * value * 2.0 - 1.0
+        total += amplitude * value
+        norm += amplitude
+        amplitude *= persistence
+        frequency *= lacunarity
+    # Výstup 0..1 kolem 0.5, aby šum šel skládat s kopci
+    return float(layer.get("amplitude", 1.0)) * (0.5 + 0.5 * total / norm)
+
+
+def thermal_erosion(heights: np.ndarray, iterations: int, talus: float, strength: float) -> np.ndarray:
+    """
+    Termální eroze: materiál se sesouvá k sousedům, kde převýšení přesahuje `talus`.
+    Každá iterace ovlivní okraj o jeden pixel - dlaždice proto potřebuje okraj `iterations`.
+    """
+    h = heights.copy()
+    for _ in range(iterations):
+        moved = np.zeros_like(h)
+        inner = h[1:-1, 1:-1]
+        for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            neighbour = h[1 + dy:h.shape[0] - 1 + dy, 1 + dx:h.shape[1] - 1 + dx]
+            excess = np.maximum(inner - neighbour - talus, 0.0) * (strength * 0.25)
+            moved[1:-1, 1:-1] -= excess
+            moved[1 + dy:h.shape[0] - 1 + dy, 1 + dx:h.shape[1] - 1 + dx] += excess
+        h += moved
+    return h
+
+
+PRIMITIVES = {"hill": hill, "ridge": ridge, "noise": noise}
+
+
+def validate_layers(layers: list[dict]):
+    if not layers:
+        raise HeightmapSpecError("Seznam vrstev je prázdný")
+    for index, layer in enumerate(layers):
+        kind = layer.get("type")
+        if kind not in PRIMITIVES and kind != "erosion":
+            raise HeightmapSpecError(f"Vrstva {index}: neznámý typ '{kind}' ({', '.join([*PRIMITIVES, 'erosion'])})")
+        if layer.get("blend", "add") not in ("add", "max", "multiply"):
+            raise HeightmapSpecError(f"Vrstva {index}: neznámé prolnutí '{layer['blend']}' (add, max, multiply)")
+
+
+def _erosion_halo(layers: list[dict]) -> int:
+    return sum(int(layer.get("iterations", 10)) for layer in layers if layer.get("type") == "erosion")
+
+
+def render_tile(layers: list[dict], width: int, height: int, x0: int, y0: int, tile_w: int, tile_h: int,
+                seed: int = 0) -> np.ndarray:
+    """
+    Spočítá výšky pixelů [y0:y0+tile_h, x0:x0+tile_w] celé mapy width x height.
+    Souřadnice jsou normalizované podle delší strany (kopce zůstanou kulaté).
+    """
+    halo = _erosion_halo(layers)
+    scale = 1.0 / max(width - 1, height - 1, 1)
+    xs = (np.arange(x0 - halo, x0 + tile_w + halo) * scale)[np.newaxis, :]
+    ys = (np.arange(y0 - halo, y0 + tile_h + halo) * scale)[:, np.newaxis]
+    heights = np.zeros((ys.shape[0], xs.shape[1]), dtype=np.float32)
+    for index, layer in enumerate(layers):
+        kind = layer["type"]
+        if kind == "erosion":
+            heights = thermal_erosion(heights, int(layer.get("iterations", 10)),
+                                      float(layer.get("talus", 0.002)), float(layer.get("strength", 0.5)))
+            continue
+        value = np.asarray(PRIMITIVES[kind](xs, ys, layer, seed + 1000 * index), dtype=np.float32)
+        blend = layer.get("blend", "add")
+        if blend == "max":
+            heights = np.maximum(heights, value)
+        elif blend == "multiply":
+            heights = heights * value
+        else:
+            heights = heights + value
+    return heights[halo:halo + tile_h, halo:halo + tile_w]
+
+
+# ----------------------------------------------------------------------------
+# Výstup po dlaždicích
+# ----------------------------------------------------------------------------
+def _tiles(width: int, height: int, tile_size: int):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield x0, y0, min(tile_size, width - x0), min(tile_size, height - y0)
+
+
+def generate(layers: list[dict], width: int, height: int, output_path: str, seed: int = 0,
+             normalize: bool = True, tile_size: int = DEFAULT_TILE_SIZE, progress=None) -> dict:
+    """
+    Vygeneruje heightmapu do souboru (formát podle přípony).
+
+    První průchod počítá dlaždice do float32 memory-mapped pole (u .npy přímo do výstupu)
+    a sleduje minimum/maximum, druhý průchod normalizuje na 0..1 a převádí po pásech
+    na uint16. Vrací statistiky (rozsah výšek před normalizací, čas).
+    """
+    validate_layers(layers)
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in FORMATS:
+        raise HeightmapSpecError(f"Nepodporovaný formát '{extension}' ({', '.join(FORMATS)})")
+    if extension == ".png" and Image is None:
+        raise HeightmapSpecError("Zápis PNG vyžaduje balíček Pillow (pip install Pillow)")
+    if width < 2 or height < 2:
+        raise HeightmapSpecError("Heightmapa musí mít alespoň 2x2 pixely")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    started = time.perf_counter()
+    temp_path = None
+    if extension == ".npy":
+        data = np.lib.format.open_memmap(output_path, mode="w+", dtype="<f4", shape=(height, width))
+    else:
+        handle, temp_path = tempfile.mkstemp(suffix=".f32", dir=os.path.dirname(os.path.abspath(output_path)))
+        os.close(handle)
+        data = np.memmap(temp_path, dtype="<f4", mode="w+", shape=(height, width))
+
+    try:
+        low, high = math.inf, -math.inf
+        tiles = list(_tiles(width, height, tile_size))
+        for done, (x0, y0, tile_w, tile_h) in enumerate(tiles, start=1):
+            tile = render_tile(layers, width, height, x0, y0, tile_w, tile_h, seed)
+            data[y0:y0 + tile_h, x0:x0 + tile_w] = tile
+            low, high = min(low, float(tile.min())), max(high, float(tile.max()))
+            if progress is not None:
+                progress(done, len(tiles))
+
+        if normalize:
+            offset, span = low, (high - low) or 1.0
+        else:
+            offset, span = 0.0, 1.0
+        rows_per_strip = max(1, (tile_size * tile_size) // width)
+
+        def strips():
+            for y0 in range(0, height, rows_per_strip):
+                yield y0, np.clip((data[y0:y0 + rows_per_strip] - np.float32(offset)) / np.float32(span), 0.0, 1.0)
+
+        if extension == ".npy":
+            for y0, strip in strips():
+                data[y0:y0 + strip.shape[0]] = strip
+            data.flush()
+        elif extension == ".f32":
+            with open(output_path, "wb") as f:
+                for _, strip in strips():
+                    f.write(strip.astype("<f4").tobytes())
+        elif extension in (".r16", ".raw"):
+            with open(output_path, "wb") as f:
+                for _, strip in strips():
+                    f.write(np.round(strip * 65535.0).astype("<u2").tobytes())
+        else:
+            # PNG se zapisuje vcelku - uint16 obraz (2 B/pixel) se musí vejít do paměti
+            image = np.empty((height, width), dtype=np.uint16)
+            for y0, strip in strips():
+                image[y0:y0 + strip.shape[0]] = np.round(strip * 65535.0)
+            Image.fromarray(image).save(output_path)
+    finally:
+        del data
+        if temp_path is not None:
+            os.remove(temp_path)
+
+    return {
+        "output": output_path,
+        "width": width,
+        "height": height,
+        "format": FORMATS[extension],
+        "raw_min": round(low, 6),
+        "raw_max": round(high, 6),
+        "tiles": len(tiles),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="terrain/heightmap.png", help="Výstupní soubor (.png, .r16, .raw, .npy, .f32)")
+    parser.add_argument("--size", type=int, help="Šířka i výška (např. 1025, 4097)")
+    parser.add_argument("--width", type=int, default=513)
+    parser.add_argument("--height", type=int, default=513)
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="hill")
+    parser.add_argument("--spec", help="JSON soubor se seznamem vrstev (přebíjí --preset)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-normalize", action="store_true", help="Neroztahovat výšky na celý rozsah 0..1")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE)
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            layers = json.load(f)
+    else:
+        layers = PRESETS[args.preset]
+    width = height = args.size if args.size else None
+    stats = generate(layers, width or args.width, height or args.height, args.output,
+                     seed=args.seed, normalize=not args.no_normalize, tile_size=args.tile_size)
+    print(f"Heightmap generated: {stats['output']} ({stats['width']}x{stats['height']}, "
+          f"{stats['format']}, {stats['tiles']} dlaždic, {stats['seconds']} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Perzistentní spojení na Godot MCP Bridge (TCP).
+Sdílený pool dlouhodobých spojení s kontrolou zdraví a exponenciálním backoffem,
+aby jednotlivá volání nástrojů neplatila TCP handshake a ukončení spojení.
+Příkazy nesou `request_id`, takže po jednom spojení může běžet více příkazů najednou.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger("godot-mcp.connection")
+
+# Příkazy bez vedlejších účinků - po přerušeném spojení je lze bezpečně poslat znovu.
+# Ostatní se neopakují: bridge je mohl provést a spojení spadlo až před odpovědí.
+READ_ONLY_COMMANDS = {
+    "get_scene_tree", "get_node_info", "get_prop", "get_collision_layers", "get_script_content",
+    "search_files", "list_dir", "terrain_get_height", "terrain_get_heights", "terrain_raycast",
+}
+
+
+class GodotConnectionError(Exception):
+    """Spojení s Godot bridge nelze navázat nebo bylo přerušeno."""
+
+
+class FrameReader:
+    """
+    Čtení odpovědí rámcovaných oddělovačem nového řádku (newline-delimited JSON).
+
+    Data se ukládají do jednoho rostoucího bytearray a hledání oddělovače
+    pokračuje tam, kde minule skončilo, takže se při každém chunku
+    nekopíruje celý dosud přijatý obsah.
+    """
+
+    DELIMITER = b"\n"
+
+    def __init__(self, reader: asyncio.StreamReader, chunk_size: int = 65536):
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._scanned = 0
+        # Kdy dorazil první bajt rozpracovaného a posledního vráceného rámce (metriky příjmu)
+        self._started: float | None = None
+        self.frame_started = 0.0
+
+    def _pop_frame(self) -> bytes | None:
+        idx = self._buffer.find(self.DELIMITER, self._scanned)
+        if idx < 0:
+            self._scanned = len(self._buffer)
+            return None
+        frame = bytes(self._buffer[:idx])
+        del self._buffer[:idx + 1]
+        self._scanned = 0
+        self.frame_started = self._started or time.perf_counter()
+        # Zbytek bufferu je začátek dalšího rámce, přišel s posledním chunkem
+        self._started = time.perf_counter() if self._buffer else None
+        return frame
+
+    async def read_frame(self) -> bytes | None:
+        """
+        Vrátí jeden kompletní rámec (bez oddělovače) hned, jak dorazí.
+        Při uzavření spojení vrátí zbytek bufferu jako poslední rámec, nebo None.
+        """
+        while True:
+            frame = self._pop_frame()
+            if frame is not None:
+                if frame.strip():
+                    return frame
+                continue
+            chunk = await self.reader.read(self.chunk_size)
+            if not chunk:
+                rest = bytes(self._buffer).strip()
+                self._buffer.clear()
+                self._scanned = 0
+                return rest or None
+            if self._started is None:
+                self._started = time.perf_counter()
+            self._buffer.extend(chunk)
+
+
+class _Connection:
+    """
+    Jedno multiplexované TCP spojení na bridge.
+
+    Každý odeslaný příkaz nese `request_id` a jediná čtecí úloha rozesílá
+    odpovědi čekajícím korutinám. Pokud bridge ID v odpovědi nevrací,
+    páruje se podle pořadí (bridge odpovídá ve stejném pořadí, v jakém četl).
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.frames = FrameReader(reader)
+        # Slovník zachovává pořadí vložení - první klíč je nejstarší nevyřízený požadavek
+        self.pending: dict[int, asyncio.Future] = {}
+        # request_id -> (čas prvního bajtu odpovědi, čas dekódování, velikost) pro metriky
+        self.arrivals: dict[int, tuple[float, float, int]] = {}
+        self.replies = 0
+        self.echoes_ids = False
+        self.closed = False
+        # Protistrana zavřela spojení bez chyby hned po odpovědi, na kterou nic dalšího nečekalo
+        self.closed_after_reply = False
+        self._idle_after_reply = False
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    def is_alive(self) -> bool:
+        """Kontrola zdraví - protistrana nezavřela spojení a transport je otevřený."""
+        return not self.closed and not self.writer.is_closing() and not self.reader.at_eof()
+
+    def _dispatch(self, response: Any, arrival: tuple[float, float, int]):
+        request_id = response.get("request_id") if isinstance(response, dict) else None
+        if request_id is not None and request_id in self.pending:
+            self.echoes_ids = True
+        elif self.pending:
+            request_id = next(iter(self.pending))
+        else:
+            logger.warning(f"Nevyžádaná odpověď od Godot: {str(response)[:200]}")
+            return
+        future = self.pending.pop(request_id)
+        self.replies += 1
+        self._idle_after_reply = not self.pending
+        # Požadavek mezitím mohl vypršet - odpověď pak jen zahodíme
+        if not future.done():
+            self.arrivals[request_id] = arrival
+            future.set_result(response)
+
+    async def _read_loop(self):
+        error = None
+        try:
+            while True:
+                frame = await self.frames.read_frame()
+                if frame is None:
+                    self.closed_after_reply = self._idle_after_reply and not self.pending
+                    break
+                try:
+                    response = json.loads(frame)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    logger.error(f"Raw response: {frame[:500]!r}")
+                    response = {"status": "error", "message": "Neplatná odpověď (JSON Error)"}
+                self._dispatch(response, (self.frames.frame_started, time.perf_counter(), len(frame) + 1))
+        except asyncio.CancelledError:
+            error = GodotConnectionError("Spojení uzavřeno")
+        except Exception as e:
+            error = GodotConnectionError(f"Spojení přerušeno: {e}")
+        finally:
+            self.closed = True
+            error = error or GodotConnectionError("Godot ukončil spojení")
+            pending, self.pending = self.pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.writer.close()
+
+    def send(self, request_id: int, payload: bytes) -> asyncio.Future:
+        """Zaregistruje čekající požadavek a zapíše ho do transportu."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self._idle_after_reply = False
+        self.writer.write(payload)
+        return future
+
+    def abandon(self, request_id: int):
+        """
+        Požadavek vypršel. Pokud bridge nevrací ID, necháme jeho místo ve frontě,
+        aby pozdní odpověď nebyla přiřazena následujícímu požadavku.
+        """
+        if self.echoes_ids:
+            self.pending.pop(request_id, None)
+
+    async def close(self):
+        self._reader_task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+class GodotConnectionPool:
+    """
+    Pool perzistentních multiplexovaných spojení na Godot bridge.
+
+    Souběžná volání nástrojů posílají příkazy po stejném spojení bez čekání
+    na předchozí odpovědi; nové spojení (až do `size`) se otevře jen tehdy,
+    když jsou všechna stávající obsazená. Mrtvá spojení se zahodí a otevře
+    se nové. Pokud se nelze připojit, další pokusy čekají s exponenciálním
+    backoffem, takže vypnutý editor neblokuje každé volání celým timeoutem.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 2, timeout: float = 15.0,
+                 backoff_initial: float = 0.25, backoff_max: float = 5.0):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._connections: list[_Connection] = []
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        # Bridge, který po každé odpovědi zavírá spojení, nelze multiplexovat
+        self._single_shot = False
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+    async def _connect(self, deadline: float) -> _Connection:
+        """Otevře nové spojení, respektuje backoff po předchozích selháních a deadline příkazu."""
+        wait = self._next_attempt - time.monotonic()
+        if wait > 0:
+            raise GodotConnectionError(f"Godot bridge nedostupný, další pokus za {wait:.1f} s")
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                timeout=max(0.0, deadline - time.monotonic())
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self._backoff = min(self._backoff * 2 or self.backoff_initial, self.backoff_max)
+            self._next_attempt = time.monotonic() + self._backoff
+            raise GodotConnectionError(f"Nelze se připojit k {self.host}:{self.port}: {e}") from e
+        if self._backoff and self._single_shot:
+            # Bridge byl nedostupný - po restartu může být jiný, chování se zjistí znovu
+            logger.info("Znovu připojeno k Godot bridge - multiplexing znovu zapnut")
+            self._single_shot = False
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+        logger.info(f"Nové spojení na Godot bridge {self.host}:{self.port}")
+        return _Connection(reader, writer)
+
+    async def _acquire(self, deadline: float) -> _Connection:
+        """Vrátí nejméně vytížené živé spojení, případně otevře nové."""
+        for conn in self._connections:
+            if not conn.is_alive():
+                self._note_closed(conn)
+        self._connections = [conn for conn in self._connections if conn.is_alive()]
+        if self._single_shot:
+            return await self._connect(deadline)
+        idle = [conn for conn in self._connections if not conn.pending]
+        if idle:
+            return idle[0]
+        if len(self._connections) < self.size:
+            async with self._connect_lock:
+                if len(self._connections) < self.size:
+                    conn = await self._connect(deadline)
+                    self._connections.append(conn)
+                    return conn
+        return min(self._connections, key=lambda conn: len(conn.pending))
+
+    def _note_closed(self, conn: _Connection):
+        """
+        Bridge, který zavřel spojení čistě po jediné odpovědi, když na spojení nic dalšího
+        nečekalo, zavírá spojení po každém příkazu. Jiná přerušení (restart editoru,
+        chyba sítě) multiplexing nevypínají.
+        """
+        if conn.closed_after_reply and conn.replies == 1 and not self._single_shot:
+            logger.warning("Godot bridge zavírá spojení po každé odpovědi - multiplexing vypnut")
+            self._single_shot = True
+
+    async def request(self, command: dict, timeout: float | None = None, timings: dict | None = None) -> dict:
+        """
+        Odešle příkaz s novým `request_id` a počká na odpověď, která mu patří.
+        `timeout` přepíše výchozí timeout poolu pro tento příkaz. Platí jako jeden deadline
+        pro navázání spojení, odeslání i čekání na odpověď.
+        Do `timings` se doplní doby fází (connect, send, godot, receive) a velikosti v bajtech.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        request_id = next(self._ids)
+        payload = (json.dumps({**command, "request_id": request_id}) + "\n").encode('utf-8')
+        # Spojení, které už odpovídalo, mohl bridge mezitím zavřít (restart, zavírání po odpovědi).
+        # Příkazy jen pro čtení se pak jednou zopakují na novém spojení, ostatní skončí chybou.
+        retry = command.get("cmd") in READ_ONLY_COMMANDS
+        for attempt in range(2):
+            started = time.perf_counter()
+            conn = await self._acquire(deadline)
+            acquired = time.perf_counter()
+            future = conn.send(request_id, payload)
+            try:
+                await asyncio.wait_for(conn.writer.drain(), timeout=max(0.0, deadline - time.monotonic()))
+                sent = time.perf_counter()
+                response = await asyncio.wait_for(future, timeout=max(0.0, deadline - time.monotonic()))
+                if timings is not None:
+                    first_byte, decoded, size = conn.arrivals.pop(request_id, (sent, sent, 0))
+                    first_byte = min(max(first_byte, sent), decoded)
+                    timings.update(connect=acquired - started, send=sent - acquired, godot=first_byte - sent,
+                                   receive=decoded - first_byte, bytes_out=len(payload), bytes_in=size)
+                conn.arrivals.pop(request_id, None)
+            except asyncio.TimeoutError:
+                conn.abandon(request_id)
+                logger.warning("Timeout při čtení odpovědi.")
+                return {"status": "error", "message": f"Timeout ({timeout:.1f} s) - Godot neodpověděl", "timed_out": True}
+            except (GodotConnectionError, ConnectionError, OSError) as e:
+                conn.pending.pop(request_id, None)
+                self._note_closed(conn)
+                if retry and attempt == 0 and conn.replies > 0:
+                    continue
+                if conn.replies > 0:
+                    raise GodotConnectionError(f"Spojení přerušeno, příkaz mohl i nemusel proběhnout: {e}") from e
+                if isinstance(e, GodotConnectionError):
+                    raise
+                raise GodotConnectionError(f"Spojení přerušeno: {e}") from e
+            finally:
+                if self._single_shot and conn not in self._connections:
+                    await conn.close()
+            if isinstance(response, dict):
+                response.pop("request_id", None)
+            return response
+        return {"status": "error", "message": "Žádná odpověď od serveru"}
+
+    async def close(self):
+        """Zavře všechna spojení (při ukončení serveru)."""
+        connections, self._connections = self._connections, []
+        for conn in connections:
+            await conn.close()
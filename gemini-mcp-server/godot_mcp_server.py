@@ -5,1011 +5,1077 @@ Umožňuje komplexní ovládání Godot Editoru přes Model Context Protocol.
 """
 
 import asyncio
+import contextvars
+import functools
 import json
 import logging
 import os
+import time
 from typing import Any
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
+from convert_heightmap import ConvertError, convert
+from deadlines import CallBudget, LatencyTracker, current_call, parse_timeouts
+from generate_heightmap import PRESETS, HeightmapSpecError, generate
+from godot_connection import GodotConnectionPool
+from jobs import JobLogHandler, JobManager, current_job
+from godot_tools import TOOL_FAMILIES, TOOL_REGISTRY, build_command
+from metrics import CallRecord, MetricsRegistry, current_record, json_size, phase, write_metrics
+from output_format import (OUTPUT_MODES, OutputOptions, OutputStore, current_output, keep_whole, mark_failed, render,
+                           result_failed, text_mode)
+from scene_mirror import SceneMirror, normalize_path, query_tree
+from server_logging import LOG_BACKUPS, LOG_MAX_BYTES, parse_levels, setup_logging
+from heightfield import HeightField, HeightmapError, np
+from terrain_cache import TerrainTileCache, resolve_path
+from terrain_import import RegionImportLog, import_target
+from terrain_instances import DEFAULT_CHUNK_SIZE, InstanceDataError, iter_chunks, load_instances, unpack_rows
+from terrain_sampling import decode_floats, encode_floats, extract_height, normals_from_samples, parse_points, sample_payload
+from terrain_scatter import scatter
 
-# Nastavení logování
-log_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server_debug.log')
-logging.basicConfig(level=logging.INFO, filename=log_file_path, filemode='w', encoding='utf-8')
+# Nastavení logování: JSON Lines přes frontu a vlákno zapisovače, rotace podle velikosti.
+# Úrovně subsystémů přes GODOT_MCP_LOG_LEVELS="connection=DEBUG,jobs=WARNING,mcp=WARNING".
+log_file_path = os.environ.get("GODOT_MCP_LOG_FILE") or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server_debug.log')
+log_pipeline = setup_logging(
+    log_file_path,
+    level=logging.getLevelName(os.environ.get("GODOT_MCP_LOG_LEVEL", "INFO").upper()),
+    levels=parse_levels(os.environ.get("GODOT_MCP_LOG_LEVELS", "")),
+    context={
+        "tool": lambda: call.tool if (call := current_call.get()) else None,
+        "job": lambda: job.id if (job := current_job.get()) else None,
+    },
+    max_bytes=int(os.environ.get("GODOT_MCP_LOG_MAX_BYTES", LOG_MAX_BYTES)),
+    backups=int(os.environ.get("GODOT_MCP_LOG_BACKUPS", LOG_BACKUPS))
+)
 logger = logging.getLogger("godot-mcp")
+# Záznamy vzniklé během úlohy se kopírují i do jejího logu (godot_job_logs)
+logger.addHandler(JobLogHandler())
 
 # Konfigurace Godot připojení
 GODOT_HOST = "localhost"
 GODOT_PORT = 4242
-# Zvýšený timeout pro operace jako 'bake_mesh' nebo načítání velkých scén
+# Výchozí rozpočet volání (nástroje bez rodiny v FAMILY_TIMEOUTS, příkazy mimo volání nástroje)
 TIMEOUT = 15.0  
+# Rozpočty volání podle rodiny nástrojů a výjimky pro jednotlivé nástroje (s).
+# Volání je může přepsat argumentem 'timeout', prostředí přes
+# GODOT_MCP_TIMEOUTS="terrain=60,godot_terrain_bake_mesh=300".
+FAMILY_TIMEOUTS = {
+    "nodes": 5.0,
+    "scene": 30.0,
+    "env": 5.0,
+    "physics": 10.0,
+    "filesystem": 10.0,
+    "terrain": 30.0,
+    "scripts": 10.0,
+    "ui2d": 5.0,
+    "server": TIMEOUT,
+}
+TOOL_TIMEOUTS = {
+    "godot_terrain_import_heightmap": 120.0,
+    "godot_terrain_task": 300.0,
+    "godot_terrain_bake_mesh": 180.0,
+    "godot_terrain_bake_navmesh": 300.0,
+    "godot_batch": 60.0,
+}
+# Příkazy, jejichž doba závisí na objemu dat - adaptivní timeout podle historie by je usekl
+NON_ADAPTIVE_COMMANDS = {
+    "batch", "load_scene", "save_scene", "terrain_import_heightmap", "terrain_task", "terrain_bake_mesh",
+    "terrain_bake_navmesh", "terrain_place_instances", "terrain_place_instances_packed", "terrain_get_heights",
+}
+for _key, _value in parse_timeouts(os.environ.get("GODOT_MCP_TIMEOUTS", "")).items():
+    (FAMILY_TIMEOUTS if _key in TOOL_FAMILIES else TOOL_TIMEOUTS)[_key] = _value
+# Počet perzistentních spojení sdílených všemi voláními nástrojů
+POOL_SIZE = 2
+# Počet částí hromadného rozmístění instancí odeslaných současně (bez čekání na odpověď)
+BULK_IN_FLIGHT = 4
+# Samostatná spojení pro dlouhé úlohy - čekání na bake neobsazuje pool rychlých nástrojů
+JOB_POOL_SIZE = 2
+# Timeouty úloh podle nástroje (s); ostatní nástroje spuštěné jako úloha mají DEFAULT_JOB_TIMEOUT
+JOB_TIMEOUTS = {
+    "godot_terrain_bake_mesh": 600.0,
+    "godot_terrain_bake_navmesh": 900.0,
+    "godot_terrain_task": 900.0,
+    "godot_terrain_generate_heightmap": 1800.0,
+    "godot_terrain_convert_heightmap": 1800.0,
+    "godot_terrain_scatter": 600.0,
+}
+DEFAULT_JOB_TIMEOUT = 300.0
+# Nejvyšší počet bodů dotazovaných po jednom, pokud bridge nezná dávkový dotaz na výšky
+HEIGHT_FALLBACK_LIMIT = 2000
+# Složka Godot projektu pro převod cest res:// na lokální soubory (cache výšek terénu)
+GODOT_PROJECT_DIR = os.environ.get("GODOT_PROJECT_DIR", "")
+# Úložiště dlaždic lokální cache výšek terénu (podsložka pro každý projekt, jen po dobu běhu serveru)
+TERRAIN_CACHE_DIR = os.environ.get(
+    "GODOT_MCP_TERRAIN_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "terrain_cache")
+)
+# Rodiny nástrojů nabízené v list_tools, např. "nodes,scene,terrain" (prázdné = všechny)
+ENABLED_FAMILIES = [f.strip() for f in os.environ.get("GODOT_MCP_TOOL_FAMILIES", "").split(",") if f.strip()]
+# Soubor s metrikami nástrojů (.json = JSON, jinak Prometheus text), průběžně přepisovaný
+METRICS_FILE = os.environ.get("GODOT_MCP_METRICS_FILE", "")
+METRICS_DUMP_INTERVAL = 60.0
+# Výchozí formát výsledků (text | json | structured), volání ho může přepsat argumentem 'output'
+OUTPUT_MODE = os.environ.get("GODOT_MCP_OUTPUT_MODE", "text")
+# Rozpočet velikosti výsledku v B (zhruba 4 B na token), větší výsledek se zkrátí s kurzorem
+# pokračování; 0 = bez omezení. Volání ho může přepsat argumentem 'max_output_bytes'.
+OUTPUT_BUDGET = int(os.environ.get("GODOT_MCP_OUTPUT_BUDGET", 256 * 1024))
+# Nejmenší povolený rozpočet (kurzor i patička se musí vejít)
+MIN_OUTPUT_BUDGET = 256
 
 # Vytvoření MCP serveru
 app = Server("godot-editor")
+godot_pool = GodotConnectionPool(GODOT_HOST, GODOT_PORT, size=POOL_SIZE, timeout=TIMEOUT)
+job_pool = GodotConnectionPool(GODOT_HOST, GODOT_PORT, size=JOB_POOL_SIZE, timeout=DEFAULT_JOB_TIMEOUT)
+scene_mirror = SceneMirror()
+latencies = LatencyTracker()
+metrics = MetricsRegistry()
+outputs = OutputStore()
+# Běžící měření velikosti argumentů (silné reference, aby je GC nezrušil)
+size_tasks: set[asyncio.Task] = set()
+terrain_cache = TerrainTileCache(TERRAIN_CACHE_DIR, GODOT_PROJECT_DIR)
+region_imports = RegionImportLog(terrain_cache)
 
 
 async def send_godot_command(command: dict) -> dict:
     """
-    Asynchronně odešle příkaz na Godot TCP server s oddělovačem nového řádku.
+    Asynchronně odešle příkaz na Godot TCP server přes sdílený pool perzistentních spojení.
+    Zrcadlo scény si uloží odpovědi čtení a zneplatní části dotčené změnami.
+    Příkazy dlouhých úloh jdou přes vlastní pool s timeoutem zbývajícím do konce úlohy,
+    ostatní dostanou adaptivní timeout podle historie latencí, nejvýše zbytek rozpočtu volání.
     """
+    generation = scene_mirror.begin(command)
+    cmd = command.get("cmd", "")
+    job = current_job.get()
+    call = current_call.get()
+    budget = call.remaining() if call is not None else TIMEOUT
+    adaptive = cmd not in NON_ADAPTIVE_COMMANDS and not (call is not None and call.explicit)
+    timeout = latencies.timeout(cmd, budget) if adaptive else budget
+    started = time.monotonic()
+    answered = True
+    timings = {}
     try:
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(GODOT_HOST, GODOT_PORT),
-            timeout=TIMEOUT
-        )
-        
-        # PŘIDÁNÍ ODDĚLOVAČE \n (zásadní pro stabilitu)
-        json_data = json.dumps(command) + "\n"
-        writer.write(json_data.encode('utf-8'))
-        await writer.drain()
-        
-        # Příjem odpovědi - čteme dokud nenarazíme na konec nebo validní JSON
-        # Pro zjednodušení v Pythonu čteme stream, Godot by měl také odpovídat s ukončením spojení nebo delimiterem
-        response_data = b""
-        try:
-            while True:
-                chunk = await asyncio.wait_for(reader.read(4096), timeout=TIMEOUT)
-                if not chunk:
-                    break
-                response_data += chunk
-                
-                # Zkusíme dekódovat, pokud server uzavřel spojení
-        except asyncio.TimeoutError:
-             logger.warning("Timeout při čtení odpovědi.")
-        
-        writer.close()
-        await writer.wait_closed()
-        
-        if response_data:
-            try:
-                return json.loads(response_data.decode('utf-8'))
-            except json.JSONDecodeError:
-                logger.error(f"Raw response: {response_data}")
-                return {"status": "error", "message": "Neplatná odpověď (JSON Error)"}
+        if job is not None:
+            job.log(f"Godot: {cmd}")
+            timeout = job.remaining()
+            response = await job_pool.request(command, timeout=timeout, timings=timings)
         else:
-            return {"status": "error", "message": "Žádná odpověď od serveru"}
-            
+            response = await godot_pool.request(command, timeout=timeout, timings=timings)
     except Exception as e:
         logger.error(f"Chyba komunikace: {e}")
-        return {"status": "error", "message": f"Chyba komunikace: {str(e)}"}
+        response = {"status": "error", "message": f"Chyba komunikace: {str(e)}"}
+        answered = False
+    if response.pop("timed_out", False):
+        latencies.timed_out(cmd)
+        if job is None and timeout < budget:
+            response["message"] += (f" (adaptivní timeout podle p99 latence, rozpočet {budget:.1f} s - "
+                                    f"opakování dostane celý rozpočet, případně zadejte 'timeout')")
+    elif answered:
+        latencies.record(cmd, time.monotonic() - started)
+    record = current_record.get()
+    if record is not None:
+        record.add_command(timings)
+    scene_mirror.finish(command, response, generation)
+    if terrain_cache.tracks(command):
+        # Import může číst velký soubor - plnění cache neblokuje ostatní volání
+        try:
+            await asyncio.to_thread(terrain_cache.finish, command, response)
+        except Exception as e:
+            logger.error(f"Aktualizace cache výšek selhala: {e}")
+    if region_imports.tracks(command):
+        region_imports.finish(command)
+    return response
+
+
+@functools.cache
+def all_tools() -> tuple[Tool, ...]:
+    """
+    Tool objekty se z registru sestaví jednou (při prvním dotazu) a dál se vrací z cache.
+    """
+    return tuple(
+        Tool(name=spec["name"], description=spec["description"], inputSchema=spec["input_schema"])
+        for spec in TOOL_REGISTRY.values()
+    )
+
+
+@functools.cache
+def tool_catalog() -> tuple[Tool, ...]:
+    """
+    Katalog nabízený v list_tools - omezený na ENABLED_FAMILIES, rodina 'server' je vždy součástí.
+    """
+    return tuple(
+        tool for tool in all_tools()
+        if not ENABLED_FAMILIES or TOOL_REGISTRY[tool.name]["family"] in ENABLED_FAMILIES + ["server"]
+    )
+
+
+@functools.cache
+def tools_by_family() -> dict[str, tuple[Tool, ...]]:
+    """
+    Celý registr rozdělený podle rodin - godot_list_tools umožní dohledat
+    i nástroje z rodin, které list_tools kvůli ENABLED_FAMILIES nenabízí.
+    """
+    families = {family: [] for family in TOOL_FAMILIES}
+    for tool in all_tools():
+        families[TOOL_REGISTRY[tool.name]["family"]].append(tool)
+    return {family: tuple(tools) for family, tools in families.items() if tools}
 
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """
-    Definuje seznam všech dostupných nástrojů pro Gemini CLI.
-    """
-    return [
-        # ====================================================================
-        # ZÁKLADNÍ PRÁCE S UZLY (NODE OPERATIONS)
-        # ====================================================================
-        Tool(
-            name="godot_search_files",
-            description="Vyhledá soubory v projektu podle názvu nebo přípony. POUŽIJTE PŘED VYTVÁŘENÍM NOVÝCH SOUBORŮ pro ověření existence nebo pro nalezení assets (textury, modely, skripty).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "Hledaný text v názvu souboru (např. 'player', 'grass'). Prázdné = vše."},
-                    "extensions": {"type": "array", "items": {"type": "string"}, "description": "Filtr přípon (např. ['.gd', '.tscn', '.png'])"},
-                    "root": {"type": "string", "default": "res://", "description": "Kde začít hledat"}
-                }
-            }
-        ),
-        Tool(
-            name="godot_create_node",
-            description="Vytvoří nový node v aktivní scéně Godot Editoru.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_type": {
-                        "type": "string",
-                        "description": "Typ node (např. 'Node3D', 'MeshInstance3D', 'Camera3D', 'DirectionalLight3D')"
-                    },
-                    "name": {
-                        "type": "string",
-                        "description": "Název nového node"
-                    },
-                    "parent_path": {
-                        "type": "string",
-                        "description": "Cesta k parent node (prázdné = root scény)",
-                        "default": ""
-                    }
-                },
-                "required": ["node_type", "name"]
-            }
-        ),
-        Tool(
-            name="godot_set_property",
-            description="Nastaví vlastnost existujícího node.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {
-                        "type": "string",
-                        "description": "Cesta k node (např. 'Player/Camera')"
-                    },
-                    "property_name": {
-                        "type": "string",
-                        "description": "Název vlastnosti (position, rotation, scale, visible, mesh...)"
-                    },
-                    "value": {
-                        "description": "Hodnota - číslo, seznam [x,y,z], boolean, string"
-                    }
-                },
-                "required": ["node_path", "property_name", "value"]
-            }
-        ),
-        Tool(
-            name="godot_reparent_node",
-            description="Přesune node pod jiného rodiče (Reparent).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k node, který se má přesunout"},
-                    "new_parent_path": {"type": "string", "description": "Cesta k novému rodiči"},
-                    "keep_global_transform": {"type": "boolean", "description": "Zachovat globální pozici?", "default": True}
-                },
-                "required": ["node_path", "new_parent_path"]
-            }
-        ),
-        Tool(
-            name="godot_duplicate_node",
-            description="Duplikuje existující node.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k originálnímu node"},
-                    "new_name": {"type": "string", "description": "Název pro kopii (volitelné)"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_delete_node",
-            description="Smaže node ze scény.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k node"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_rename_node",
-            description="Přejmenuje node.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Stará cesta/název"},
-                    "new_name": {"type": "string", "description": "Nový název"}
-                },
-                "required": ["node_path", "new_name"]
-            }
-        ),
-        Tool(
-            name="godot_get_node_info",
-            description="Získá detailní informace o konkrétním node (pozice, děti, skupiny, připojený skript).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k node"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-
-        # ====================================================================
-        # PRÁCE SE SCÉNAMI (SCENE MANAGEMENT)
-        # ====================================================================
-        Tool(
-            name="godot_get_scene_tree",
-            description="Získá kompletní strukturu aktuální scény jako JSON strom.",
-            inputSchema={"type": "object", "properties": {}}
-        ),
-        Tool(
-            name="godot_save_scene",
-            description="Uloží aktuální scénu. BEZPEČNOSTNÍ FUNKCE: Pokud zadáte 'save_path' a soubor již existuje, systém ho nepřepíše, ale automaticky vytvoří kopii s číselným suffixem (např. level_1.tscn).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "save_path": {
-                        "type": "string", 
-                        "description": "Cesta pro uložení (res://scenes/level.tscn). Pokud necháte prázdné, přepíše se aktuálně otevřený soubor bez změny názvu.", 
-                        "default": ""
-                    }
-                }
-            }
-        ),
-        Tool(
-            name="godot_create_scene",
-            description="Vytvoří zcela novou scénu a otevře ji v editoru.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "save_path": {"type": "string", "description": "Cesta pro uložení (např. res://scenes/NewLevel.tscn)"},
-                    "root_type": {"type": "string", "description": "Typ root node", "default": "Node3D"},
-                    "name": {"type": "string", "description": "Název root node", "default": "SceneRoot"}
-                },
-                "required": ["save_path"]
-            }
-        ),
-        Tool(
-            name="godot_load_scene",
-            description="Otevře existující scénu v editoru.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Cesta k souboru .tscn"}
-                },
-                "required": ["path"]
-            }
-        ),
-        Tool(
-            name="godot_add_child_scene",
-            description="Instanciuje jinou scénu (.tscn) jako potomka do aktuální scény.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "scene_path": {"type": "string", "description": "Cesta k souboru scény (res://...)"},
-                    "parent_path": {"type": "string", "description": "Kam přidat (prázdné = root scény)"},
-                    "name": {"type": "string", "description": "Název instance (volitelné)"}
-                },
-                "required": ["scene_path"]
-            }
-        ),
-        Tool(
-            name="godot_fix_ownership",
-            description="Opraví vlastnictví node (Owner) rekurzivně. DŮLEŽITÉ volat před uložením scény, pokud jste vytvářeli složitější strukturu skriptem.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "root_path": {"type": "string", "description": "Cesta k uzlu, od kterého se má opravit vlastnictví"}
-                },
-                "required": ["root_path"]
-            }
-        ),
-
-        Tool(
-            name="godot_env_create",
-            description="Vytvoří WorldEnvironment (pokud neexistuje) a inicializuje v něm Environment a CameraAttributesPractical.",
-            inputSchema={"type": "object", "properties": {}}
-        ),
-        Tool(
-            name="godot_env_set_background",
-            description="Nastaví pozadí scény (Obloha, Barva).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "mode": {"type": "string", "enum": ["clear_color", "custom_color", "sky", "canvas"], "description": "Typ pozadí."},
-                    "color": {"type": "array", "items": {"type": "number"}, "description": "[r, g, b] pro custom_color"},
-                    "energy": {"type": "number", "description": "Multiplikátor energie (jasu). Default: 1.0"}
-                },
-                "required": ["mode"]
-            }
-        ),
-        Tool(
-            name="godot_env_set_effect",
-            description="Pokročilá konfigurace efektů Environment.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "effect_type": {
-                        "type": "string",
-                        "enum": ["tonemap", "glow", "fog", "volumetric_fog", "ssao", "ssil", "sdfgi", "adjustment"],
-                        "description": "Kterou sekci Environmentu upravit."
-                    },
-                    "enabled": {"type": "boolean", "description": "Zapnout/Vypnout efekt (netýká se tonemap)."},
-                    "params": {
-                        "type": "object",
-                        "description": "Klíč-hodnota dle dokumentace Godot.\nGlow: intensity, strength, bloom, blend_mode (0-4)\nFog: density, light_color, sun_scatter, height_density\nVolumetricFog: density, albedo, emission, length\nSSAO: radius, intensity, power, detail\nSDFGI: bounce_feedback, cascades, min_cell_size\nAdjustment: brightness, contrast, saturation\nTonemap: mode (0=Linear, 2=Filmic, 3=ACES), exposure, white"
-                    }
-                },
-                "required": ["effect_type"]
-            }
-        ),
-        Tool(
-            name="godot_env_camera_attributes",
-            description="Nastaví CameraAttributes (Expozice, Auto-Exposure).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "auto_exposure": {"type": "boolean", "description": "Zapnout automatickou expozici?"},
-                    "exposure_multiplier": {"type": "number", "description": "Základní jas (Default 1.0)"},
-                    "exposure_sensitivity": {"type": "number", "description": "ISO citlivost (Default 100.0)"},
-                    "auto_exposure_speed": {"type": "number", "description": "Rychlost adaptace oka (Default 0.5)"},
-                    "auto_exposure_scale": {"type": "number", "description": "Škála efektu (Default 0.4)"}
-                }
-            }
-        ),
-
-        # ====================================================================
-        # MESH A FYZIKA (MESH & PHYSICS)
-        # ====================================================================
-        Tool(
-            name="godot_set_mesh",
-            description="Vytvoří a nastaví Mesh (tvar) pro MeshInstance3D.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k MeshInstance3D"},
-                    "mesh_type": {"type": "string", "description": "BoxMesh, SphereMesh, CapsuleMesh, CylinderMesh, PlaneMesh, PrismMesh, TorusMesh"},
-                    "params": {
-                        "type": "object",
-                        "description": "Parametry meshe (např. size=[1,1,1], radius=1.0, height=2.0...)"
-                    }
-                },
-                "required": ["node_path", "mesh_type"]
-            }
-        ),
-        Tool(
-            name="godot_add_collision_shape",
-            description="Přidá CollisionShape a nastaví mu tvar. Automaticky vytvoří node i shape.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "parent_path": {"type": "string", "description": "Rodič (např. RigidBody3D, StaticBody3D, Area3D)"},
-                    "shape_type": {"type": "string", "description": "BoxShape3D, SphereShape3D, CapsuleShape3D, CylinderShape3D, RectangleShape2D..."},
-                    "params": {"type": "object", "description": "Parametry (size, radius, height)"},
-                    "name": {"type": "string", "default": "CollisionShape"}
-                },
-                "required": ["parent_path", "shape_type"]
-            }
-        ),
-        Tool(
-            name="godot_get_collision_layers",
-            description="Vrátí mapu nastavených fyzikálních vrstev (Physics Layers).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "type": {"type": "string", "enum": ["2D", "3D"], "default": "3D", "description": "Typ fyziky (2D nebo 3D)."}
-                }
-            }
-        ),
-        Tool(
-            name="godot_set_collision_layer_name",
-            description="Přejmenuje, vytvoří nebo smaže název fyzikální vrstvy v Project Settings.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "index": {"type": "integer", "minimum": 1, "maximum": 32, "description": "Číslo vrstvy (1-32)."},
-                    "name": {"type": "string", "description": "Nový název vrstvy. Pro smazání/resetování nechte prázdné."},
-                    "type": {"type": "string", "enum": ["2D", "3D"], "default": "3D"}
-                },
-                "required": ["index", "name"]
-            }
-        ),
-        Tool(
-            name="godot_set_physics_layer",
-            description="Nastaví Collision Layer nebo Mask na konkrétním node.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k node"},
-                    "type": {"type": "string", "description": "'layer' (objekt je v této vrstvě) nebo 'mask' (objekt skenuje tuto vrstvu)"},
-                    "layer_index": {"type": "integer", "description": "Číslo vrstvy (1-32)"},
-                    "enabled": {"type": "boolean", "description": "Zapnout (True) nebo vypnout (False)", "default": True}
-                },
-                "required": ["node_path", "type", "layer_index"]
-            }
-        ),
-
-# ====================================================================
-        # SOUBOROVÝ SYSTÉM (FILESYSTEM)
-        # ====================================================================
-        Tool(
-            name="godot_list_files",
-            description="Vypíše soubory a složky v zadané cestě. Užitečné pro nalezení assets (.obj, .png, .tscn) nebo kontrolu struktury projektu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Cesta (res://...)", "default": "res://"},
-                    "recursive": {"type": "boolean", "description": "Prohledat i podsložky?", "default": False},
-                    "extensions": {"type": "array", "items": {"type": "string"}, "description": "Filtr přípon (např. ['.tscn', '.gd', '.tres'])"}
-                }
-            }
-        ),
-        Tool(
-            name="godot_make_directory",
-            description="Vytvoří novou složku (vytváří i chybějící rodičovské složky).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Cesta nové složky (res://assets/models)"}
-                },
-                "required": ["path"]
-            }
-        ),
-        Tool(
-            name="godot_manage_file",
-            description="Přejmenuje, přesune nebo smaže soubor či složku.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "action": {"type": "string", "enum": ["rename", "move", "delete"], "description": "Akce, kterou chcete provést"},
-                    "path": {"type": "string", "description": "Cesta k souboru/složce"},
-                    "new_path": {"type": "string", "description": "Nová cesta (pouze pro rename/move)"}
-                },
-                "required": ["action", "path"]
-            }
-        ),
-
-        # ====================================================================
-        # TERRAIN 3D (PLUGIN INTEGRATION)
-        # ====================================================================
-        Tool(
-            name="godot_terrain_create",
-            description="Vytvoří Terrain3D (v1.0+). POZOR: Parametr 'storage_path' je povinný pro správné ukládání dat.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "default": "Terrain3D"},
-                    "parent_path": {"type": "string"},
-                    "storage_path": {
-                        "type": "string",
-                        "description": "Cesta k ADRESÁŘI pro data (např. res://terrain_data). MUSÍ BÝT VYPLNĚNO.",
-                        "default": "res://terrain_data"
-                    }
-                },
-                "required": ["storage_path"]
-            }
-        ),
-	Tool(
-            name="godot_terrain_import_heightmap",
-            description="Importuje obrázek (PNG/EXR/RAW) jako heightmapu do Terrain3D. Modifikuje výšku terénu na dané pozici.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D uzlu"},
-                    "file_path": {"type": "string", "description": "Absolutní cesta k obrázku (res://...)"},
-                    "min_height": {"type": "number", "description": "Nejnižší bod (černá barva). Default: 0.0", "default": 0.0},
-                    "max_height": {"type": "number", "description": "Nejvyšší bod (bílá barva). Default: 100.0", "default": 100.0},
-                    "position": {
-                        "type": "array", 
-                        "items": {"type": "number"},
-                        "description": "Pozice [x, y, z] kde se má heightmapa aplikovat. Default: [0,0,0]",
-                        "default": [0, 0, 0]
-                    }
-                },
-                "required": ["node_path", "file_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_configure",
-            description="Konfiguruje hlavní parametry terénu (velikost, LOD, mezery mezi vertexy).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
-                    "vertex_spacing": {"type": "number", "description": "Vzdálenost mezi vrcholy (škálování terénu). Default: 1.0"},
-                    "mesh_size": {"type": "integer", "description": "Velikost meshe (kvalita). Default: 48"},
-                    "mesh_lods": {"type": "integer", "description": "Počet LOD úrovní. Default: 7"},
-                    "region_size": {"type": "integer", "description": "Velikost regionu (64, 128, 256, 512, 1024). Default: 256"},
-                    "cull_margin": {"type": "number", "description": "Extra margin pro vykreslování"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_physics",
-            description="Nastavuje kolize a fyziku pro Terrain3D.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
-                    "collision_enabled": {"type": "boolean", "description": "Zapnout/vypnout kolize"},
-                    "layer": {"type": "integer", "description": "Collision Layer (bitmask hodnota)"},
-                    "mask": {"type": "integer", "description": "Collision Mask (bitmask hodnota)"},
-                    "priority": {"type": "number", "description": "Priorita kolize. Default: 1.0"},
-                    "radius": {"type": "integer", "description": "Collision Radius. Default: 64"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_rendering",
-            description="Nastavuje renderovací vlastnosti terénu (stíny, GI).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
-                    "cast_shadows": {"type": "integer", "description": "0=Off, 1=On, 2=DoubleSided, 3=ShadowsOnly. Default: 1"},
-                    "gi_mode": {"type": "integer", "description": "0=Disabled, 1=Static, 2=Dynamic. Default: 1"},
-                    "render_layers": {"type": "integer", "description": "Visual Layers (bitmask). Default: 1"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_task",
-            description="Spustí pokročilý Import/Export úkol pro Terrain3D (Heightmapy, ColorMapy, RAW/R16).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "task_type": {"type": "string", "enum": ["import", "export"]},
-                    "map_type": {"type": "string", "enum": ["height", "color", "control"], "description": "Typ mapy."},
-                    "file_path": {"type": "string", "description": "Cesta k souboru (res://... nebo absolutní C:/...)"},
-                    "data_dir": {"type": "string", "description": "Složka s daty terénu (res://terrain_data)."},
-                    "params": {
-                        "type": "object",
-                        "description": "Parametry pro import/export.\nImport: position [x,y,z], scale, offset, min_height, max_height, r16_dim [w,h]\nExport: (žádné speciální parametry)"
-                    }
-                },
-                "required": ["task_type", "map_type", "file_path", "data_dir"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_add_texture",
-            description="Přidá sadu textur (Albedo + Normal) do palety terénu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "name": {"type": "string", "description": "Název pro identifikaci (např. 'Grass_Green')"},
-                    "albedo_path": {"type": "string", "description": "Cesta k albedo textuře"},
-                    "normal_path": {"type": "string", "description": "Cesta k normal mapě (volitelné)"},
-                    "uv_scale": {"type": "number", "default": 1.0}
-                },
-                "required": ["node_path", "albedo_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_add_mesh",
-            description="Registruje 3D model (strom, kámen, tráva) do systému terénu pro pozdější instancování.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "mesh_path": {"type": "string", "description": "Cesta k .obj, .glb, .tscn souboru"},
-                    "name": {"type": "string", "description": "Název (např. 'PineTree')"},
-                    "scale_variance": {"type": "number", "default": 0.2, "description": "Náhodná variace velikosti"}
-                },
-                "required": ["node_path", "mesh_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_place_instances",
-            description="Rozmístí instance (stromy/trávu) na terén na zadané souřadnice.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "mesh_id": {"type": "integer", "description": "ID meshu (vráceno z add_mesh, startuje od 0)"},
-                    "positions": {
-                        "type": "array",
-                        "items": {"type": "array", "items": {"type": "number"}},
-                        "description": "Seznam pozic [[x,y,z], [x,y,z], ...]"
-                    },
-                    "auto_height": {"type": "boolean", "default": True, "description": "Automaticky přichytit k zemi (ignoruje Y v pozici)"}
-                },
-                "required": ["node_path", "mesh_id", "positions"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_bake_navmesh",
-            description="Vypeče Navigační Mesh pro terén (umožní AI agentům chodit).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_raycast",
-            description="Zjistí výšku a pozici na terénu (Physics-free raycast).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "x": {"type": "number"},
-                    "z": {"type": "number"}
-                },
-                "required": ["node_path", "x", "z"]
-            }
-        ),
-        Tool(
-            name="godot_2d_create",
-            description="Vytvoří 2D uzel (Sprite2D, Node2D, Label, Control).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "type": {"type": "string", "description": "Typ uzlu (např. Sprite2D, Label, Node2D)"},
-                    "name": {"type": "string"},
-                    "parent_path": {"type": "string"},
-                    "position": {"type": "array", "items": {"type": "number"}, "description": "[x, y]"},
-                    "texture_path": {"type": "string", "description": "Pouze pro Sprite2D: cesta k obrázku"},
-                    "text": {"type": "string", "description": "Pouze pro Label/Button: text"}
-                },
-                "required": ["type", "name"]
-            }
-        ),
-        Tool(
-            name="godot_2d_transform",
-            description="Nastaví pozici, rotaci a měřítko pro 2D uzel.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "position": {"type": "array", "items": {"type": "number"}, "description": "[x, y]"},
-                    "rotation": {"type": "number", "description": "Úhel ve stupních"},
-                    "scale": {"type": "array", "items": {"type": "number"}, "description": "[x, y]"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_visuals",
-            description="Ovládá vizuální debugování terénu (mřížky, wireframe, heightmapy).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
-                    "show_grid": {"type": "boolean", "description": "Zobrazit mřížku regionů"},
-                    "show_instances": {"type": "boolean", "description": "Zobrazit instancované meshe"},
-                    "show_heightmap": {"type": "boolean", "description": "Debug zobrazení heightmapy"},
-                    "show_colormap": {"type": "boolean", "description": "Debug zobrazení colormapy"},
-                    "debug_level": {"type": "integer", "description": "0=Errors, 1=Info, 2=Debug, 3=Extreme"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_bake_mesh",
-            description="Vypeče terén do statického ArrayMesh (pro navmesh nebo export).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
-                    "lod": {"type": "integer", "description": "Úroveň detailu (0-8). Default: 4"},
-                    "save_path": {"type": "string", "description": "Cesta pro uložení .res souboru (např. res://terrain_mesh.res)"}
-                },
-                "required": ["node_path"]
-            }
-        ),
-        Tool(
-            name="godot_terrain_get_height",
-            description="Získá výšku terénu na dané pozici (X, Z).",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
-                    "x": {"type": "number", "description": "Souřadnice X"},
-                    "z": {"type": "number", "description": "Souřadnice Z"}
-                },
-                "required": ["node_path", "x", "z"]
-            }
-        ),
-        Tool(
-            name="godot_set_property",
-            description="Nastaví vlastnost uzlu. NYNÍ PODPORUJE VNOŘENÉ RESOURCES pomocí dvojtečky (např. 'shape:size', 'mesh:material:albedo_color').",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "property_name": {"type": "string", "description": "Název (např. 'position' nebo 'shape:size')"},
-                    "value": {"description": "Hodnota"}
-                },
-                "required": ["node_path", "property_name", "value"]
-            }
-        ),
-        Tool(
-            name="godot_get_property",
-            description="Přečte aktuální hodnotu vlastnosti (i vnořené). Užitečné pro ověření stavu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "property_name": {"type": "string"}
-                },
-                "required": ["node_path", "property_name"]
-            }
-        ),
-        Tool(
-            name="godot_call_method",
-            description="Zavolá libovolnou metodu na uzlu (např. 'look_at', 'apply_impulse').",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "method_name": {"type": "string"},
-                    "args": {"type": "array", "items": {}, "description": "Seznam argumentů funkce", "default": []}
-                },
-                "required": ["node_path", "method_name"]
-            }
-        ),
-        Tool(
-            name="godot_connect_signal",
-            description="Propojí signál z jednoho uzlu na metodu jiného uzlu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "source_path": {"type": "string", "description": "Kdo vysílá (např. Button)"},
-                    "signal_name": {"type": "string", "description": "Název signálu (např. 'pressed')"},
-                    "target_path": {"type": "string", "description": "Kdo poslouchá"},
-                    "method_name": {"type": "string", "description": "Funkce, co se spustí (např. '_on_button_pressed')"}
-                },
-                "required": ["source_path", "signal_name", "target_path", "method_name"]
-            }
-        ),
-        Tool(
-            name="godot_ui_set_layout",
-            description="Nastaví UI Layout Preset (kotvení) pro Control uzly (např. 'full_rect', 'center', 'top_left').",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string"},
-                    "preset": {
-                        "type": "string",
-                        "enum": ["top_left", "top_right", "bottom_left", "bottom_right", "center_left", "center_top", "center_right", "center_bottom", "center", "full_rect", "top_wide", "bottom_wide", "left_wide", "right_wide", "v_center_wide", "h_center_wide"],
-                        "description": "Typ layoutu (odpovídá menu Layout v editoru)."
-                    }
-                },
-                "required": ["node_path", "preset"]
-            }
-        ),
-
-        # ====================================================================
-        # PRÁCE SE SKRIPTY (SCRIPTING)
-        # ====================================================================
-        Tool(
-            name="godot_create_script",
-            description="Vytvoří nový skript. POZOR: Pokud soubor existuje, systém automaticky vytvoří unikátní název (např. script_1.gd), pokud není nastaveno overwrite=True.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string"},
-                    "content": {"type": "string"},
-                    "overwrite": {"type": "boolean", "description": "Pokud True, přepíše existující soubor. Pokud False (default), vytvoří nový název.", "default": False}
-                },
-                "required": ["path", "content"]
-            }
-        ),
-        Tool(
-            name="godot_read_script",
-            description="Přečte obsah existujícího skriptu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Cesta k souboru (res://...)"}
-                },
-                "required": ["path"]
-            }
-        ),
-        Tool(
-            name="godot_attach_script",
-            description="Připojí existující skript k nodu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k node"},
-                    "script_path": {"type": "string", "description": "Cesta ke skriptu (res://...)"}
-                },
-                "required": ["node_path", "script_path"]
-            }
-        ),
-        Tool(
-            name="godot_detach_script",
-            description="Odpojí skript od nodu.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "node_path": {"type": "string", "description": "Cesta k node"}
-                },
-                "required": ["node_path"]
-            }
-        )
-    ]
+    Definuje seznam všech dostupných nástrojů pro Gemini CLI (z cache katalogu).
+    """
+    return list(tool_catalog())
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: Any) -> list[TextContent]:
+async def list_tool_family(arguments: dict) -> str:
     """
-    Zpracovává volání nástrojů z Gemini a převádí je na příkazy pro Godot TCP server.
+    Filtrovaný a stránkovaný výpis katalogu pro klienty s malým kontextovým oknem.
+    """
+    families = tools_by_family()
+    family = arguments.get("family")
+    if not family:
+        overview = {name: {"description": TOOL_FAMILIES[name], "tools": len(tools)} for name, tools in families.items()}
+        return f"✓ Rodiny nástrojů:\n{json.dumps(overview, ensure_ascii=False)}"
+    if family not in families:
+        return f"✗ Chyba: rodina '{family}' neobsahuje žádné nástroje"
+
+    tools = families[family]
+    cursor = max(0, arguments.get("cursor", 0))
+    limit = max(1, arguments.get("limit", 20))
+    page = []
+    for tool in tools[cursor:cursor + limit]:
+        entry = {"name": tool.name, "description": tool.description}
+        if arguments.get("include_schema", False):
+            entry["inputSchema"] = tool.inputSchema
+        page.append(entry)
+    next_cursor = cursor + limit if cursor + limit < len(tools) else None
+    listing = {"family": family, "total": len(tools), "tools": page, "next_cursor": next_cursor}
+    return f"✓ Nástroje ({family}):\n{json.dumps(listing, ensure_ascii=False)}"
+
+
+def response_payload(response: dict) -> dict:
+    return {k: v for k, v in response.items() if k != "request_id"}
+
+
+def format_response(response: dict) -> str:
+    """
+    Naformátuje odpověď Godot serveru jako výsledek volání.
+    Mimo textový režim se úspěšná odpověď vrací celá jako kompaktní JSON (chyby zůstávají textem);
+    složené nástroje dílčí odpovědi formátují přes response_text a emitují jeden souhrnný payload.
+    """
+    if response.get("status") == "ok" and not text_mode():
+        return current_output.get().emit(response_payload(response))
+    return response_text(response)
+
+
+def response_text(response: dict) -> str:
+    """Textová podoba odpovědi Godot serveru pro Gemini (nenastavuje structuredContent)."""
+    if response.get("status") == "ok":
+        if "tree" in response:
+            return f"✓ Strom scény:\n{json.dumps(response['tree'], indent=2, ensure_ascii=False)}"
+        elif "files" in response:
+            return f"✓ Soubory v {response.get('base_path', '')}:\n{json.dumps(response['files'], indent=2, ensure_ascii=False)}"
+        elif "info" in response:
+            return f"✓ Info:\n{json.dumps(response['info'], indent=2, ensure_ascii=False)}"
+        elif "content" in response:
+            return f"✓ Obsah souboru:\n\n{response['content']}"
+        elif "data" in response:
+            return f"✓ Data:\n{json.dumps(response['data'], indent=2, ensure_ascii=False)}"
+        elif "layers" in response:
+            return f"✓ Nastavené vrstvy ({response.get('type', '3D')}):\n{json.dumps(response['layers'], indent=2, ensure_ascii=False)}"
+        else:
+            return f"✓ {response.get('message', 'Akce provedena úspěšně')}"
+    else:
+        return f"✗ Chyba: {response.get('message', 'Neznámá chyba')}"
+
+
+async def run_batch(arguments: dict) -> str:
+    """
+    Provede seznam volání nástrojů jedním příkazem 'batch' (jeden round trip, jeden krok undo).
+    Pokud bridge příkaz 'batch' nezná, provede položky jednotlivě v zadaném pořadí.
+    """
+    items = arguments.get("commands", [])
+    stop_on_error = arguments.get("stop_on_error", True)
+    atomic = arguments.get("atomic", False)
+
+    # Překlad všech položek stejným mapováním jako call_tool - nic se neodešle, pokud je některá neplatná
+    commands = []
+    for index, item in enumerate(items):
+        tool_name = item.get("tool", "")
+        command = build_command(tool_name, item.get("arguments", {}))
+        if command is None:
+            return f"✗ Chyba: položka {index} - neznámý nebo nepovolený nástroj '{tool_name}'"
+        commands.append(command)
+    if not commands:
+        return "✗ Chyba: prázdný seznam příkazů"
+
+    response = await send_godot_command({
+        "cmd": "batch",
+        "commands": commands,
+        "stop_on_error": stop_on_error,
+        "atomic": atomic
+    })
+    results = response.get("results")
+
+    if results is None:
+        # Starší bridge bez podpory 'batch' - atomický rollback nelze zaručit
+        if atomic:
+            return f"✗ Chyba: Godot bridge nepodporuje příkaz 'batch', atomické provedení není možné ({response.get('message', '')})"
+        logger.warning("Bridge nepodporuje 'batch', provádím příkazy jednotlivě")
+        # Vždy postupně - souběžně odeslané položky by přes různá spojení poolu
+        # dorazily v jiném pořadí (set_prop před create_node)
+        results = []
+        for command in commands:
+            results.append(await send_godot_command(command))
+            if stop_on_error and results[-1].get("status") != "ok":
+                break
+
+    succeeded = sum(1 for r in results if r.get("status") == "ok")
+    summary = f"Batch: {succeeded}/{len(commands)} příkazů úspěšně" + (" (vráceno zpět)" if response.get("rolled_back") else "")
+    if not text_mode():
+        # Jeden payload za celou dávku - structuredContent odpovídá textu
+        return current_output.get().emit({
+            "status": "ok" if succeeded == len(commands) else "error",
+            "message": summary,
+            "rolled_back": bool(response.get("rolled_back")),
+            "results": [
+                {"index": index, "tool": item.get("tool"),
+                 **(response_payload(results[index]) if index < len(results) else {"status": "skipped"})}
+                for index, item in enumerate(items)
+            ]
+        })
+    header = "✓" if succeeded == len(commands) else "✗"
+    lines = [f"{header} {summary}"]
+    for index, item in enumerate(items):
+        if index < len(results):
+            lines.append(f"[{index}] {item.get('tool')}: {response_text(results[index])}")
+        else:
+            lines.append(f"[{index}] {item.get('tool')}: – přeskočeno")
+    return "\n".join(lines)
+
+
+# Nástroje obsluhované přímo MCP serverem (v registru označené local=True)
+def _tree_command(root_path: str) -> dict:
+    if not root_path:
+        return {"cmd": "get_scene_tree"}
+    return {"cmd": "get_scene_tree", "root_path": root_path}
+
+
+async def get_scene_tree(arguments: dict) -> str:
+    """
+    Výřez stromu scény ze zrcadla. Z editoru se načítají jen chybějící
+    nebo zastaralé podstromy, filtry a stránkování se aplikují na serveru.
+    """
+    root_path = normalize_path(arguments.get("root_path", ""))
+    if arguments.get("refresh", False):
+        node, missing = None, [root_path]
+    else:
+        node, missing = scene_mirror.tree_state(root_path)
+
+    # Druhý průchod pokrývá souběžnou změnu scény během načítání
+    for _ in range(2):
+        if not missing:
+            break
+        responses = await asyncio.gather(*(send_godot_command(_tree_command(path)) for path in missing))
+        failed = next((r for r in responses if r.get("status") != "ok"), None)
+        if failed is not None:
+            return format_response(failed)
+        node, missing = scene_mirror.tree_state(root_path)
+    if missing:
+        return "✗ Chyba: scéna se během čtení měnila, zkuste to znovu"
+    if node is None:
+        return f"✗ Chyba: uzel '{root_path}' ve scéně neexistuje"
+
+    result = query_tree(
+        node, root_path,
+        max_depth=arguments.get("max_depth"),
+        node_type=arguments.get("node_type"),
+        name_glob=arguments.get("name_glob"),
+        cursor=arguments.get("cursor", 0),
+        page_size=arguments.get("page_size")
+    )
+    header = f"Uzly scény ({len(result['nodes'])}/{result['total']})" if "nodes" in result else "Strom scény"
+    if not text_mode():
+        return render(header, "result", result)
+    if arguments.get("compact", False):
+        text = json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+    else:
+        text = json.dumps(result, indent=2, ensure_ascii=False)
+    return f"✓ {header}:\n{text}"
+
+
+async def report_progress(progress: float, total: float):
+    """
+    Pošle MCP notifikaci o průběhu, pokud si ji klient u volání vyžádal (progressToken).
+    V úloze se průběh jen uloží (godot_job_status) - volání, které úlohu spustilo, už skončilo.
     """
+    job = current_job.get()
+    if job is not None:
+        job.progress, job.total = progress, total
+        return
     try:
-        logger.info(f"Volání nástroje: {name} | Argumenty: {arguments}")
-        
-        command = {}
-
-        # --- NODE OPS ---
-        if name == "godot_create_node":
-            command = {"cmd": "create_node", "type": arguments.get("node_type"), "name": arguments.get("name"), "parent": arguments.get("parent_path", "")}
-        elif name == "godot_set_property":
-            command = {"cmd": "set_prop", "path": arguments.get("node_path"), "prop": arguments.get("property_name"), "val": arguments.get("value")}
-        elif name == "godot_reparent_node":
-            command = {"cmd": "reparent_node", "path": arguments.get("node_path"), "new_parent": arguments.get("new_parent_path"), "keep_global_transform": arguments.get("keep_global_transform", True)}
-        elif name == "godot_duplicate_node":
-            command = {"cmd": "duplicate_node", "path": arguments.get("node_path"), "name": arguments.get("new_name", "")}
-        elif name == "godot_rename_node":
-            command = {"cmd": "rename_node", "path": arguments.get("node_path"), "new_name": arguments.get("new_name")}
-        elif name == "godot_delete_node":
-            command = {"cmd": "delete_node", "path": arguments.get("node_path")}
-        elif name == "godot_get_node_info":
-            command = {"cmd": "get_node_info", "path": arguments.get("node_path")}
-
-        # --- SCENE OPS ---
-        elif name == "godot_get_scene_tree":
-            command = {"cmd": "get_scene_tree"}
-        elif name == "godot_save_scene":
-            command = {"cmd": "save_scene", "path": arguments.get("save_path", "")}
-        elif name == "godot_create_scene":
-            command = {"cmd": "create_scene", "save_path": arguments.get("save_path"), "root_type": arguments.get("root_type", "Node3D"), "name": arguments.get("name", "SceneRoot")}
-        elif name == "godot_load_scene":
-            command = {"cmd": "load_scene", "path": arguments.get("path")}
-        elif name == "godot_add_child_scene":
-            command = {"cmd": "add_child_scene", "scene_path": arguments.get("scene_path"), "parent": arguments.get("parent_path", ""), "name": arguments.get("name", "")}
-        elif name == "godot_fix_ownership":
-            command = {"cmd": "set_owner_recursive", "path": arguments.get("root_path")}
-
-        elif name == "godot_env_create":
-            command = {"cmd": "env_create"}
-        elif name == "godot_env_set_background":
-            command = {
-                "cmd": "env_set_background",
-                "mode": arguments.get("mode"),
-                "color": arguments.get("color", [0, 0, 0]),
-                "energy": arguments.get("energy", 1.0)
-            }
-        elif name == "godot_env_set_effect":
-            command = {
-                "cmd": "env_set_effect",
-                "type": arguments.get("effect_type"),
-                "enabled": arguments.get("enabled", True),
-                "params": arguments.get("params", {})
-            }
-        elif name == "godot_env_camera_attributes":
-            command = arguments.copy()
-            command["cmd"] = "env_set_camera_attributes"
-
-        # --- FILESYSTEM OPS ---
-        elif name == "godot_search_files":
-            command = {
-                "cmd": "search_files",
-                "query": arguments.get("query", ""),
-                "extensions": arguments.get("extensions", []),
-                "root": arguments.get("root", "res://")
-            }
-        elif name == "godot_list_files":
-            command = {"cmd": "list_dir", "path": arguments.get("path", "res://"), "recursive": arguments.get("recursive", False), "extensions": arguments.get("extensions", [])}
-        elif name == "godot_make_directory":
-            command = {"cmd": "make_dir", "path": arguments.get("path")}
-        elif name == "godot_manage_file":
-            action = arguments.get("action")
-            if action == "delete":
-                command = {"cmd": "remove_file", "path": arguments.get("path")}
-            else:
-                command = {"cmd": "rename_file", "from_path": arguments.get("path"), "to_path": arguments.get("new_path")}
-
-        # --- MESH & PHYSICS OPS ---
-        elif name == "godot_set_mesh":
-            command = {"cmd": "set_mesh", "path": arguments.get("node_path"), "mesh_type": arguments.get("mesh_type"), "params": arguments.get("params", {})}
-        elif name == "godot_add_collision_shape":
-            command = {"cmd": "add_collision_shape", "parent": arguments.get("parent_path"), "shape_type": arguments.get("shape_type"), "params": arguments.get("params", {}), "name": arguments.get("name", "CollisionShape")}
-        elif name == "godot_get_collision_layers":
-            command = {"cmd": "get_collision_layers", "type": arguments.get("type", "3D")}
-        elif name == "godot_set_physics_layer":
-            cmd_type = "set_collision_layer" if arguments.get("type") == "layer" else "set_collision_mask"
-            command = {"cmd": cmd_type, "path": arguments.get("node_path"), "layer": arguments.get("layer_index"), "enabled": arguments.get("enabled", True)}
-        elif name == "godot_set_collision_layer_name":
-            command = {"cmd": "set_collision_layer_name", "index": arguments.get("index"), "name": arguments.get("name"), "type": arguments.get("type", "3D")}
-
-        # --- TERRAIN 3D OPS ---
-        elif name == "godot_terrain_create":
-            command = {"cmd": "create_terrain", "name": arguments.get("name"), "parent_path": arguments.get("parent_path"), "storage_path": arguments.get("storage_path", "")}
-        elif name == "godot_terrain_configure":
-            command = arguments.copy()
-            command["cmd"] = "terrain_configure"
-        elif name == "godot_terrain_physics":
-            command = arguments.copy()
-            command["cmd"] = "terrain_physics"
-        elif name == "godot_terrain_rendering":
-            command = arguments.copy()
-            command["cmd"] = "terrain_rendering"
-        elif name == "godot_terrain_visuals":
-            command = arguments.copy()
-            command["cmd"] = "terrain_visuals"
-        elif name == "godot_terrain_bake_mesh":
-            command = {"cmd": "terrain_bake_mesh", "node_path": arguments.get("node_path"), "lod": arguments.get("lod", 4), "save_path": arguments.get("save_path", "")}
-        elif name == "godot_terrain_get_height":
-            command = {"cmd": "terrain_get_height", "node_path": arguments.get("node_path"), "x": arguments.get("x"), "z": arguments.get("z")}
-        elif name == "godot_terrain_import_heightmap":
-            command = {
-                "cmd": "terrain_import_heightmap",
-                "node_path": arguments.get("node_path"),
-                "file_path": arguments.get("file_path"),
-                "min_height": arguments.get("min_height", 0.0),
-                "max_height": arguments.get("max_height", 100.0),
-                "position": arguments.get("position", [0, 0, 0])
-            }
-        elif name == "godot_terrain_task":
-            command = {
-                "cmd": "terrain_task",
-                "task_type": arguments.get("task_type"),
-                "map_type": arguments.get("map_type"),
-                "file_path": arguments.get("file_path"),
-                "data_dir": arguments.get("data_dir"),
-                "params": arguments.get("params", {})
-            }
-        elif name == "godot_terrain_add_texture":
-            command = arguments.copy()
-            command["cmd"] = "terrain_add_texture"
-        elif name == "godot_terrain_add_mesh":
-            command = arguments.copy()
-            command["cmd"] = "terrain_add_mesh"
-        elif name == "godot_terrain_place_instances":
-            command = arguments.copy()
-            command["cmd"] = "terrain_place_instances"
-        elif name == "godot_terrain_bake_navmesh":
-            command = arguments.copy()
-            command["cmd"] = "terrain_bake_navmesh"
-        elif name == "godot_terrain_raycast":
-            command = arguments.copy()
-            command["cmd"] = "terrain_raycast"
-        elif name == "godot_2d_create":
-            command = arguments.copy()
-            command["cmd"] = "create_node_2d"
-        elif name == "godot_2d_transform":
-            command = arguments.copy()
-            command["cmd"] = "set_transform_2d"
-        elif name == "godot_set_property":
-            command = {"cmd": "set_property", "path": arguments.get("node_path"), "prop": arguments.get("property_name"), "val": arguments.get("value")}
-        elif name == "godot_get_property":
-            command = {"cmd": "get_prop", "path": arguments.get("node_path"), "prop": arguments.get("property_name")}
-        elif name == "godot_call_method":
-            command = {"cmd": "call_method", "path": arguments.get("node_path"), "method": arguments.get("method_name"), "args": arguments.get("args", [])}
-        elif name == "godot_connect_signal":
-            command = arguments.copy(); command["cmd"] = "connect_signal"
-        elif name == "godot_ui_set_layout":
-            command = arguments.copy(); command["cmd"] = "ui_set_layout"
-
-
-        # --- SCRIPT OPS ---
-        elif name == "godot_create_script": # Aktualizace pro overwrite parametr
-             command = {
-                "cmd": "create_script", 
-                "path": arguments.get("path"), 
-                "content": arguments.get("content"),
-                "overwrite": arguments.get("overwrite", False)
-            }
-        elif name == "godot_read_script":
-            command = {"cmd": "get_script_content", "path": arguments.get("path")}
-        elif name == "godot_attach_script":
-            command = {"cmd": "attach_script", "path": arguments.get("node_path"), "script_path": arguments.get("script_path")}
-        elif name == "godot_detach_script":
-            command = {"cmd": "detach_script", "path": arguments.get("node_path")}
+        ctx = app.request_context
+    except LookupError:
+        return
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is not None:
+        await ctx.session.send_progress_notification(token, progress, total)
+
+
+async def stream_instances(base: dict, raw: bytes, stride: int, chunk_size: int) -> str:
+    """
+    Rozmístí instance po částech packed float32 dat. Části se posílají souběžně
+    po multiplexovaném spojení, po každé potvrzené části se hlásí průběh.
+    Bridge bez příkazu 'terrain_place_instances_packed' dostane stejné části jako JSON seznamy;
+    jeho 'terrain_place_instances' zná jen pozice, natočení a měřítko (stride > 3) se ztratí
+    a výsledek to výslovně uvede.
+    """
+    chunks = list(iter_chunks(raw, stride, chunk_size))
+    if not chunks:
+        return "✗ Chyba: žádné instance k rozmístění"
+    total = len(raw) // (4 * stride)
+
+    def packed_command(count: int, encoded: str) -> dict:
+        return {"cmd": "terrain_place_instances_packed", **base, "stride": stride, "count": count, "data": encoded}
+
+    def json_command(count: int, encoded: str) -> dict:
+        rows = unpack_rows(encoded, stride)
+        command = {"cmd": "terrain_place_instances", **base, "positions": [row[:3] for row in rows]}
+        if stride >= 4:
+            command["rotations"] = [row[3] for row in rows]
+        if stride == 5:
+            command["scales"] = [row[4] for row in rows]
+        return command
+
+    started = time.perf_counter()
+    # První část ověří, zda bridge binární formát podporuje
+    _, count, encoded = chunks[0]
+    build = packed_command
+    response = await send_godot_command(packed_command(count, encoded))
+    if response.get("status") != "ok" and not response.get("message", "").startswith("Timeout"):
+        logger.warning(f"Binární rozmístění selhalo ({response.get('message')}), zkouším JSON seznamy")
+        build = json_command
+        response = await send_godot_command(json_command(count, encoded))
+    if response.get("status") != "ok":
+        return format_response(response)
+    placed = count
+    await report_progress(placed, total)
+
+    semaphore = asyncio.Semaphore(BULK_IN_FLIGHT)
+    failure = None
+
+    async def send_chunk(count: int, encoded: str):
+        nonlocal placed, failure
+        async with semaphore:
+            if failure is not None:
+                return
+            response = await send_godot_command(build(count, encoded))
+        if response.get("status") == "ok":
+            placed += count
+            await report_progress(placed, total)
+        elif failure is None:
+            failure = response
+
+    await asyncio.gather(*(send_chunk(count, encoded) for _, count, encoded in chunks[1:]))
+
+    if failure is not None:
+        return f"✗ Chyba: rozmístěno jen {placed}/{total} instancí - {failure.get('message', 'Neznámá chyba')}"
+    mode = "packed float32" if build is packed_command else "JSON seznamy"
+    result = (f"✓ Rozmístěno {placed} instancí ({len(chunks)} částí, {len(raw) / 1e6:.1f} MB, "
+              f"{time.perf_counter() - started:.2f} s, {mode})")
+    if build is json_command and stride > 3:
+        lost = "natočení a měřítko" if stride == 5 else "natočení"
+        result += (f"\n⚠ Varování: bridge nepodporuje binární formát a 'terrain_place_instances' "
+                   f"přijímá jen pozice - {lost} (stride {stride}) se neuplatnilo")
+    return result
+
+
+def thread_progress():
+    """
+    Callback průběhu pro práci ve vlákně (asyncio.to_thread) - notifikace se odešle
+    ze smyčky událostí v kontextu aktuálního volání nástroje.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+
+    def progress(done: float, total: float):
+        loop.call_soon_threadsafe(asyncio.ensure_future, report_progress(done, total), context=ctx)
+    return progress
+
+
+def local_project_path(path: str) -> str | None:
+    """Lokální cesta pro zápis; res:// jen se známou složkou projektu (GODOT_PROJECT_DIR)."""
+    if path.startswith("res://"):
+        return os.path.join(GODOT_PROJECT_DIR, path[len("res://"):]) if GODOT_PROJECT_DIR else None
+    return path if os.path.isabs(path) else None
+
+
+def _placement_target(arguments: dict, auto_height: bool) -> dict:
+    return {
+        "node_path": arguments.get("node_path"),
+        "mesh_id": arguments.get("mesh_id"),
+        "auto_height": arguments.get("auto_height", auto_height)
+    }
+
+
+async def place_instances_bulk(arguments: dict) -> str:
+    """
+    Hromadné rozmístění instancí zadaných jako packed float32, .npy nebo seznamy.
+    """
+    try:
+        raw, stride = load_instances(arguments)
+    except InstanceDataError as e:
+        return f"✗ Chyba: {e}"
+    return await stream_instances(_placement_target(arguments, True), raw, stride,
+                                  arguments.get("chunk_size", DEFAULT_CHUNK_SIZE))
 
+
+async def scatter_instances(arguments: dict) -> str:
+    """
+    Vygeneruje rozmístění podle pravidel hustoty a filtrů a pošle ho binární cestou.
+    S heightmapou se výška dopočítá lokálně, takže auto_height je ve výchozím stavu vypnuté.
+    """
+    try:
+        # Generování je čistě výpočetní - neblokuje smyčku pro ostatní volání
+        raw, stride, stats = await asyncio.to_thread(scatter, arguments)
+    except HeightmapError as e:
+        return f"✗ Chyba: {e}"
+    summary = json.dumps(stats, ensure_ascii=False)
+    if arguments.get("dry_run", False):
+        return f"✓ Rozptyl (bez odeslání): {summary}"
+    target = _placement_target(arguments, not arguments.get("heightmap_path"))
+    result = await stream_instances(target, raw, stride, arguments.get("chunk_size", DEFAULT_CHUNK_SIZE))
+    return f"{result}\nRozptyl: {summary}"
+
+
+async def query_editor_heights(arguments: dict, x, z) -> tuple:
+    """
+    Výšky (a normály) z editoru jedním příkazem 'terrain_get_heights'.
+    Starší bridge dostane jednobodové dotazy souběžně po multiplexovaném spojení.
+    Vrací (výšky, normály nebo None, chybová odpověď nebo None).
+    """
+    query = arguments.get("query", "height")
+    include_normals = arguments.get("include_normals", False)
+    response = await send_godot_command({
+        "cmd": "terrain_get_heights",
+        "node_path": arguments.get("node_path"),
+        "query": query,
+        "count": int(x.size),
+        "points": encode_floats(np.stack([x, z], axis=1)),
+        "normals": include_normals
+    })
+    if response.get("status") == "ok" and "heights" in response:
+        normals = decode_floats(response["normals"], 3) if include_normals and response.get("normals") else None
+        return decode_floats(response["heights"]), normals, None
+    if response.get("message", "").startswith("Timeout"):
+        return None, None, response
+
+    samples = 5 if include_normals else 1
+    if x.size * samples > HEIGHT_FALLBACK_LIMIT:
+        return None, None, {"status": "error", "message": f"Bridge nepodporuje dávkový dotaz na výšky "
+                                                          f"a {x.size} bodů je nad limitem jednotlivých dotazů ({response.get('message', '')})"}
+    logger.warning("Bridge nepodporuje 'terrain_get_heights', dotazuji body jednotlivě")
+    step = arguments.get("normal_step", 1.0)
+    offsets = [(0.0, 0.0)] + ([(-step, 0.0), (step, 0.0), (0.0, -step), (0.0, step)] if include_normals else [])
+    cmd = "terrain_raycast" if query == "raycast" else "terrain_get_height"
+    responses = await asyncio.gather(*(
+        send_godot_command({"cmd": cmd, "node_path": arguments.get("node_path"), "x": px + ox, "z": pz + oz})
+        for ox, oz in offsets for px, pz in zip(x.tolist(), z.tolist())
+    ))
+    failed = next((r for r in responses if r.get("status") != "ok"), None)
+    if failed is not None:
+        return None, None, failed
+    values = np.array([extract_height(r) for r in responses]).reshape(samples, x.size)
+    normals = normals_from_samples(*values, step) if include_normals else None
+    return values[0], normals, None
+
+
+async def sample_heights(arguments: dict) -> str:
+    """
+    Dávkový dotaz na výšky terénu - z editoru jedním round tripem,
+    nebo v režimu 'local' bilineárně z lokální heightmapy bez editoru.
+    """
+    try:
+        x, z = parse_points(arguments)
+        if arguments.get("mode", "editor") == "local":
+            field = HeightField.from_arguments(arguments)
+            heights = field.sample(x, z)
+            normals = field.normals(x, z) if arguments.get("include_normals", False) else None
         else:
-            return [TextContent(type="text", text=f"✗ Neznámý nástroj: {name}")]
+            heights = None
+            if not arguments.get("refresh", False):
+                heights, normals = await asyncio.to_thread(
+                    terrain_cache.sample, arguments.get("node_path"), x, z, arguments.get("include_normals", False))
+                # Body mimo nakešované regiony - odpoví editor
+                if np.isnan(heights).any():
+                    heights = None
+            if heights is None:
+                heights, normals, error = await query_editor_heights(arguments, x, z)
+                if error is not None:
+                    return format_response(error)
+    except HeightmapError as e:
+        return f"✗ Chyba: {e}"
+    payload = sample_payload(int(x.size), heights, normals, arguments.get("encoding", "auto"))
+    if payload["encoding"] == "base64":
+        keep_whole()
+    return f"✓ Výšky terénu ({x.size} bodů):\n{json.dumps(payload, ensure_ascii=False)}"
 
-        # Odeslání příkazu
+
+async def load_terrain_cache(arguments: dict) -> str:
+    """
+    Naplní dlaždicovou cache výšek z heightmapy (typicky exportu terénu).
+    """
+    name = arguments.get("node_path") or arguments.get("data_dir")
+    if not name:
+        return "✗ Chyba: zadejte node_path nebo data_dir"
+    path = resolve_path(arguments.get("file_path", ""), GODOT_PROJECT_DIR)
+    if path is None:
+        return f"✗ Chyba: soubor '{arguments.get('file_path')}' nelze najít lokálně (res:// vyžaduje GODOT_PROJECT_DIR)"
+    try:
+        tiles = await asyncio.to_thread(
+            terrain_cache.ingest, name, path,
+            arguments.get("min_height", 0.0), arguments.get("max_height", 100.0),
+            arguments.get("position") or [0, 0, 0], arguments.get("r16_dim"))
+    except HeightmapError as e:
+        return f"✗ Chyba: {e}"
+    return f"✓ Cache výšek terénu '{name}': zapsáno {tiles} dlaždic"
+
+
+async def generate_terrain_heightmap(arguments: dict) -> str:
+    """
+    Vygeneruje heightmapu ve vlákně (po dlaždicích, s hlášením průběhu)
+    a volitelně ji rovnou importuje do Terrain3D.
+    """
+    output = arguments.get("output_path", "")
+    local_path = local_project_path(output)
+    if local_path is None:
+        return "✗ Chyba: output_path musí být absolutní cesta, nebo res:// s nastaveným GODOT_PROJECT_DIR"
+    target = arguments.get("import_to")
+    if target and os.path.splitext(output)[1].lower() not in (".png", ".r16", ".raw"):
+        return "✗ Chyba: Terrain3D importuje jen PNG nebo R16/RAW - zvolte jinou příponu výstupu"
+    layers = arguments.get("layers") or PRESETS.get(arguments.get("preset", "hill"))
+    if layers is None:
+        return f"✗ Chyba: neznámý preset '{arguments.get('preset')}' ({', '.join(PRESETS)})"
+    width = arguments.get("width", arguments.get("size", 513))
+    height = arguments.get("height", arguments.get("size", 513))
+    try:
+        stats = await asyncio.to_thread(
+            generate, layers, width, height, local_path,
+            seed=arguments.get("seed", 0),
+            normalize=arguments.get("normalize", True),
+            progress=thread_progress()
+        )
+    except HeightmapSpecError as e:
+        return f"✗ Chyba: {e}"
+    return await heightmap_result("Heightmapa vygenerována", stats, output, target, width, height)
+
+
+async def heightmap_result(header: str, stats: dict, output: str, target: dict | None, width: int, height: int) -> str:
+    """
+    Výsledek generování/převodu; s 'import_to' se hotový soubor importuje do Terrain3D
+    (jako godot_terrain_import_heightmap, jen změněné regiony). Mimo textový režim jeden payload.
+    """
+    imported = None
+    if target:
+        command = heightmap_import_command(output, target, width, height)
+        imported = await import_regions(command, target.get("incremental", True))
+        if imported[1].get("status") != "ok":
+            mark_failed()
+    if not text_mode():
+        payload = {"status": "ok", "message": header, "stats": stats}
+        if imported is not None:
+            payload["status"] = imported[1].get("status", "error")
+            payload["import"] = imported[1]
+        return current_output.get().emit(payload)
+    result = f"✓ {header}: {json.dumps(stats, ensure_ascii=False)}"
+    return result if imported is None else f"{result}\nImport: {imported[0]}"
+
+
+def heightmap_import_command(output: str, target: dict, width: int, height: int) -> dict:
+    command = build_command("godot_terrain_import_heightmap", {
+        "node_path": target.get("node_path"),
+        "file_path": output,
+        "min_height": target.get("min_height", 0.0),
+        "max_height": target.get("max_height", 100.0),
+        "position": target.get("position", [0, 0, 0])
+    })
+    if output.endswith((".r16", ".raw")):
+        command["r16_dim"] = [width, height]
+    return command
+
+
+async def import_heightmap_regions(command: dict, incremental: bool = True) -> str:
+    text, payload = await import_regions(command, incremental)
+    if text_mode() or payload.get("status") != "ok":
+        return text
+    return current_output.get().emit(payload)
+
+
+async def import_regions(command: dict, incremental: bool = True) -> tuple[str, dict]:
+    """
+    Import heightmapy po regionech: regiony, jejichž obsah se od posledního importu
+    do stejného terénu nezměnil, se přeskočí a změněné se pošlou jako samostatné výřezy.
+    Zdroj, který nelze číst lokálně (res:// bez GODOT_PROJECT_DIR, EXR), se importuje celý.
+    Vrací (text, payload) - výsledek pro textový režim a pro JSON režimy.
+    """
+    try:
+        plan = await asyncio.to_thread(region_imports.plan, command)
+    except Exception as e:
+        logger.warning(f"Rozdělení importu na regiony selhalo: {e}")
+        plan = None
+    if plan is None:
         response = await send_godot_command(command)
-        
-        # Formátování výsledku
+        region_imports.forget(import_target(command))
+        return response_text(response), response_payload(response)
+
+    changed = plan.changed if incremental else plan.regions
+    if not changed:
+        region_imports.record(plan, [])
+        # Přeskočení vychází jen z manifestu tohoto běhu - úpravy terénu v editoru nevidí
+        message = (f"Heightmapa beze změny oproti poslednímu importu do '{plan.key}' - přeskočeno "
+                   f"{len(plan.regions)} regionů, nic se neimportovalo (incremental=false importuje celý obraz)")
+        return f"✓ {message}", {"status": "ok", "message": message, "skipped_unchanged": True,
+                                "regions": {"imported": 0, "skipped": len(plan.regions)}}
+
+    if len(changed) == len(plan.regions):
+        # Mění se všechno - jeden import celého souboru je levnější než výřezy
+        plan.changed = plan.regions
+        response = await send_godot_command(command)
+        ok = response.get("status") == "ok"
+        region_imports.record(plan, plan.regions if ok else [])
+        imported = len(plan.regions) if ok else 0
+        return (f"{response_text(response)}\nRegiony: importováno {imported}, přeskočeno 0",
+                {**response_payload(response), "regions": {"imported": imported, "skipped": 0}})
+
+    plan.changed = changed
+    imported, errors = [], []
+    for done, region in enumerate(changed, start=1):
+        region_command = await asyncio.to_thread(region_imports.region_command, plan, region)
+        response = await send_godot_command(region_command)
+        try:
+            os.remove(region_command["file_path"])
+        except OSError:
+            pass
         if response.get("status") == "ok":
-            if "tree" in response:
-                result = f"✓ Strom scény:\n{json.dumps(response['tree'], indent=2, ensure_ascii=False)}"
-            elif "files" in response:
-                result = f"✓ Soubory v {response.get('base_path', '')}:\n{json.dumps(response['files'], indent=2, ensure_ascii=False)}"
-            elif "info" in response:
-                result = f"✓ Info:\n{json.dumps(response['info'], indent=2, ensure_ascii=False)}"
-            elif "content" in response:
-                result = f"✓ Obsah souboru:\n\n{response['content']}"
-            elif "data" in response:
-                result = f"✓ Data:\n{json.dumps(response['data'], indent=2, ensure_ascii=False)}"
-            elif "layers" in response:
-                result = f"✓ Nastavené vrstvy ({response.get('type', '3D')}):\n{json.dumps(response['layers'], indent=2, ensure_ascii=False)}"
-            else:
-                result = f"✓ {response.get('message', 'Akce provedena úspěšně')}"
+            imported.append(region)
         else:
-            result = f"✗ Chyba: {response.get('message', 'Neznámá chyba')}"
-        
-        # Omezení délky logu pro přehlednost
-        log_result = result[:200] + "..." if len(result) > 200 else result
-        logger.info(f"Výsledek: {log_result}")
+            errors.append(f"region ({region.rx}, {region.rz}): {response.get('message', 'neznámá chyba')}")
+        await report_progress(done, len(changed))
+    region_imports.record(plan, imported)
+
+    message = (f"Import heightmapy po regionech: importováno {len(imported)}/{len(changed)} změněných, "
+               f"přeskočeno {plan.skipped} beze změny")
+    header = "✓" if not errors else "✗"
+    payload = {"status": "ok" if not errors else "error", "message": message,
+               "regions": {"imported": len(imported), "changed": len(changed), "skipped": plan.skipped}}
+    if errors:
+        payload["errors"] = errors
+    return "\n".join([f"{header} {message}"] + errors), payload
+
+
+async def convert_terrain_heightmap(arguments: dict) -> str:
+    """
+    Převede RAW/R16 heightmapu (memory-mapped, po pásech řádků) na EXR, 16-bit PNG
+    nebo R16 a volitelně výsledek importuje do Terrain3D.
+    """
+    source = local_project_path(arguments.get("input_path", ""))
+    output = arguments.get("output_path", "")
+    local_path = local_project_path(output)
+    if source is None or local_path is None:
+        return "✗ Chyba: input_path i output_path musí být absolutní cesty, nebo res:// s nastaveným GODOT_PROJECT_DIR"
+    target = arguments.get("import_to")
+    if target and os.path.splitext(output)[1].lower() not in (".png", ".r16", ".raw"):
+        return "✗ Chyba: Terrain3D importuje jen PNG nebo R16/RAW - zvolte jinou příponu výstupu"
+    try:
+        stats = await asyncio.to_thread(
+            convert, source, local_path,
+            width=arguments.get("width"),
+            height=arguments.get("height"),
+            bits=arguments.get("bits"),
+            endian=arguments.get("endian", "auto"),
+            flip_y=arguments.get("flip_y", False),
+            exr_scale=arguments.get("exr_scale", 1.0),
+            progress=thread_progress()
+        )
+    except ConvertError as e:
+        return f"✗ Chyba: {e}"
+    return await heightmap_result("Heightmapa převedena", stats, output, target, stats["width"], stats["height"])
+
+
+async def cache_stats(arguments: dict) -> str:
+    """
+    Statistiky zrcadla scény a cache výšek (ověření, že cache čtecích nástrojů funguje).
+    """
+    stats = {"scene_mirror": scene_mirror.stats(), "terrain_heights": terrain_cache.stats(),
+             "region_imports": region_imports.stats()}
+    if arguments.get("clear", False):
+        scene_mirror.clear()
+        await asyncio.to_thread(terrain_cache.clear)
+        region_imports.clear()
+    return render("Cache serveru", "stats", stats)
+
+
+async def submit_job(arguments: dict) -> str:
+    """
+    Spustí nástroj jako úlohu na pozadí a hned vrátí její ID.
+    """
+    tool = arguments.get("tool", "")
+    if tool not in TOOL_REGISTRY or tool.startswith("godot_job_"):
+        return f"✗ Chyba: neznámý nebo nepovolený nástroj '{tool}'"
+    timeout = arguments.get("timeout") or JOB_TIMEOUTS.get(tool, DEFAULT_JOB_TIMEOUT)
+    job = jobs.submit(tool, arguments.get("arguments", {}), timeout)
+    return f"✓ Úloha spuštěna:\n{json.dumps(job.summary(), ensure_ascii=False)}"
+
+
+def _job_or_error(arguments: dict):
+    job = jobs.get(arguments.get("job_id", ""))
+    return job, None if job else f"✗ Chyba: neznámá úloha '{arguments.get('job_id')}'"
+
+
+async def job_status(arguments: dict) -> str:
+    """
+    Stav a průběh úlohy; bez job_id přehled všech úloh.
+    """
+    if not arguments.get("job_id"):
+        return f"✓ Úlohy:\n{json.dumps([job.summary() for job in jobs.jobs.values()], ensure_ascii=False)}"
+    job, error = _job_or_error(arguments)
+    return error or f"✓ Úloha:\n{json.dumps(job.summary(), ensure_ascii=False)}"
+
+
+async def job_logs(arguments: dict) -> str:
+    """
+    Průběžný log úlohy od pozice 'since' (next_since se předá dalšímu volání).
+    """
+    job, error = _job_or_error(arguments)
+    if error:
+        return error
+    lines, next_since = jobs.logs(job.id, arguments.get("since", 0))
+    return f"✓ Log {job.id} ({job.state}), next_since={next_since}:\n" + "\n".join(lines)
+
+
+async def job_cancel(arguments: dict) -> str:
+    job, error = _job_or_error(arguments)
+    if error:
+        return error
+    if not jobs.cancel(job.id):
+        return f"✗ Chyba: úloha {job.id} už skončila ({job.state})"
+    return f"✓ Úloha {job.id} se ruší (příkaz už odeslaný do Godot tam doběhne)"
+
+
+async def job_result(arguments: dict) -> str:
+    """
+    Výsledek dokončené úlohy; s 'wait' počká na dokončení nejvýše zadaný počet sekund.
+    """
+    job, error = _job_or_error(arguments)
+    if error:
+        return error
+    job = await jobs.wait(job.id, min(float(arguments.get("wait", 0)), TIMEOUT))
+    if job.result is not None:
+        if job.whole_result:
+            keep_whole()
+        return job.result
+    if job.state in ("queued", "running"):
+        return f"✗ Úloha {job.id} ještě běží:\n{json.dumps(job.summary(), ensure_ascii=False)}"
+    return f"✗ Úloha {job.id} skončila stavem {job.state}: {job.error}"
+
+
+async def server_stats(arguments: dict) -> str:
+    """
+    Metriky nástrojů (počty, chyby, latence po fázích, velikosti) seřazené podle celkového času,
+    adaptivní timeouty příkazů a stav úloh; volitelně zápis do souboru.
+    """
+    dump = None
+    if arguments.get("dump_path"):
+        try:
+            kind, content = metrics.export(arguments["dump_path"])
+            await asyncio.to_thread(write_metrics, arguments["dump_path"], content)
+        except OSError as e:
+            return f"✗ Chyba: metriky nelze zapsat: {e}"
+        dump = {"path": arguments["dump_path"], "format": kind}
+    if arguments.get("format") == "prometheus":
+        text = f"✓ Statistiky serveru:\n{metrics.prometheus()}"
+        if dump:
+            text += f"\nZapsáno do {dump['path']} ({dump['format']})"
+    else:
+        stats = {
+            **metrics.snapshot(arguments.get("tool")),
+            "adaptive_timeouts": latencies.stats(),
+            "jobs": jobs.stats(),
+            "outputs": outputs.stats()
+        }
+        if dump:
+            stats["dump"] = dump
+        text = render("Statistiky serveru", "stats", stats)
+    if arguments.get("reset", False):
+        metrics.reset()
+    return text
+
+
+async def read_output(arguments: dict) -> str:
+    """
+    Další část zkráceného výsledku podle kurzoru (stejný rozpočet jako ostatní volání).
+    """
+    cursor = arguments.get("cursor", "")
+    try:
+        return outputs.read(cursor, output_budget(arguments))
+    except KeyError:
+        return f"✗ Chyba: výsledek pro kurzor '{cursor}' už není k dispozici (uchovává se posledních {outputs.capacity})"
+    except ValueError as e:
+        return f"✗ Chyba: neplatný kurzor '{cursor}': {e}"
+
+
+LOCAL_HANDLERS = {
+    "godot_batch": run_batch,
+    "godot_get_scene_tree": get_scene_tree,
+    "godot_list_tools": list_tool_family,
+    "godot_terrain_place_instances_bulk": place_instances_bulk,
+    "godot_terrain_scatter": scatter_instances,
+    "godot_terrain_sample_heights": sample_heights,
+    "godot_terrain_cache_load": load_terrain_cache,
+    "godot_terrain_generate_heightmap": generate_terrain_heightmap,
+    "godot_terrain_convert_heightmap": convert_terrain_heightmap,
+    "godot_cache_stats": cache_stats,
+    "godot_server_stats": server_stats,
+    "godot_read_output": read_output,
+    "godot_job_submit": submit_job,
+    "godot_job_status": job_status,
+    "godot_job_logs": job_logs,
+    "godot_job_cancel": job_cancel,
+    "godot_job_result": job_result,
+}
+_missing_handlers = [name for name, spec in TOOL_REGISTRY.items() if spec["local"] and name not in LOCAL_HANDLERS]
+if _missing_handlers:
+    raise RuntimeError(f"Lokální nástroje bez obsluhy: {', '.join(_missing_handlers)}")
+
+
+async def run_tool(name: str, arguments: dict) -> str:
+    """
+    Provede nástroj a vrátí textový výsledek (přímé volání i úlohy na pozadí).
+    Doba volání, fáze příkazů pro Godot a velikosti se zapíšou do metrik nástroje.
+    """
+    record = CallRecord()
+    current_record.set(record)
+    if current_output.get() is None:
+        # Úloha na pozadí - formát podle argumentů, rozpočet se uplatní až při čtení výsledku
+        current_output.set(OutputOptions(output_mode(arguments)))
+    started = time.perf_counter()
+    result = None
+    failed = True
+    try:
+        result = await _execute_tool(name, arguments)
+        failed = result_failed(result)
+        job = current_job.get()
+        if job is not None:
+            job.whole_result = current_output.get().whole
+            job.failed_result = failed
+        return result
+    finally:
+        if name in TOOL_REGISTRY:
+            metrics.observe(
+                name, record, time.perf_counter() - started,
+                error=failed,
+                request_bytes=None,
+                response_bytes=len(result.encode('utf-8')) if result else 0
+            )
+            task = asyncio.create_task(observe_request_size(name, arguments))
+            size_tasks.add(task)
+            task.add_done_callback(size_tasks.discard)
+
+
+async def observe_request_size(name: str, arguments: dict):
+    """
+    Velikost argumentů se měří ve vlákně a po částech (u hromadného rozmístění stovky ms
+    serializace), do metrik se zapíše zpět ve smyčce událostí.
+    """
+    try:
+        metrics.observe_request(name, await asyncio.to_thread(json_size, arguments))
+    except Exception as e:
+        logger.debug(f"Velikost argumentů {name} nelze změřit: {e}")
+
+
+async def _execute_tool(name: str, arguments: dict) -> str:
+    spec = TOOL_REGISTRY.get(name)
+    if spec is None:
+        return f"✗ Neznámý nástroj: {name}"
+
+    if spec["local"]:
+        return await LOCAL_HANDLERS[name](arguments)
+
+    command = build_command(name, arguments)
+    if import_target(command) is not None:
+        # Import heightmapy posílá jen regiony změněné od minulého importu
+        return await import_heightmap_regions(command, arguments.get("incremental", True))
+
+    # Čtecí nástroje se obsluhují ze zrcadla scény a dotazy na výšku z lokální
+    # cache terénu, pokud není vyžádán refresh
+    response = None
+    if not arguments.get("refresh", False):
+        response = scene_mirror.lookup(command) or terrain_cache.lookup(command)
+    if response is None:
+        # Odeslání příkazu
+        response = await send_godot_command(command)
+
+    # Formátování výsledku
+    with phase("format"):
+        return format_response(response)
+
+
+jobs = JobManager(run_tool)
+
+
+def call_budget(name: str, arguments: dict) -> CallBudget:
+    """
+    Rozpočet volání: argument 'timeout', jinak výjimka nástroje, jinak rodina.
+    Příkazové nástroje mají jeden deadline na celé volání, lokální rozpočet na každý příkaz
+    (jejich vlastní výpočet, např. generování heightmapy, se do něj nepočítá).
+    """
+    spec = TOOL_REGISTRY.get(name) or {}
+    # U nástrojů úloh znamená 'timeout' timeout úlohy
+    explicit = arguments.get("timeout") if not name.startswith("godot_job_") else None
+    timeout = float(explicit or TOOL_TIMEOUTS.get(name) or FAMILY_TIMEOUTS.get(spec.get("family"), TIMEOUT))
+    deadline = None if spec.get("local") else time.monotonic() + timeout
+    return CallBudget(name, timeout, explicit=bool(explicit), deadline=deadline)
+
+
+def output_mode(arguments: dict) -> str:
+    mode = arguments.get("output") or OUTPUT_MODE
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"neznámý formát výsledku '{mode}' (povoleno: {', '.join(OUTPUT_MODES)})")
+    return mode
+
+
+def output_budget(arguments: dict) -> int:
+    budget = arguments.get("max_output_bytes", OUTPUT_BUDGET)
+    return max(MIN_OUTPUT_BUDGET, int(budget)) if budget else 0
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: Any) -> list[TextContent] | tuple[list[TextContent], dict]:
+    """
+    Zpracovává volání nástrojů z Gemini a převádí je na příkazy pro Godot TCP server.
+    """
+    try:
+        # Argumenty se do souhrnu (velikost + hash velkých hodnot) převádí až ve vlákně zapisovače
+        current_call.set(call_budget(name, arguments))
+        logger.info("Volání nástroje: %s", name, extra={"arguments": arguments})
+        options = OutputOptions(output_mode(arguments), output_budget(arguments))
+        current_output.set(options)
+        result = await run_tool(name, arguments)
         
-        return [TextContent(type="text", text=result)]
+        if logger.isEnabledFor(logging.INFO):
+            # Omezení délky logu pro přehlednost
+            logger.info("Výsledek: %s", result[:200] + "..." if len(result) > 200 else result,
+                        extra={"result_chars": len(result)})
+
+        # godot_read_output stránkuje sám
+        if name == "godot_read_output":
+            return [TextContent(type="text", text=result)]
+        text, structured = outputs.limit(result, options)
+        if structured is not None:
+            return [TextContent(type="text", text=text)], structured
+        return [TextContent(type="text", text=text)]
     
     except Exception as e:
         error_msg = f"✗ Kritická chyba v call_tool: {str(e)}"
@@ -1017,18 +1083,42 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
         return [TextContent(type="text", text=error_msg)]
 
 
+async def dump_metrics_periodically():
+    """
+    Průběžný zápis METRICS_FILE (např. pro node_exporter textfile collector).
+    Obsah se sestaví ve smyčce událostí, kde se metriky mění - do vlákna jde jen zápis.
+    """
+    while True:
+        await asyncio.sleep(METRICS_DUMP_INTERVAL)
+        try:
+            _, content = metrics.export(METRICS_FILE)
+            await asyncio.to_thread(write_metrics, METRICS_FILE, content)
+        except Exception as e:
+            logger.error(f"Zápis metrik selhal: {e}")
+
+
 async def main():
     """
     Spustí MCP server přes stdio.
     """
     logger.info("Spouštím Godot MCP Server v5 (Nodes, Scenes, Files, Terrain3D)...")
-    async with stdio_server() as (read_stream, write_stream):
-        logger.info("Server připraven, čekám na příkazy...")
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    dumper = asyncio.create_task(dump_metrics_periodically()) if METRICS_FILE else None
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            logger.info("Server připraven, čekám na příkazy...")
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
+            )
+    finally:
+        if dumper is not None:
+            dumper.cancel()
+            metrics.dump(METRICS_FILE)
+        await jobs.close()
+        await godot_pool.close()
+        await job_pool.close()
+        log_pipeline.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,1268 @@
+#!/usr/bin/env python3
+"""
+Deklarativní registr nástrojů Godot MCP serveru.
+Každý nástroj je definován jednou: popis, vstupní schéma pro list_tools
+a překlad argumentů na příkaz pro Godot TCP server (cmd, přejmenování, výchozí hodnoty).
+"""
+
+import copy
+from typing import Callable
+
+from output_format import OUTPUT_MODES
+
+# Název nástroje -> definice (viz register_tool)
+TOOL_REGISTRY: dict[str, dict] = {}
+
+# Rodiny nástrojů pro filtrovaný výpis katalogu
+TOOL_FAMILIES = {
+    "nodes": "Vytváření a úpravy uzlů, vlastnosti, metody a signály",
+    "scene": "Scény - strom, ukládání, načítání, instance",
+    "env": "WorldEnvironment, pozadí, efekty, expozice",
+    "physics": "Meshe, kolize a fyzikální vrstvy",
+    "filesystem": "Soubory a složky projektu",
+    "terrain": "Terrain3D - heightmapy, textury, instance, bake",
+    "scripts": "GDScript soubory a jejich připojení",
+    "ui2d": "2D uzly a UI layout",
+    "server": "Nástroje samotného MCP serveru (dávky, diagnostika)"
+}
+
+# Volby volání společné všem nástrojům - zpracuje je server, do příkazu pro Godot se nepředávají
+CALL_OPTIONS = {
+    "output": {"type": "string", "enum": list(OUTPUT_MODES), "description": "Formát výsledku (výchozí podle serveru)"},
+    "max_output_bytes": {"type": "integer", "description": "Limit velikosti výsledku v B, zbytek přes godot_read_output (base64 data se nezkracují)"}
+}
+
+
+def register_tool(name: str, description: str, family: str, properties: dict | None = None,
+                  required: list[str] | None = None, cmd: str | None = None, args: dict | None = None,
+                  passthrough: bool = False, builder: Callable[[dict], dict] | None = None, local: bool = False):
+    """
+    Zaregistruje nástroj. Duplicitní název je chyba už při startu serveru.
+
+    family: rodina nástroje (klíč TOOL_FAMILIES) pro filtrovaný výpis katalogu.
+    args: klíč Godot příkazu -> název argumentu nástroje, nebo (název, výchozí hodnota).
+    passthrough: všechny argumenty se předají beze změny a doplní se jen 'cmd'.
+    builder: vlastní funkce pro nástroje, kde 'cmd' závisí na argumentech.
+    local: nástroj obsluhuje přímo MCP server (nemá přímý Godot příkaz).
+    """
+    if name in TOOL_REGISTRY:
+        raise ValueError(f"Duplicitní definice nástroje: {name}")
+    if family not in TOOL_FAMILIES:
+        raise ValueError(f"Nástroj {name} má neznámou rodinu '{family}'")
+    if not local and (cmd is None) == (builder is None):
+        raise ValueError(f"Nástroj {name} musí mít právě jedno z 'cmd' nebo 'builder'")
+
+    properties = dict(properties or {})
+    if not local:
+        # Rozpočet volání lze přepsat u každého příkazového nástroje (viz FAMILY_TIMEOUTS v serveru)
+        properties.setdefault("timeout", {"type": "number", "description": "Timeout volání v s (výchozí podle nástroje)"})
+    for key, option in CALL_OPTIONS.items():
+        properties.setdefault(key, option)
+    schema = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = required
+
+    TOOL_REGISTRY[name] = {
+        "name": name,
+        "description": description,
+        "family": family,
+        "input_schema": schema,
+        "cmd": cmd,
+        "args": args or {},
+        "passthrough": passthrough,
+        "builder": builder,
+        "local": local
+    }
+
+
+def build_command(name: str, arguments: dict) -> dict | None:
+    """
+    Převede volání nástroje na příkaz pro Godot TCP server.
+    Vrací None pro neznámé nástroje a nástroje obsluhované lokálně.
+    """
+    spec = TOOL_REGISTRY.get(name)
+    if spec is None or spec["local"]:
+        return None
+    if spec["builder"] is not None:
+        return spec["builder"](arguments)
+    if spec["passthrough"]:
+        command = {key: value for key, value in arguments.items() if key != "timeout" and key not in CALL_OPTIONS}
+        command["cmd"] = spec["cmd"]
+        return command
+
+    command = {"cmd": spec["cmd"]}
+    for key, source in spec["args"].items():
+        if isinstance(source, tuple):
+            arg_name, default = source
+            # Výchozí list/dict se nesmí sdílet mezi příkazy
+            command[key] = arguments[arg_name] if arg_name in arguments else copy.copy(default)
+        else:
+            command[key] = arguments.get(source)
+    return command
+
+
+def _build_manage_file(arguments: dict) -> dict:
+    if arguments.get("action") == "delete":
+        return {"cmd": "remove_file", "path": arguments.get("path")}
+    return {"cmd": "rename_file", "from_path": arguments.get("path"), "to_path": arguments.get("new_path")}
+
+
+def _build_set_physics_layer(arguments: dict) -> dict:
+    cmd_type = "set_collision_layer" if arguments.get("type") == "layer" else "set_collision_mask"
+    return {"cmd": cmd_type, "path": arguments.get("node_path"), "layer": arguments.get("layer_index"),
+            "enabled": arguments.get("enabled", True)}
+
+
+# ============================================================================
+# ZÁKLADNÍ PRÁCE S UZLY (NODE OPERATIONS)
+# ============================================================================
+
+register_tool(
+    "godot_search_files",
+    "Vyhledá soubory v projektu podle názvu nebo přípony. POUŽIJTE PŘED VYTVÁŘENÍM NOVÝCH SOUBORŮ pro ověření existence nebo pro nalezení assets (textury, modely, skripty).",
+    family="filesystem",
+    properties={
+        "query": {
+            "type": "string",
+            "description": "Hledaný text v názvu souboru (např. 'player', 'grass'). Prázdné = vše."
+        },
+        "extensions": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Filtr přípon (např. ['.gd', '.tscn', '.png'])"
+        },
+        "root": {"type": "string", "default": "res://", "description": "Kde začít hledat"}
+    },
+    cmd="search_files",
+    args={"query": ("query", ""), "extensions": ("extensions", []), "root": ("root", "res://")}
+)
+
+register_tool(
+    "godot_create_node",
+    "Vytvoří nový node v aktivní scéně Godot Editoru.",
+    family="nodes",
+    properties={
+        "node_type": {
+            "type": "string",
+            "description": "Typ node (např. 'Node3D', 'MeshInstance3D', 'Camera3D', 'DirectionalLight3D')"
+        },
+        "name": {"type": "string", "description": "Název nového node"},
+        "parent_path": {"type": "string", "description": "Cesta k parent node (prázdné = root scény)", "default": ""}
+    },
+    required=["node_type", "name"],
+    cmd="create_node",
+    args={"type": "node_type", "name": "name", "parent": ("parent_path", "")}
+)
+
+register_tool(
+    "godot_set_property",
+    "Nastaví vlastnost existujícího node. PODPORUJE VNOŘENÉ RESOURCES pomocí dvojtečky (např. 'shape:size', 'mesh:material:albedo_color').",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k node (např. 'Player/Camera')"},
+        "property_name": {"type": "string", "description": "Název vlastnosti (position, rotation, scale, visible, mesh...) nebo vnořená cesta 'shape:size'"},
+        "value": {"description": "Hodnota - číslo, seznam [x,y,z], boolean, string"}
+    },
+    required=["node_path", "property_name", "value"],
+    cmd="set_prop",
+    args={"path": "node_path", "prop": "property_name", "val": "value"}
+)
+
+register_tool(
+    "godot_reparent_node",
+    "Přesune node pod jiného rodiče (Reparent).",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k node, který se má přesunout"},
+        "new_parent_path": {"type": "string", "description": "Cesta k novému rodiči"},
+        "keep_global_transform": {"type": "boolean", "description": "Zachovat globální pozici?", "default": True}
+    },
+    required=["node_path", "new_parent_path"],
+    cmd="reparent_node",
+    args={
+        "path": "node_path",
+        "new_parent": "new_parent_path",
+        "keep_global_transform": ("keep_global_transform", True)
+    }
+)
+
+register_tool(
+    "godot_duplicate_node",
+    "Duplikuje existující node.",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k originálnímu node"},
+        "new_name": {"type": "string", "description": "Název pro kopii (volitelné)"}
+    },
+    required=["node_path"],
+    cmd="duplicate_node",
+    args={"path": "node_path", "name": ("new_name", "")}
+)
+
+register_tool(
+    "godot_delete_node",
+    "Smaže node ze scény.",
+    family="nodes",
+    properties={"node_path": {"type": "string", "description": "Cesta k node"}},
+    required=["node_path"],
+    cmd="delete_node",
+    args={"path": "node_path"}
+)
+
+register_tool(
+    "godot_rename_node",
+    "Přejmenuje node.",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string", "description": "Stará cesta/název"},
+        "new_name": {"type": "string", "description": "Nový název"}
+    },
+    required=["node_path", "new_name"],
+    cmd="rename_node",
+    args={"path": "node_path", "new_name": "new_name"}
+)
+
+register_tool(
+    "godot_get_node_info",
+    "Získá detailní informace o konkrétním node (pozice, děti, skupiny, připojený skript).",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k node"},
+        "refresh": {"type": "boolean", "description": "Ignorovat cache serveru a načíst aktuální stav z editoru", "default": False}
+    },
+    required=["node_path"],
+    cmd="get_node_info",
+    args={"path": "node_path"}
+)
+
+# ============================================================================
+# PRÁCE SE SCÉNAMI (SCENE MANAGEMENT)
+# ============================================================================
+
+register_tool(
+    "godot_get_scene_tree",
+    "Získá strukturu aktuální scény jako JSON strom. U velkých scén použijte root_path, max_depth, filtry a stránkování, aby se přenášel jen potřebný výřez.",
+    family="scene",
+    properties={
+        "root_path": {"type": "string", "description": "Cesta k uzlu, od kterého vypsat podstrom (prázdné = kořen scény)", "default": ""},
+        "max_depth": {"type": "integer", "minimum": 0, "description": "Maximální hloubka pod root_path (0 = jen samotný uzel). Prázdné = bez omezení."},
+        "node_type": {"type": "string", "description": "Vrátit jen uzly tohoto typu (např. 'MeshInstance3D') jako plochý seznam"},
+        "name_glob": {"type": "string", "description": "Vrátit jen uzly, jejichž název odpovídá masce (např. 'Tree_*') jako plochý seznam"},
+        "page_size": {"type": "integer", "minimum": 1, "description": "Počet uzlů na stránku plochého seznamu"},
+        "cursor": {"type": "integer", "minimum": 0, "description": "Pozice stránky (vrací se jako next_cursor)", "default": 0},
+        "compact": {"type": "boolean", "description": "Kompaktní JSON bez odsazení (menší výstup)", "default": False},
+        "refresh": {"type": "boolean", "description": "Ignorovat cache serveru a načíst aktuální stav z editoru", "default": False}
+    },
+    local=True
+)
+
+register_tool(
+    "godot_save_scene",
+    "Uloží aktuální scénu. BEZPEČNOSTNÍ FUNKCE: Pokud zadáte 'save_path' a soubor již existuje, systém ho nepřepíše, ale automaticky vytvoří kopii s číselným suffixem (např. level_1.tscn).",
+    family="scene",
+    properties={
+        "save_path": {
+            "type": "string",
+            "description": "Cesta pro uložení (res://scenes/level.tscn). Pokud necháte prázdné, přepíše se aktuálně otevřený soubor bez změny názvu.",
+            "default": ""
+        }
+    },
+    cmd="save_scene",
+    args={"path": ("save_path", "")}
+)
+
+register_tool(
+    "godot_create_scene",
+    "Vytvoří zcela novou scénu a otevře ji v editoru.",
+    family="scene",
+    properties={
+        "save_path": {"type": "string", "description": "Cesta pro uložení (např. res://scenes/NewLevel.tscn)"},
+        "root_type": {"type": "string", "description": "Typ root node", "default": "Node3D"},
+        "name": {"type": "string", "description": "Název root node", "default": "SceneRoot"}
+    },
+    required=["save_path"],
+    cmd="create_scene",
+    args={"save_path": "save_path", "root_type": ("root_type", "Node3D"), "name": ("name", "SceneRoot")}
+)
+
+register_tool(
+    "godot_load_scene",
+    "Otevře existující scénu v editoru.",
+    family="scene",
+    properties={"path": {"type": "string", "description": "Cesta k souboru .tscn"}},
+    required=["path"],
+    cmd="load_scene",
+    args={"path": "path"}
+)
+
+register_tool(
+    "godot_add_child_scene",
+    "Instanciuje jinou scénu (.tscn) jako potomka do aktuální scény.",
+    family="scene",
+    properties={
+        "scene_path": {"type": "string", "description": "Cesta k souboru scény (res://...)"},
+        "parent_path": {"type": "string", "description": "Kam přidat (prázdné = root scény)"},
+        "name": {"type": "string", "description": "Název instance (volitelné)"}
+    },
+    required=["scene_path"],
+    cmd="add_child_scene",
+    args={"scene_path": "scene_path", "parent": ("parent_path", ""), "name": ("name", "")}
+)
+
+register_tool(
+    "godot_fix_ownership",
+    "Opraví vlastnictví node (Owner) rekurzivně. DŮLEŽITÉ volat před uložením scény, pokud jste vytvářeli složitější strukturu skriptem.",
+    family="scene",
+    properties={"root_path": {"type": "string", "description": "Cesta k uzlu, od kterého se má opravit vlastnictví"}},
+    required=["root_path"],
+    cmd="set_owner_recursive",
+    args={"path": "root_path"}
+)
+
+register_tool(
+    "godot_env_create",
+    "Vytvoří WorldEnvironment (pokud neexistuje) a inicializuje v něm Environment a CameraAttributesPractical.",
+    family="env",
+    cmd="env_create"
+)
+
+register_tool(
+    "godot_env_set_background",
+    "Nastaví pozadí scény (Obloha, Barva).",
+    family="env",
+    properties={
+        "mode": {
+            "type": "string",
+            "enum": ["clear_color", "custom_color", "sky", "canvas"],
+            "description": "Typ pozadí."
+        },
+        "color": {"type": "array", "items": {"type": "number"}, "description": "[r, g, b] pro custom_color"},
+        "energy": {"type": "number", "description": "Multiplikátor energie (jasu). Default: 1.0"}
+    },
+    required=["mode"],
+    cmd="env_set_background",
+    args={"mode": "mode", "color": ("color", [0, 0, 0]), "energy": ("energy", 1.0)}
+)
+
+register_tool(
+    "godot_env_set_effect",
+    "Pokročilá konfigurace efektů Environment.",
+    family="env",
+    properties={
+        "effect_type": {
+            "type": "string",
+            "enum": ["tonemap", "glow", "fog", "volumetric_fog", "ssao", "ssil", "sdfgi", "adjustment"],
+            "description": "Kterou sekci Environmentu upravit."
+        },
+        "enabled": {"type": "boolean", "description": "Zapnout/Vypnout efekt (netýká se tonemap)."},
+        "params": {
+            "type": "object",
+            "description": "Klíč-hodnota dle dokumentace Godot.\nGlow: intensity, strength, bloom, blend_mode (0-4)\nFog: density, light_color, sun_scatter, height_density\nVolumetricFog: density, albedo, emission, length\nSSAO: radius, intensity, power, detail\nSDFGI: bounce_feedback, cascades, min_cell_size\nAdjustment: brightness, contrast, saturation\nTonemap: mode (0=Linear, 2=Filmic, 3=ACES), exposure, white"
+        }
+    },
+    required=["effect_type"],
+    cmd="env_set_effect",
+    args={"type": "effect_type", "enabled": ("enabled", True), "params": ("params", {})}
+)
+
+register_tool(
+    "godot_env_camera_attributes",
+    "Nastaví CameraAttributes (Expozice, Auto-Exposure).",
+    family="env",
+    properties={
+        "auto_exposure": {"type": "boolean", "description": "Zapnout automatickou expozici?"},
+        "exposure_multiplier": {"type": "number", "description": "Základní jas (Default 1.0)"},
+        "exposure_sensitivity": {"type": "number", "description": "ISO citlivost (Default 100.0)"},
+        "auto_exposure_speed": {"type": "number", "description": "Rychlost adaptace oka (Default 0.5)"},
+        "auto_exposure_scale": {"type": "number", "description": "Škála efektu (Default 0.4)"}
+    },
+    cmd="env_set_camera_attributes",
+    passthrough=True
+)
+
+# ============================================================================
+# MESH A FYZIKA (MESH & PHYSICS)
+# ============================================================================
+
+register_tool(
+    "godot_set_mesh",
+    "Vytvoří a nastaví Mesh (tvar) pro MeshInstance3D.",
+    family="physics",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k MeshInstance3D"},
+        "mesh_type": {
+            "type": "string",
+            "description": "BoxMesh, SphereMesh, CapsuleMesh, CylinderMesh, PlaneMesh, PrismMesh, TorusMesh"
+        },
+        "params": {"type": "object", "description": "Parametry meshe (např. size=[1,1,1], radius=1.0, height=2.0...)"}
+    },
+    required=["node_path", "mesh_type"],
+    cmd="set_mesh",
+    args={"path": "node_path", "mesh_type": "mesh_type", "params": ("params", {})}
+)
+
+register_tool(
+    "godot_add_collision_shape",
+    "Přidá CollisionShape a nastaví mu tvar. Automaticky vytvoří node i shape.",
+    family="physics",
+    properties={
+        "parent_path": {"type": "string", "description": "Rodič (např. RigidBody3D, StaticBody3D, Area3D)"},
+        "shape_type": {
+            "type": "string",
+            "description": "BoxShape3D, SphereShape3D, CapsuleShape3D, CylinderShape3D, RectangleShape2D..."
+        },
+        "params": {"type": "object", "description": "Parametry (size, radius, height)"},
+        "name": {"type": "string", "default": "CollisionShape"}
+    },
+    required=["parent_path", "shape_type"],
+    cmd="add_collision_shape",
+    args={
+        "parent": "parent_path",
+        "shape_type": "shape_type",
+        "params": ("params", {}),
+        "name": ("name", "CollisionShape")
+    }
+)
+
+register_tool(
+    "godot_get_collision_layers",
+    "Vrátí mapu nastavených fyzikálních vrstev (Physics Layers).",
+    family="physics",
+    properties={
+        "type": {"type": "string", "enum": ["2D", "3D"], "default": "3D", "description": "Typ fyziky (2D nebo 3D)."}
+    },
+    cmd="get_collision_layers",
+    args={"type": ("type", "3D")}
+)
+
+register_tool(
+    "godot_set_collision_layer_name",
+    "Přejmenuje, vytvoří nebo smaže název fyzikální vrstvy v Project Settings.",
+    family="physics",
+    properties={
+        "index": {"type": "integer", "minimum": 1, "maximum": 32, "description": "Číslo vrstvy (1-32)."},
+        "name": {"type": "string", "description": "Nový název vrstvy. Pro smazání/resetování nechte prázdné."},
+        "type": {"type": "string", "enum": ["2D", "3D"], "default": "3D"}
+    },
+    required=["index", "name"],
+    cmd="set_collision_layer_name",
+    args={"index": "index", "name": "name", "type": ("type", "3D")}
+)
+
+register_tool(
+    "godot_set_physics_layer",
+    "Nastaví Collision Layer nebo Mask na konkrétním node.",
+    family="physics",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k node"},
+        "type": {
+            "type": "string",
+            "description": "'layer' (objekt je v této vrstvě) nebo 'mask' (objekt skenuje tuto vrstvu)"
+        },
+        "layer_index": {"type": "integer", "description": "Číslo vrstvy (1-32)"},
+        "enabled": {"type": "boolean", "description": "Zapnout (True) nebo vypnout (False)", "default": True}
+    },
+    required=["node_path", "type", "layer_index"],
+    builder=_build_set_physics_layer
+)
+
+# ============================================================================
+# SOUBOROVÝ SYSTÉM (FILESYSTEM)
+# ============================================================================
+
+register_tool(
+    "godot_list_files",
+    "Vypíše soubory a složky v zadané cestě. Užitečné pro nalezení assets (.obj, .png, .tscn) nebo kontrolu struktury projektu.",
+    family="filesystem",
+    properties={
+        "path": {"type": "string", "description": "Cesta (res://...)", "default": "res://"},
+        "recursive": {"type": "boolean", "description": "Prohledat i podsložky?", "default": False},
+        "extensions": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Filtr přípon (např. ['.tscn', '.gd', '.tres'])"
+        }
+    },
+    cmd="list_dir",
+    args={"path": ("path", "res://"), "recursive": ("recursive", False), "extensions": ("extensions", [])}
+)
+
+register_tool(
+    "godot_make_directory",
+    "Vytvoří novou složku (vytváří i chybějící rodičovské složky).",
+    family="filesystem",
+    properties={"path": {"type": "string", "description": "Cesta nové složky (res://assets/models)"}},
+    required=["path"],
+    cmd="make_dir",
+    args={"path": "path"}
+)
+
+register_tool(
+    "godot_manage_file",
+    "Přejmenuje, přesune nebo smaže soubor či složku.",
+    family="filesystem",
+    properties={
+        "action": {
+            "type": "string",
+            "enum": ["rename", "move", "delete"],
+            "description": "Akce, kterou chcete provést"
+        },
+        "path": {"type": "string", "description": "Cesta k souboru/složce"},
+        "new_path": {"type": "string", "description": "Nová cesta (pouze pro rename/move)"}
+    },
+    required=["action", "path"],
+    builder=_build_manage_file
+)
+
+# ============================================================================
+# TERRAIN 3D (PLUGIN INTEGRATION)
+# ============================================================================
+
+register_tool(
+    "godot_terrain_create",
+    "Vytvoří Terrain3D (v1.0+). POZOR: Parametr 'storage_path' je povinný pro správné ukládání dat.",
+    family="terrain",
+    properties={
+        "name": {"type": "string", "default": "Terrain3D"},
+        "parent_path": {"type": "string"},
+        "storage_path": {
+            "type": "string",
+            "description": "Cesta k ADRESÁŘI pro data (např. res://terrain_data). MUSÍ BÝT VYPLNĚNO.",
+            "default": "res://terrain_data"
+        }
+    },
+    required=["storage_path"],
+    cmd="create_terrain",
+    args={"name": "name", "parent_path": "parent_path", "storage_path": ("storage_path", "")}
+)
+
+register_tool(
+    "godot_terrain_import_heightmap",
+    "Importuje obrázek (PNG/EXR/RAW) jako heightmapu do Terrain3D. Modifikuje výšku terénu na dané pozici. "
+    "Opakovaný import posílá jen regiony, jejichž obsah se od minulého importu změnil.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D uzlu"},
+        "file_path": {"type": "string", "description": "Absolutní cesta k obrázku (res://...)"},
+        "min_height": {"type": "number", "description": "Nejnižší bod (černá barva). Default: 0.0", "default": 0.0},
+        "max_height": {"type": "number", "description": "Nejvyšší bod (bílá barva). Default: 100.0", "default": 100.0},
+        "position": {
+            "type": "array",
+            "items": {"type": "number"},
+            "description": "Pozice [x, y, z] kde se má heightmapa aplikovat (Terrain3D bere jen x a z). Default: [0,0,0]",
+            "default": [0, 0, 0]
+        },
+        "incremental": {"type": "boolean", "default": True,
+                        "description": "Poslat jen regiony změněné od posledního importu do terénu v tomto běhu serveru "
+                                       "a scéně (false = vždy celý obraz, např. po ručních úpravách terénu)"}
+    },
+    required=["node_path", "file_path"],
+    cmd="terrain_import_heightmap",
+    args={
+        "node_path": "node_path",
+        "file_path": "file_path",
+        "min_height": ("min_height", 0.0),
+        "max_height": ("max_height", 100.0),
+        "position": ("position", [0, 0, 0])
+    }
+)
+
+register_tool(
+    "godot_terrain_generate_heightmap",
+    "Vygeneruje heightmapu na serveru (vektorově, po dlaždicích - i 8193x8193) z vrstev: kopce, hřbety, fraktální šum, "
+    "termální eroze. Výstup PNG 16-bit / R16 / float32 (.npy, .f32); s 'import_to' se rovnou importuje do Terrain3D.",
+    family="terrain",
+    properties={
+        "output_path": {"type": "string", "description": "Výstupní soubor (.png, .r16, .raw, .npy, .f32) - absolutní, nebo res:// (GODOT_PROJECT_DIR)"},
+        "size": {"type": "integer", "minimum": 2, "description": "Šířka i výška v pixelech (např. 1025, 4097)", "default": 513},
+        "width": {"type": "integer", "minimum": 2},
+        "height": {"type": "integer", "minimum": 2},
+        "preset": {"type": "string", "enum": ["hill", "mountains"], "description": "Hotová sestava vrstev", "default": "hill"},
+        "layers": {
+            "type": "array",
+            "description": "Vrstvy v pořadí (přebíjí preset). Souřadnice 0..1 přes mapu. Typy: "
+                           "hill {center [u,v], radius, height, falloff linear|gaussian|cosine}, "
+                           "ridge {start, end, width, height, falloff}, "
+                           "noise {octaves, frequency, persistence, lacunarity, amplitude, ridged, seed}, "
+                           "erosion {iterations, talus, strength}. Volitelně blend: add|max|multiply.",
+            "items": {"type": "object"}
+        },
+        "seed": {"type": "integer", "default": 0},
+        "normalize": {"type": "boolean", "description": "Roztáhnout výšky na celý rozsah 0..1", "default": True},
+        "import_to": {
+            "type": "object",
+            "description": "Po vygenerování importovat do Terrain3D (jako godot_terrain_import_heightmap)",
+            "properties": {
+                "node_path": {"type": "string"},
+                "min_height": {"type": "number", "default": 0.0},
+                "max_height": {"type": "number", "default": 100.0},
+                "position": {"type": "array", "items": {"type": "number"}, "default": [0, 0, 0]},
+                "incremental": {"type": "boolean", "default": True,
+                                "description": "Jen regiony změněné od posledního importu (false = celý obraz)"}
+            },
+            "required": ["node_path"]
+        }
+    },
+    required=["output_path"],
+    local=True
+)
+
+register_tool(
+    "godot_terrain_convert_heightmap",
+    "Převede RAW/R16 heightmapu (např. export z Unity, 8-bit nebo 16-bit, little/big-endian) na EXR (float32), "
+    "16-bit PNG nebo R16. Soubor se čte memory-mapped a zapisuje po pásech řádků - zvládne i 8k x 8k bez načtení do paměti.",
+    family="terrain",
+    properties={
+        "input_path": {"type": "string", "description": "Vstupní RAW/R16 - absolutní cesta, nebo res:// (GODOT_PROJECT_DIR)"},
+        "output_path": {"type": "string", "description": "Výstup (.exr, .png, .r16, .raw) - absolutní, nebo res://"},
+        "width": {"type": "integer", "minimum": 1, "description": "Šířka vstupu (výchozí: odvodit, čtverec)"},
+        "height": {"type": "integer", "minimum": 1, "description": "Výška vstupu (výchozí: odvodit, čtverec)"},
+        "bits": {"type": "integer", "enum": [8, 16], "description": "Bitová hloubka vstupu (výchozí: odvodit)"},
+        "endian": {"type": "string", "enum": ["auto", "little", "big"], "default": "auto",
+                   "description": "Pořadí bajtů 16bitového vstupu (auto = odhad podle hladkosti dat)"},
+        "flip_y": {"type": "boolean", "default": False, "description": "Převrátit svisle (Unity ukládá od spodního řádku)"},
+        "exr_scale": {"type": "number", "default": 1.0, "description": "Násobitel hodnot 0..1 v EXR (např. maximální výška)"},
+        "import_to": {
+            "type": "object",
+            "description": "Po převodu importovat do Terrain3D (jen PNG nebo R16/RAW)",
+            "properties": {
+                "node_path": {"type": "string"},
+                "min_height": {"type": "number", "default": 0.0},
+                "max_height": {"type": "number", "default": 100.0},
+                "position": {"type": "array", "items": {"type": "number"}, "default": [0, 0, 0]},
+                "incremental": {"type": "boolean", "default": True,
+                                "description": "Jen regiony změněné od posledního importu (false = celý obraz)"}
+            },
+            "required": ["node_path"]
+        }
+    },
+    required=["input_path", "output_path"],
+    local=True
+)
+
+register_tool(
+    "godot_terrain_configure",
+    "Konfiguruje hlavní parametry terénu (velikost, LOD, mezery mezi vertexy).",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "vertex_spacing": {"type": "number", "description": "Vzdálenost mezi vrcholy (škálování terénu). Default: 1.0"},
+        "mesh_size": {"type": "integer", "description": "Velikost meshe (kvalita). Default: 48"},
+        "mesh_lods": {"type": "integer", "description": "Počet LOD úrovní. Default: 7"},
+        "region_size": {"type": "integer", "description": "Velikost regionu (64, 128, 256, 512, 1024). Default: 256"},
+        "cull_margin": {"type": "number", "description": "Extra margin pro vykreslování"}
+    },
+    required=["node_path"],
+    cmd="terrain_configure",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_physics",
+    "Nastavuje kolize a fyziku pro Terrain3D.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "collision_enabled": {"type": "boolean", "description": "Zapnout/vypnout kolize"},
+        "layer": {"type": "integer", "description": "Collision Layer (bitmask hodnota)"},
+        "mask": {"type": "integer", "description": "Collision Mask (bitmask hodnota)"},
+        "priority": {"type": "number", "description": "Priorita kolize. Default: 1.0"},
+        "radius": {"type": "integer", "description": "Collision Radius. Default: 64"}
+    },
+    required=["node_path"],
+    cmd="terrain_physics",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_rendering",
+    "Nastavuje renderovací vlastnosti terénu (stíny, GI).",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "cast_shadows": {"type": "integer", "description": "0=Off, 1=On, 2=DoubleSided, 3=ShadowsOnly. Default: 1"},
+        "gi_mode": {"type": "integer", "description": "0=Disabled, 1=Static, 2=Dynamic. Default: 1"},
+        "render_layers": {"type": "integer", "description": "Visual Layers (bitmask). Default: 1"}
+    },
+    required=["node_path"],
+    cmd="terrain_rendering",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_task",
+    "Spustí pokročilý Import/Export úkol pro Terrain3D (Heightmapy, ColorMapy, RAW/R16). "
+    "Import výšek posílá jen regiony změněné od minulého importu do stejné data_dir.",
+    family="terrain",
+    properties={
+        "task_type": {"type": "string", "enum": ["import", "export"]},
+        "map_type": {"type": "string", "enum": ["height", "color", "control"], "description": "Typ mapy."},
+        "file_path": {"type": "string", "description": "Cesta k souboru (res://... nebo absolutní C:/...)"},
+        "data_dir": {"type": "string", "description": "Složka s daty terénu (res://terrain_data)."},
+        "params": {
+            "type": "object",
+            "description": "Parametry pro import/export.\nImport: position [x,y,z], scale, offset, min_height, max_height, r16_dim [w,h]\nExport: (žádné speciální parametry)"
+        },
+        "incremental": {"type": "boolean", "default": True,
+                        "description": "Import výšek: poslat jen regiony změněné od posledního importu do data_dir (false = celý obraz)"}
+    },
+    required=["task_type", "map_type", "file_path", "data_dir"],
+    cmd="terrain_task",
+    args={
+        "task_type": "task_type",
+        "map_type": "map_type",
+        "file_path": "file_path",
+        "data_dir": "data_dir",
+        "params": ("params", {})
+    }
+)
+
+register_tool(
+    "godot_terrain_add_texture",
+    "Přidá sadu textur (Albedo + Normal) do palety terénu.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string"},
+        "name": {"type": "string", "description": "Název pro identifikaci (např. 'Grass_Green')"},
+        "albedo_path": {"type": "string", "description": "Cesta k albedo textuře"},
+        "normal_path": {"type": "string", "description": "Cesta k normal mapě (volitelné)"},
+        "uv_scale": {"type": "number", "default": 1.0}
+    },
+    required=["node_path", "albedo_path"],
+    cmd="terrain_add_texture",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_add_mesh",
+    "Registruje 3D model (strom, kámen, tráva) do systému terénu pro pozdější instancování.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string"},
+        "mesh_path": {"type": "string", "description": "Cesta k .obj, .glb, .tscn souboru"},
+        "name": {"type": "string", "description": "Název (např. 'PineTree')"},
+        "scale_variance": {"type": "number", "default": 0.2, "description": "Náhodná variace velikosti"}
+    },
+    required=["node_path", "mesh_path"],
+    cmd="terrain_add_mesh",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_place_instances",
+    "Rozmístí instance (stromy/trávu) na terén na zadané souřadnice.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string"},
+        "mesh_id": {"type": "integer", "description": "ID meshu (vráceno z add_mesh, startuje od 0)"},
+        "positions": {
+            "type": "array",
+            "items": {"type": "array", "items": {"type": "number"}},
+            "description": "Seznam pozic [[x,y,z], [x,y,z], ...]"
+        },
+        "auto_height": {
+            "type": "boolean",
+            "default": True,
+            "description": "Automaticky přichytit k zemi (ignoruje Y v pozici)"
+        }
+    },
+    required=["node_path", "mesh_id", "positions"],
+    cmd="terrain_place_instances",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_place_instances_bulk",
+    "Hromadně rozmístí desítky tisíc instancí (stromy/tráva) binární cestou: pozice jako packed float32 (base64 nebo .npy soubor) "
+    "s volitelnou rotací a měřítkem. Data se posílají do Godot po částech s hlášením průběhu.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "mesh_id": {"type": "integer", "description": "ID meshu (vráceno z add_mesh, startuje od 0)"},
+        "data": {
+            "type": "string",
+            "description": "Base64 little-endian float32 hodnot po řádcích [x,y,z] (stride 3), [x,y,z,rot_y] (4) nebo [x,y,z,rot_y,scale] (5). rot_y v radiánech."
+        },
+        "stride": {"type": "integer", "enum": [3, 4, 5], "description": "Počet float32 hodnot na instanci v 'data'", "default": 3},
+        "npy_path": {"type": "string", "description": "Absolutní cesta k .npy souboru s polem tvaru (N, 3|4|5) - alternativa k 'data'"},
+        "positions": {
+            "type": "array",
+            "items": {"type": "array", "items": {"type": "number"}},
+            "description": "Pozice [[x,y,z], ...] - alternativa k 'data' pro menší dávky"
+        },
+        "rotations": {"type": "array", "items": {"type": "number"}, "description": "Rotace kolem Y (radiány) ke 'positions'"},
+        "scales": {"type": "array", "items": {"type": "number"}, "description": "Měřítka ke 'positions'"},
+        "auto_height": {
+            "type": "boolean",
+            "default": True,
+            "description": "Automaticky přichytit k zemi (ignoruje Y v pozici)"
+        },
+        "chunk_size": {"type": "integer", "minimum": 1, "description": "Počet instancí v jednom příkazu pro Godot", "default": 4096}
+    },
+    required=["node_path", "mesh_id"],
+    local=True
+)
+
+register_tool(
+    "godot_terrain_scatter",
+    "Vygeneruje rozmístění instancí (stromy/tráva/kameny) přímo na serveru podle pravidla hustoty: Poisson-disk nebo "
+    "jitterovaná mřížka v oblasti, limity výšky a sklonu z lokální heightmapy, maska vyloučení a seed. "
+    "Výsledek se pošle do Godot binární cestou - není třeba počítat pozice ručně.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "mesh_id": {"type": "integer", "description": "ID meshu (vráceno z add_mesh, startuje od 0)"},
+        "region": {
+            "type": "array",
+            "items": {"type": "number"},
+            "minItems": 4,
+            "maxItems": 4,
+            "description": "Oblast [x_min, z_min, x_max, z_max] ve světových souřadnicích"
+        },
+        "method": {"type": "string", "enum": ["poisson", "jittered_grid"], "default": "poisson"},
+        "spacing": {"type": "number", "description": "Minimální vzdálenost (poisson) nebo velikost buňky mřížky", "default": 2.0},
+        "jitter": {"type": "number", "minimum": 0, "maximum": 1, "description": "Náhodný posun v buňce (jittered_grid)", "default": 1.0},
+        "seed": {"type": "integer", "description": "Seed pro opakovatelný výsledek"},
+        "max_instances": {"type": "integer", "minimum": 0, "description": "Horní limit počtu instancí"},
+        "heightmap_path": {"type": "string", "description": "Lokální heightmapa (PNG/R16/RAW/NPY) - stejná jako při importu do terénu"},
+        "min_height": {"type": "number", "description": "Výška černé barvy heightmapy", "default": 0.0},
+        "max_height": {"type": "number", "description": "Výška bílé barvy heightmapy", "default": 100.0},
+        "heightmap_position": {"type": "array", "items": {"type": "number"}, "description": "Pozice [x,y,z] levého horního rohu heightmapy (y se ignoruje, jako při importu do Terrain3D)", "default": [0, 0, 0]},
+        "vertex_spacing": {"type": "number", "description": "Vzdálenost pixelů heightmapy ve světě", "default": 1.0},
+        "r16_dim": {"type": "array", "items": {"type": "integer"}, "description": "Rozměry [w, h] pro RAW/R16"},
+        "height_range": {"type": "array", "items": {"type": "number"}, "description": "Povolený rozsah výšek [min, max]"},
+        "slope_range": {"type": "array", "items": {"type": "number"}, "description": "Povolený sklon ve stupních [min, max]"},
+        "exclusion_mask": {"type": "string", "description": "Obrázek přes celý region - bílá (>= 0.5) = bez instancí (cesty, budovy)"},
+        "density_map": {"type": "string", "description": "Obrázek přes celý region - jas = pravděpodobnost ponechání instance"},
+        "random_rotation": {"type": "boolean", "description": "Náhodná rotace kolem Y", "default": True},
+        "scale_range": {"type": "array", "items": {"type": "number"}, "description": "Náhodné měřítko [min, max]"},
+        "auto_height": {"type": "boolean", "description": "Přichytit k zemi v Godot (výchozí jen bez heightmap_path)"},
+        "chunk_size": {"type": "integer", "minimum": 1, "description": "Počet instancí v jednom příkazu pro Godot", "default": 4096},
+        "dry_run": {"type": "boolean", "description": "Jen spočítat a vrátit statistiky, nic neodesílat", "default": False}
+    },
+    required=["node_path", "mesh_id", "region"],
+    local=True
+)
+
+register_tool(
+    "godot_terrain_bake_navmesh",
+    "Vypeče Navigační Mesh pro terén (umožní AI agentům chodit).",
+    family="terrain",
+    properties={"node_path": {"type": "string"}},
+    required=["node_path"],
+    cmd="terrain_bake_navmesh",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_raycast",
+    "Zjistí výšku a pozici na terénu (Physics-free raycast).",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string"},
+        "x": {"type": "number"},
+        "z": {"type": "number"},
+        "refresh": {"type": "boolean", "description": "Ignorovat lokální cache výšek a zeptat se editoru", "default": False}
+    },
+    required=["node_path", "x", "z"],
+    cmd="terrain_raycast",
+    args={"node_path": "node_path", "x": "x", "z": "z"}
+)
+
+register_tool(
+    "godot_2d_create",
+    "Vytvoří 2D uzel (Sprite2D, Node2D, Label, Control).",
+    family="ui2d",
+    properties={
+        "type": {"type": "string", "description": "Typ uzlu (např. Sprite2D, Label, Node2D)"},
+        "name": {"type": "string"},
+        "parent_path": {"type": "string"},
+        "position": {"type": "array", "items": {"type": "number"}, "description": "[x, y]"},
+        "texture_path": {"type": "string", "description": "Pouze pro Sprite2D: cesta k obrázku"},
+        "text": {"type": "string", "description": "Pouze pro Label/Button: text"}
+    },
+    required=["type", "name"],
+    cmd="create_node_2d",
+    passthrough=True
+)
+
+register_tool(
+    "godot_2d_transform",
+    "Nastaví pozici, rotaci a měřítko pro 2D uzel.",
+    family="ui2d",
+    properties={
+        "node_path": {"type": "string"},
+        "position": {"type": "array", "items": {"type": "number"}, "description": "[x, y]"},
+        "rotation": {"type": "number", "description": "Úhel ve stupních"},
+        "scale": {"type": "array", "items": {"type": "number"}, "description": "[x, y]"}
+    },
+    required=["node_path"],
+    cmd="set_transform_2d",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_visuals",
+    "Ovládá vizuální debugování terénu (mřížky, wireframe, heightmapy).",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "show_grid": {"type": "boolean", "description": "Zobrazit mřížku regionů"},
+        "show_instances": {"type": "boolean", "description": "Zobrazit instancované meshe"},
+        "show_heightmap": {"type": "boolean", "description": "Debug zobrazení heightmapy"},
+        "show_colormap": {"type": "boolean", "description": "Debug zobrazení colormapy"},
+        "debug_level": {"type": "integer", "description": "0=Errors, 1=Info, 2=Debug, 3=Extreme"}
+    },
+    required=["node_path"],
+    cmd="terrain_visuals",
+    passthrough=True
+)
+
+register_tool(
+    "godot_terrain_bake_mesh",
+    "Vypeče terén do statického ArrayMesh (pro navmesh nebo export).",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "lod": {"type": "integer", "description": "Úroveň detailu (0-8). Default: 4"},
+        "save_path": {"type": "string", "description": "Cesta pro uložení .res souboru (např. res://terrain_mesh.res)"}
+    },
+    required=["node_path"],
+    cmd="terrain_bake_mesh",
+    args={"node_path": "node_path", "lod": ("lod", 4), "save_path": ("save_path", "")}
+)
+
+register_tool(
+    "godot_terrain_get_height",
+    "Získá výšku terénu na dané pozici (X, Z).",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D"},
+        "x": {"type": "number", "description": "Souřadnice X"},
+        "z": {"type": "number", "description": "Souřadnice Z"},
+        "refresh": {"type": "boolean", "description": "Ignorovat lokální cache výšek a zeptat se editoru", "default": False}
+    },
+    required=["node_path", "x", "z"],
+    cmd="terrain_get_height",
+    args={"node_path": "node_path", "x": "x", "z": "z"}
+)
+
+register_tool(
+    "godot_terrain_sample_heights",
+    "Dávková varianta godot_terrain_get_height / godot_terrain_raycast: výšky (a normály) pro mnoho bodů v jedné odpovědi. "
+    "Body jako seznam, packed float32 nebo mřížka. Režim 'local' počítá z lokální heightmapy bez dotazu na editor.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D (režim editor)"},
+        "points": {"type": "array", "items": {"type": "array", "items": {"type": "number"}}, "description": "Body [[x, z], ...]"},
+        "points_data": {"type": "string", "description": "Base64 little-endian float32 dvojic (x, z) - alternativa k 'points'"},
+        "grid": {
+            "type": "object",
+            "description": "Mřížka bodů: origin [x, z], step (číslo nebo [sx, sz]), count [nx, nz]; výsledek po řádcích podle z",
+            "properties": {
+                "origin": {"type": "array", "items": {"type": "number"}},
+                "step": {"type": ["number", "array"], "items": {"type": "number"}},
+                "count": {"type": "array", "items": {"type": "integer"}}
+            }
+        },
+        "mode": {"type": "string", "enum": ["editor", "local"], "description": "Zdroj výšek", "default": "editor"},
+        "query": {"type": "string", "enum": ["height", "raycast"], "description": "Typ dotazu v editoru", "default": "height"},
+        "include_normals": {"type": "boolean", "description": "Vrátit i normály terénu", "default": False},
+        "refresh": {"type": "boolean", "description": "Režim editor: ignorovat lokální cache výšek", "default": False},
+        "normal_step": {"type": "number", "description": "Krok pro výpočet normál z okolních výšek (starší bridge)", "default": 1.0},
+        "encoding": {
+            "type": "string",
+            "enum": ["auto", "json", "base64"],
+            "description": "Formát výsledku: JSON seznamy, base64 float32, nebo auto (JSON do 1000 bodů)",
+            "default": "auto"
+        },
+        "heightmap_path": {"type": "string", "description": "Lokální heightmapa pro režim 'local' (PNG/R16/RAW/NPY)"},
+        "min_height": {"type": "number", "default": 0.0},
+        "max_height": {"type": "number", "default": 100.0},
+        "heightmap_position": {"type": "array", "items": {"type": "number"}, "description": "Pozice [x,y,z] levého horního rohu heightmapy (y se ignoruje, jako při importu do Terrain3D)", "default": [0, 0, 0]},
+        "vertex_spacing": {"type": "number", "default": 1.0},
+        "r16_dim": {"type": "array", "items": {"type": "integer"}, "description": "Rozměry [w, h] pro RAW/R16"}
+    },
+    local=True
+)
+
+register_tool(
+    "godot_terrain_cache_load",
+    "Načte heightmapu (PNG/R16/RAW/NPY, např. export z godot_terrain_task) do lokální dlaždicové cache výšek. "
+    "Dotazy na výšku, sklon a raycast se pak obslouží bez editoru. Importy přes MCP cache aktualizují samy.",
+    family="terrain",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k Terrain3D (nebo data_dir)"},
+        "data_dir": {"type": "string", "description": "Datová složka terénu (alternativa k node_path)"},
+        "file_path": {"type": "string", "description": "Cesta k heightmapě (absolutní, res:// vyžaduje GODOT_PROJECT_DIR)"},
+        "min_height": {"type": "number", "description": "Výška černé barvy", "default": 0.0},
+        "max_height": {"type": "number", "description": "Výška bílé barvy", "default": 100.0},
+        "position": {"type": "array", "items": {"type": "number"}, "description": "Pozice [x,y,z] levého horního rohu", "default": [0, 0, 0]},
+        "r16_dim": {"type": "array", "items": {"type": "integer"}, "description": "Rozměry [w, h] pro RAW/R16"}
+    },
+    required=["file_path"],
+    local=True
+)
+
+register_tool(
+    "godot_get_property",
+    "Přečte aktuální hodnotu vlastnosti (i vnořené). Užitečné pro ověření stavu.",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string"},
+        "property_name": {"type": "string"},
+        "refresh": {"type": "boolean", "description": "Ignorovat cache serveru a načíst aktuální stav z editoru", "default": False}
+    },
+    required=["node_path", "property_name"],
+    cmd="get_prop",
+    args={"path": "node_path", "prop": "property_name"}
+)
+
+register_tool(
+    "godot_call_method",
+    "Zavolá libovolnou metodu na uzlu (např. 'look_at', 'apply_impulse').",
+    family="nodes",
+    properties={
+        "node_path": {"type": "string"},
+        "method_name": {"type": "string"},
+        "args": {"type": "array", "items": {}, "description": "Seznam argumentů funkce", "default": []}
+    },
+    required=["node_path", "method_name"],
+    cmd="call_method",
+    args={"path": "node_path", "method": "method_name", "args": ("args", [])}
+)
+
+register_tool(
+    "godot_connect_signal",
+    "Propojí signál z jednoho uzlu na metodu jiného uzlu.",
+    family="nodes",
+    properties={
+        "source_path": {"type": "string", "description": "Kdo vysílá (např. Button)"},
+        "signal_name": {"type": "string", "description": "Název signálu (např. 'pressed')"},
+        "target_path": {"type": "string", "description": "Kdo poslouchá"},
+        "method_name": {"type": "string", "description": "Funkce, co se spustí (např. '_on_button_pressed')"}
+    },
+    required=["source_path", "signal_name", "target_path", "method_name"],
+    cmd="connect_signal",
+    passthrough=True
+)
+
+register_tool(
+    "godot_ui_set_layout",
+    "Nastaví UI Layout Preset (kotvení) pro Control uzly (např. 'full_rect', 'center', 'top_left').",
+    family="ui2d",
+    properties={
+        "node_path": {"type": "string"},
+        "preset": {
+            "type": "string",
+            "enum": ["top_left", "top_right", "bottom_left", "bottom_right", "center_left", "center_top", "center_right", "center_bottom", "center", "full_rect", "top_wide", "bottom_wide", "left_wide", "right_wide", "v_center_wide", "h_center_wide"],
+            "description": "Typ layoutu (odpovídá menu Layout v editoru)."
+        }
+    },
+    required=["node_path", "preset"],
+    cmd="ui_set_layout",
+    passthrough=True
+)
+
+# ============================================================================
+# PRÁCE SE SKRIPTY (SCRIPTING)
+# ============================================================================
+
+register_tool(
+    "godot_create_script",
+    "Vytvoří nový skript. POZOR: Pokud soubor existuje, systém automaticky vytvoří unikátní název (např. script_1.gd), pokud není nastaveno overwrite=True.",
+    family="scripts",
+    properties={
+        "path": {"type": "string"},
+        "content": {"type": "string"},
+        "overwrite": {
+            "type": "boolean",
+            "description": "Pokud True, přepíše existující soubor. Pokud False (default), vytvoří nový název.",
+            "default": False
+        }
+    },
+    required=["path", "content"],
+    cmd="create_script",
+    args={"path": "path", "content": "content", "overwrite": ("overwrite", False)}
+)
+
+register_tool(
+    "godot_read_script",
+    "Přečte obsah existujícího skriptu.",
+    family="scripts",
+    properties={"path": {"type": "string", "description": "Cesta k souboru (res://...)"}},
+    required=["path"],
+    cmd="get_script_content",
+    args={"path": "path"}
+)
+
+register_tool(
+    "godot_attach_script",
+    "Připojí existující skript k nodu.",
+    family="scripts",
+    properties={
+        "node_path": {"type": "string", "description": "Cesta k node"},
+        "script_path": {"type": "string", "description": "Cesta ke skriptu (res://...)"}
+    },
+    required=["node_path", "script_path"],
+    cmd="attach_script",
+    args={"path": "node_path", "script_path": "script_path"}
+)
+
+register_tool(
+    "godot_detach_script",
+    "Odpojí skript od nodu.",
+    family="scripts",
+    properties={"node_path": {"type": "string", "description": "Cesta k node"}},
+    required=["node_path"],
+    cmd="detach_script",
+    args={"path": "node_path"}
+)
+
+# ============================================================================
+# DÁVKOVÉ ZPRACOVÁNÍ (BATCH)
+# ============================================================================
+
+register_tool(
+    "godot_batch",
+    "Provede seznam volání ostatních nástrojů jedním požadavkem (jeden round trip, jeden krok Undo). Vhodné pro stavbu levelu z mnoha create_node/set_property/add_collision_shape volání.",
+    family="server",
+    properties={
+        "commands": {
+            "type": "array",
+            "description": "Seřazený seznam volání, např. [{\"tool\": \"godot_create_node\", \"arguments\": {\"node_type\": \"Node3D\", \"name\": \"Level\"}}]",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tool": {"type": "string", "description": "Název nástroje (např. 'godot_set_property')"},
+                    "arguments": {"type": "object", "description": "Argumenty nástroje"}
+                },
+                "required": ["tool"]
+            }
+        },
+        "stop_on_error": {
+            "type": "boolean",
+            "description": "Zastavit při první chybě (True) nebo pokračovat (False)",
+            "default": True
+        },
+        "atomic": {
+            "type": "boolean",
+            "description": "Při chybě vrátit všechny změny dávky zpět (rollback)",
+            "default": False
+        },
+        "timeout": {"type": "number", "description": "Timeout celé dávky v s (výchozí 60)"}
+    },
+    required=["commands"],
+    local=True
+)
+
+register_tool(
+    "godot_list_tools",
+    "Vypíše katalog nástrojů filtrovaný podle rodiny a po stránkách, včetně rodin, které server nenabízí v seznamu nástrojů. Vhodné, když klient potřebuje jen část nástrojů (např. jen 'terrain').",
+    family="server",
+    properties={
+        "family": {
+            "type": "string",
+            "enum": list(TOOL_FAMILIES),
+            "description": "Rodina nástrojů. Prázdné = přehled rodin s počty nástrojů."
+        },
+        "cursor": {"type": "integer", "description": "Pozice stránky (vrací se jako next_cursor)", "default": 0},
+        "limit": {"type": "integer", "description": "Počet nástrojů na stránku", "default": 20},
+        "include_schema": {"type": "boolean", "description": "Zahrnout vstupní schémata", "default": False}
+    },
+    local=True
+)
+
+register_tool(
+    "godot_cache_stats",
+    "Vrátí statistiky cache na serveru: zrcadlo scény (hity/missy, invalidace, zastaralé podstromy), "
+    "dlaždicová cache výšek terénu (dlaždice, LRU) a manifest inkrementálních importů heightmap.",
+    family="server",
+    properties={
+        "clear": {"type": "boolean", "description": "Po výpisu cache vyprázdnit", "default": False}
+    },
+    local=True
+)
+
+register_tool(
+    "godot_server_stats",
+    "Metriky nástrojů za běh serveru: počty volání a chyb, latence (p50/p95/p99) po fázích - spojení, odeslání, "
+    "zpracování v Godot, příjem, formátování, lokální práce - a velikosti požadavků/odpovědí. Seřazeno podle "
+    "celkového času, takže je vidět, které nástroje dominují sezení.",
+    family="server",
+    properties={
+        "tool": {"type": "string", "description": "Jen tento nástroj"},
+        "format": {"type": "string", "enum": ["json", "prometheus"], "default": "json"},
+        "dump_path": {"type": "string", "description": "Zapsat metriky do souboru (.json = JSON, jinak Prometheus text)"},
+        "reset": {"type": "boolean", "description": "Po výpisu metriky vynulovat", "default": False}
+    },
+    local=True
+)
+
+register_tool(
+    "godot_read_output",
+    "Pokračování zkráceného výsledku: vrátí další část podle kurzoru z konce zkráceného výstupu "
+    "(další kurzor je opět na konci, dokud výsledek nedojde).",
+    family="server",
+    properties={
+        "cursor": {"type": "string", "description": "Kurzor ze zkráceného výsledku, např. out-3:65536"}
+    },
+    required=["cursor"],
+    local=True
+)
+
+register_tool(
+    "godot_job_submit",
+    "Spustí nástroj jako úlohu na pozadí a hned vrátí job_id (bake meshe/navmeshe, import/export terénu, "
+    "generování heightmap). Úloha má timeout podle typu a neblokuje ostatní nástroje; "
+    "stav čti přes godot_job_status/godot_job_logs, výsledek přes godot_job_result.",
+    family="server",
+    properties={
+        "tool": {"type": "string", "description": "Název nástroje, např. godot_terrain_bake_navmesh"},
+        "arguments": {"type": "object", "description": "Argumenty nástroje (stejné jako při přímém volání)"},
+        "timeout": {"type": "number", "description": "Timeout úlohy v sekundách (výchozí podle typu nástroje)"}
+    },
+    required=["tool"],
+    local=True
+)
+
+register_tool(
+    "godot_job_status",
+    "Stav úlohy (queued, running, succeeded, failed, cancelled, timed_out), průběh a doba běhu. Bez job_id přehled všech úloh.",
+    family="server",
+    properties={"job_id": {"type": "string"}},
+    local=True
+)
+
+register_tool(
+    "godot_job_logs",
+    "Průběžný log úlohy. Vrací řádky od pozice 'since' a next_since pro další čtení.",
+    family="server",
+    properties={
+        "job_id": {"type": "string"},
+        "since": {"type": "integer", "description": "Pozice v logu (next_since z minulého volání)", "default": 0}
+    },
+    required=["job_id"],
+    local=True
+)
+
+register_tool(
+    "godot_job_cancel",
+    "Zruší čekající nebo běžící úlohu. Příkaz, který už zpracovává Godot, tam doběhne.",
+    family="server",
+    properties={"job_id": {"type": "string"}},
+    required=["job_id"],
+    local=True
+)
+
+register_tool(
+    "godot_job_result",
+    "Výsledek dokončené úlohy (stejný text jako při přímém volání nástroje).",
+    family="server",
+    properties={
+        "job_id": {"type": "string"},
+        "wait": {"type": "number", "description": "Počkat na dokončení nejvýše tolik sekund (max 15)", "default": 0}
+    },
+    required=["job_id"],
+    local=True
+)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Lokální kopie heightmapy terénu pro dotazy bez volání Godot.
+Heightmapa se načte jednou (cache podle cesty a času změny souboru)
+a výšky i sklon se vzorkují vektorově bilineární interpolací.
+"""
+
+import functools
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Počet naposledy použitých heightmap držených v paměti
+HEIGHTMAP_CACHE_SIZE = 4
+
+
+class HeightmapError(ValueError):
+    """Heightmapu nelze načíst nebo má neplatné parametry."""
+
+
+def require_numpy():
+    if np is None:
+        raise HeightmapError("Tato operace vyžaduje balíček numpy (pip install numpy)")
+
+
+def _read_image(path: str) -> "np.ndarray":
+    if Image is None:
+        raise HeightmapError("Čtení obrázků vyžaduje balíček Pillow (pip install Pillow)")
+    try:
+        with Image.open(path) as img:
+            if img.mode in ("I;16", "I;16L", "I;16B", "I"):
+                data = np.asarray(img, dtype=np.float32)
+                scale = 65535.0 if img.mode.startswith("I;16") or data.max() > 255 else 255.0
+                return data / scale
+            if img.mode == "F":
+                return np.asarray(img, dtype=np.float32)
+            return np.asarray(img.convert("L"), dtype=np.float32) / 255.0
+    except OSError as e:
+        raise HeightmapError(f"Nelze načíst {path}: {e}") from e
+
+
+@functools.lru_cache(maxsize=HEIGHTMAP_CACHE_SIZE)
+def _load_normalized(path: str, mtime: float, r16_dim: tuple[int, int] | None) -> "np.ndarray":
+    """Heightmapa jako float32 v rozsahu 0..1 (klíčem je i mtime - změněný soubor se načte znovu)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".r16", ".raw"):
+        raw, factor = open_source(path, r16_dim)
+        data = raw.astype(np.float32) * np.float32(factor)
+    elif extension == ".npy":
+        data = np.load(path, allow_pickle=False).astype(np.float32)
+    else:
+        data = _read_image(path)
+    if data.ndim != 2:
+        raise HeightmapError(f"{path}: očekávána jednokanálová heightmapa, tvar {data.shape}")
+    data.setflags(write=False)
+    return data
+
+
+def open_source(path: str, r16_dim=None) -> tuple["np.ndarray", float]:
+    """
+    Zdroj heightmapy bez načtení celého souboru do paměti, kde to formát dovolí.
+    Vrací (2D pole, násobitel na rozsah 0..1); RAW/R16 a .npy jsou memory-mapped.
+    """
+    require_numpy()
+    if not os.path.isfile(path):
+        raise HeightmapError(f"Heightmapa neexistuje: {path}")
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".r16", ".raw"):
+        size = os.path.getsize(path)
+        width, height = r16_dim if r16_dim else (int(round((size // 2) ** 0.5)),) * 2
+        if width * height * 2 != size:
+            raise HeightmapError(f"{path}: velikost {size} B neodpovídá rozměrům {width}x{height} (uint16)")
+        return np.memmap(path, dtype="<u2", mode="r", shape=(height, width)), 1.0 / 65535.0
+    if extension == ".npy":
+        data = np.load(path, mmap_mode="r", allow_pickle=False)
+        if data.ndim != 2:
+            raise HeightmapError(f"{path}: očekávána jednokanálová heightmapa, tvar {data.shape}")
+        return data, 1.0
+    return _load_normalized(os.path.abspath(path), os.path.getmtime(path), None), 1.0
+
+
+def load_mask(path: str) -> "np.ndarray":
+    """Maska nebo mapa hustoty jako float32 0..1 (sdílí cache s heightmapami)."""
+    require_numpy()
+    if not os.path.isfile(path):
+        raise HeightmapError(f"Soubor neexistuje: {path}")
+    return _load_normalized(os.path.abspath(path), os.path.getmtime(path), None)
+
+
+class HeightField:
+    """
+    Výšky terénu ve světových souřadnicích.
+
+    Pixel [row, col] leží na x = position[0] + col * vertex_spacing,
+    z = position[2] + row * vertex_spacing; hodnota 0..1 se mapuje
+    na min_height..max_height. Stejně jako Terrain3DData.import_images (výška = hodnota * scale
+    + offset, z global_position se bere jen X/Z) se position[1] ignoruje.
+    Pole `heights` se drží beze změny (u souborů sdílené z cache) a výška = hodnota * scale + offset
+    se počítá až pro navzorkované body.
+    """
+
+    def __init__(self, heights: "np.ndarray", position=(0.0, 0.0, 0.0), vertex_spacing: float = 1.0,
+                 scale: float = 1.0, offset: float = 0.0):
+        require_numpy()
+        if vertex_spacing <= 0:
+            raise HeightmapError("vertex_spacing musí být kladné")
+        self.heights = heights
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.origin_x = float(position[0])
+        self.origin_z = float(position[2])
+        self.spacing = float(vertex_spacing)
+
+    @classmethod
+    def from_file(cls, path: str, min_height: float = 0.0, max_height: float = 100.0,
+                  position=(0.0, 0.0, 0.0), vertex_spacing: float = 1.0, r16_dim=None) -> "HeightField":
+        require_numpy()
+        if not os.path.isfile(path):
+            raise HeightmapError(f"Heightmapa neexistuje: {path}")
+        normalized = _load_normalized(os.path.abspath(path), os.path.getmtime(path),
+                                      tuple(r16_dim) if r16_dim else None)
+        # Žádná přeškálovaná kopie celé mapy - rozsah se uplatní až na navzorkované hodnoty
+        return cls(normalized, position, vertex_spacing,
+                   scale=max_height - min_height, offset=min_height)
+
+    @classmethod
+    def from_arguments(cls, arguments: dict) -> "HeightField":
+        """Heightmapa podle argumentů nástroje (heightmap_path, min/max_height, heightmap_position, ...)."""
+        return cls.from_file(
+            arguments["heightmap_path"],
+            min_height=arguments.get("min_height", 0.0),
+            max_height=arguments.get("max_height", 100.0),
+            position=arguments.get("heightmap_position", [0, 0, 0]),
+            vertex_spacing=arguments.get("vertex_spacing", 1.0),
+            r16_dim=arguments.get("r16_dim")
+        )
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """(x_min, z_min, x_max, z_max) pokryté heightmapou."""
+        rows, cols = self.heights.shape
+        return (self.origin_x, self.origin_z,
+                self.origin_x + (cols - 1) * self.spacing, self.origin_z + (rows - 1) * self.spacing)
+
+    def sample(self, x, z) -> "np.ndarray":
+        """Bilineárně interpolované výšky v bodech (x, z); mimo heightmapu NaN."""
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        rows, cols = self.heights.shape
+        u = (x - self.origin_x) / self.spacing
+        v = (z - self.origin_z) / self.spacing
+        inside = (u >= 0) & (u <= cols - 1) & (v >= 0) & (v <= rows - 1)
+        u = np.clip(u, 0, cols - 1)
+        v = np.clip(v, 0, rows - 1)
+        c0 = np.minimum(u.astype(np.intp), cols - 2) if cols > 1 else np.zeros_like(u, dtype=np.intp)
+        r0 = np.minimum(v.astype(np.intp), rows - 2) if rows > 1 else np.zeros_like(v, dtype=np.intp)
+        c1 = np.minimum(c0 + 1, cols - 1)
+        r1 = np.minimum(r0 + 1, rows - 1)
+        fu = u - c0
+        fv = v - r0
+        h = self.heights
+        top = h[r0, c0] * (1 - fu) + h[r0, c1] * fu
+        bottom = h[r1, c0] * (1 - fu) + h[r1, c1] * fu
+        return np.where(inside, (top * (1 - fv) + bottom * fv) * self.scale + self.offset, np.nan)
+
+    def gradient(self, x, z) -> tuple["np.ndarray", "np.ndarray"]:
+        """Derivace výšky podle x a z (centrální diference o jeden vertex, na okraji jednostranná)."""
+        x_min, z_min, x_max, z_max = self.bounds
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        x0, x1 = np.clip(x - self.spacing, x_min, x_max), np.clip(x + self.spacing, x_min, x_max)
+        z0, z1 = np.clip(z - self.spacing, z_min, z_max), np.clip(z + self.spacing, z_min, z_max)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dx = (self.sample(x1, z) - self.sample(x0, z)) / (x1 - x0)
+            dz = (self.sample(x, z1) - self.sample(x, z0)) / (z1 - z0)
+        return dx, dz
+
+    def slope_degrees(self, x, z) -> "np.ndarray":
+        """Sklon terénu ve stupních."""
+        dx, dz = self.gradient(x, z)
+        return np.degrees(np.arctan(np.hypot(dx, dz)))
+
+    def normals(self, x, z) -> "np.ndarray":
+        """Jednotkové normály (N, 3) ve směru +Y."""
+        dx, dz = self.gradient(x, z)
+        normals = np.stack([-dx, np.ones_like(dx), -dz], axis=-1)
+        return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Správce dlouhých úloh (bake meshe, navmeshe, import/export terénu, generování heightmap).
+Úloha se spustí na pozadí a volání hned vrátí její ID; stav, průběh, průběžný log
+a výsledek se dají číst dalšími nástroji a úlohu lze zrušit. Každý typ úlohy má
+vlastní timeout a úlohy běží souběžně, takže neblokují rychlé nástroje.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("godot-mcp.jobs")
+
+# Počet úloh běžících současně, další čekají ve frontě
+MAX_RUNNING_JOBS = 4
+# Počet dokončených úloh, jejichž výsledek a log zůstávají k dispozici
+MAX_FINISHED_JOBS = 50
+# Počet řádků logu uchovávaných u jedné úlohy
+MAX_LOG_LINES = 500
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled", "timed_out")
+
+# Úloha, v jejímž kontextu kód právě běží (propaguje se i do asyncio.to_thread)
+current_job: contextvars.ContextVar["Job | None"] = contextvars.ContextVar("current_job", default=None)
+
+
+@dataclass
+class Job:
+    id: str
+    tool: str
+    arguments: dict
+    timeout: float
+    state: str = "queued"
+    created: float = field(default_factory=time.time)
+    started: float | None = None
+    started_monotonic: float = 0.0
+    finished: float | None = None
+    progress: float | None = None
+    total: float | None = None
+    result: str | None = None
+    # Výsledek s packed daty - při čtení přes godot_job_result se nezkracuje
+    whole_result: bool = False
+    # Nástroj skončil neúspěchem (nastavuje runner podle stavu odpovědi, výsledek může být JSON)
+    failed_result: bool = False
+    error: str | None = None
+    # Číslo prvního řádku v `lines` - starší řádky už z omezeného logu vypadly
+    log_start: int = 0
+    lines: deque = field(default_factory=lambda: deque(maxlen=MAX_LOG_LINES))
+    task: asyncio.Task | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def log(self, message: str):
+        if len(self.lines) == self.lines.maxlen:
+            self.log_start += 1
+        self.lines.append(f"{time.strftime('%H:%M:%S')} {message}")
+
+    def remaining(self) -> float:
+        """Zbývající čas do timeoutu úlohy (timeout příkazů poslaných v rámci úlohy)."""
+        if self.started is None:
+            return self.timeout
+        return max(0.0, self.timeout - (time.monotonic() - self.started_monotonic))
+
+    def summary(self) -> dict:
+        elapsed_end = self.finished or time.time()
+        return {
+            "job_id": self.id,
+            "tool": self.tool,
+            "state": self.state,
+            "progress": self.progress,
+            "total": self.total,
+            "timeout": self.timeout,
+            "elapsed": round(elapsed_end - self.started, 2) if self.started else None,
+            "log_lines": self.log_start + len(self.lines),
+            "error": self.error
+        }
+
+
+class JobLogHandler(logging.Handler):
+    """Kopíruje záznamy loggerů vzniklé v kontextu úlohy do jejího logu."""
+
+    def emit(self, record: logging.LogRecord):
+        job = current_job.get()
+        if job is not None:
+            job.log(f"{record.levelname} {record.getMessage()}")
+
+
+class JobManager:
+    """
+    Úlohy běží jako asyncio tasky omezené semaforem. `runner(tool, arguments)` je
+    stejná cesta jako přímé volání nástroje; kód uvnitř úlohy pozná běh v úloze
+    podle `current_job` (průběh, log, timeout příkazů pro Godot).
+    """
+
+    def __init__(self, runner: Callable[[str, dict], Awaitable[str]], max_running: int = MAX_RUNNING_JOBS):
+        self.runner = runner
+        self.jobs: dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._slots = asyncio.Semaphore(max_running)
+
+    def submit(self, tool: str, arguments: dict, timeout: float) -> Job:
+        job = Job(f"job-{next(self._ids)}", tool, arguments, timeout)
+        job.log(f"Úloha {tool} zařazena (timeout {timeout:g} s)")
+        self.jobs[job.id] = job
+        # Úloha nedědí kontext volání submit (progressToken patří tomu volání)
+        job.task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._run(job))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job):
+        current_job.set(job)
+        try:
+            async with self._slots:
+                job.state = "running"
+                job.started = time.time()
+                job.started_monotonic = time.monotonic()
+                job.log("Spuštěno")
+                job.result = await asyncio.wait_for(self.runner(job.tool, job.arguments), timeout=job.timeout)
+                job.state = "failed" if job.failed_result else "succeeded"
+        except asyncio.TimeoutError:
+            job.state = "timed_out"
+            job.error = f"Úloha překročila timeout {job.timeout:g} s"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            job.error = "Úloha zrušena"
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            logger.error(f"Úloha {job.id} ({job.tool}) selhala: {e}")
+        finally:
+            job.finished = time.time()
+            job.log(f"Konec: {job.state}" + (f" - {job.error}" if job.error else ""))
+            job.done.set()
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if job.state in FINISHED_STATES]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Zruší čekající nebo běžící úlohu. Příkaz už odeslaný do Godot tam doběhne."""
+        job = self.jobs.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return False
+        job.log("Požadováno zrušení")
+        job.task.cancel()
+        return True
+
+    def logs(self, job_id: str, since: int = 0) -> tuple[list[str], int]:
+        """Řádky logu od pozice `since` a pozice pro další čtení."""
+        job = self.jobs[job_id]
+        lines = list(job.lines)[max(0, since - job.log_start):]
+        return lines, job.log_start + len(job.lines)
+
+    async def wait(self, job_id: str, timeout: float) -> Job:
+        job = self.jobs[job_id]
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def close(self):
+        """Zruší rozpracované úlohy (při ukončení serveru)."""
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        states: dict[str, int] = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return states
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Metriky volání nástrojů sbírané přímo v procesu serveru.
+Pro každý nástroj počty volání a chyb, histogramy latence celkem i po fázích
+(spojení, odeslání, zpracování v Godot, příjem, formátování, lokální práce serveru)
+a velikosti požadavků a odpovědí. Výstup jako JSON nebo Prometheus text.
+"""
+
+import contextvars
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+
+# Hranice histogramů (s, resp. bajty); poslední koš je +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Fáze příkazů pro Godot (sčítají se přes všechny příkazy jednoho volání)
+COMMAND_PHASES = ("connect", "send", "godot", "receive")
+PHASES = COMMAND_PHASES + ("format", "local")
+# Delší seznamy se při měření velikosti serializují po částech této délky
+SIZE_CHUNK = 1024
+
+
+def json_size(value) -> int:
+    """
+    Velikost hodnoty jako kompaktní JSON v UTF-8. Slovníky a dlouhé seznamy se měří po částech -
+    jedno json.dumps drží GIL po celou dobu a i z pracovního vlákna by zdrželo event loop.
+    """
+    if isinstance(value, dict):
+        return 1 + 2 * len(value) + sum(json_size(str(key)) + json_size(item) for key, item in value.items()) \
+            if value else 2
+    if isinstance(value, (list, tuple)) and len(value) > SIZE_CHUNK:
+        chunks = range(0, len(value), SIZE_CHUNK)
+        return 1 + len(chunks) + sum(json_size(value[start:start + SIZE_CHUNK]) - 2 for start in chunks)
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def write_metrics(path: str, content: str):
+    """Zápis přes dočasný soubor - scraper nikdy nečte rozepsaný soubor."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(temporary, path)
+
+
+class Histogram:
+    """
+    Kumulativní histogram s pevnými koši (jako Prometheus). Kvantily se odhadují
+    interpolací v koši a omezí na skutečné minimum a maximum.
+    """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        estimate = self.max
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                break
+            seen += count
+        return min(max(estimate, self.min), self.max)
+
+    def summary(self, scale: float = 1.0, digits: int = 2) -> dict:
+        def scaled(value):
+            return None if value is None else round(value * scale, digits)
+        return {
+            "mean": scaled(self.sum / self.count) if self.count else None,
+            "p50": scaled(self.quantile(0.5)),
+            "p95": scaled(self.quantile(0.95)),
+            "p99": scaled(self.quantile(0.99))
+        }
+
+
+class ToolMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.commands = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.phases = {phase: Histogram(LATENCY_BUCKETS) for phase in PHASES}
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.bridge_bytes_out = 0
+        self.bridge_bytes_in = 0
+
+
+class CallRecord:
+    """Průběžné součty jednoho volání - příkazy pro Godot je přičítají přes `current_record`."""
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.commands = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def add_command(self, timings: dict):
+        self.commands += 1
+        for phase in COMMAND_PHASES:
+            self.phases[phase] += timings.get(phase, 0.0)
+        self.bytes_out += timings.get("bytes_out", 0)
+        self.bytes_in += timings.get("bytes_in", 0)
+
+
+# Záznam volání, v jehož kontextu kód běží (propaguje se i do úloh a vláken)
+current_record: contextvars.ContextVar[CallRecord | None] = contextvars.ContextVar("current_record", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """Změří úsek kódu jako fázi aktuálního volání (např. formátování odpovědi)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = current_record.get()
+        if record is not None:
+            record.phases[name] += time.perf_counter() - started
+
+
+class MetricsRegistry:
+    """Metriky všech nástrojů; mění se a čtou jen ve smyčce událostí (do vláken jde hotový text)."""
+
+    def __init__(self):
+        self.tools: dict[str, ToolMetrics] = {}
+        self.started = time.time()
+
+    def observe(self, tool: str, record: CallRecord, seconds: float, error: bool,
+                request_bytes: int | None, response_bytes: int):
+        """Zaznamená volání; velikost požadavku může dodat později observe_request()."""
+        metrics = self.tools.setdefault(tool, ToolMetrics())
+        metrics.calls += 1
+        metrics.errors += int(error)
+        metrics.commands += record.commands
+        metrics.latency.observe(seconds)
+        # Lokální práce = zbytek času volání (souběžné příkazy se mohou překrývat, proto min. 0)
+        record.phases["local"] = max(0.0, seconds - sum(v for k, v in record.phases.items() if k != "local"))
+        for name, value in record.phases.items():
+            metrics.phases[name].observe(value)
+        if request_bytes is not None:
+            metrics.request_bytes.observe(request_bytes)
+        metrics.response_bytes.observe(response_bytes)
+        metrics.bridge_bytes_out += record.bytes_out
+        metrics.bridge_bytes_in += record.bytes_in
+
+    def observe_request(self, tool: str, request_bytes: int):
+        self.tools.setdefault(tool, ToolMetrics()).request_bytes.observe(request_bytes)
+
+    def reset(self):
+        self.tools.clear()
+        self.started = time.time()
+
+    def snapshot(self, tool: str | None = None) -> dict:
+        """Souhrn podle nástrojů seřazený podle celkového času (kdo dominuje sezení)."""
+        total_time = sum(m.latency.sum for m in self.tools.values()) or 1.0
+        tools = {}
+        for name, m in sorted(self.tools.items(), key=lambda item: item[1].latency.sum, reverse=True):
+            if tool and name != tool:
+                continue
+            tools[name] = {
+                "calls": m.calls,
+                "errors": m.errors,
+                "commands": m.commands,
+                "total_s": round(m.latency.sum, 3),
+                "share": round(m.latency.sum / total_time, 3),
+                "latency_ms": m.latency.summary(1000.0),
+                "phases_mean_ms": {phase: round(h.sum / h.count * 1000.0, 2) if h.count else None
+                                   for phase, h in m.phases.items()},
+                "request_bytes": m.request_bytes.summary(digits=0),
+                "response_bytes": m.response_bytes.summary(digits=0),
+                "bridge_bytes": {"out": m.bridge_bytes_out, "in": m.bridge_bytes_in}
+            }
+        return {"since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "uptime_s": round(time.time() - self.started, 1), "tools": tools}
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def histogram(metric: str, help_text: str, values):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, h in values:
+                cumulative = 0
+                for bound, count in zip(h.buckets + (math.inf,), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else f"{bound:g}"
+                    lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {h.count}")
+
+        def counter(metric: str, help_text: str, attribute: str):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, m in self.tools.items():
+                lines.append(f'{metric}{{tool="{name}"}} {getattr(m, attribute)}')
+
+        counter("godot_mcp_tool_calls_total", "Počet volání nástroje", "calls")
+        counter("godot_mcp_tool_errors_total", "Počet volání nástroje končících chybou", "errors")
+        counter("godot_mcp_bridge_commands_total", "Počet příkazů odeslaných do Godot", "commands")
+        counter("godot_mcp_bridge_sent_bytes_total", "Bajty odeslané do Godot", "bridge_bytes_out")
+        counter("godot_mcp_bridge_received_bytes_total", "Bajty přijaté z Godot", "bridge_bytes_in")
+        histogram("godot_mcp_tool_duration_seconds", "Celková doba volání nástroje",
+                  [(f'tool="{name}"', m.latency) for name, m in self.tools.items()])
+        histogram("godot_mcp_tool_phase_seconds", "Doba fáze volání nástroje",
+                  [(f'tool="{name}",phase="{p}"', h) for name, m in self.tools.items() for p, h in m.phases.items()])
+        histogram("godot_mcp_tool_request_bytes", "Velikost argumentů volání",
+                  [(f'tool="{name}"', m.request_bytes) for name, m in self.tools.items()])
+        histogram("godot_mcp_tool_response_bytes", "Velikost textové odpovědi nástroje",
+                  [(f'tool="{name}"', m.response_bytes) for name, m in self.tools.items()])
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> tuple[str, str]:
+        """(formát, obsah) souboru metrik: .json jako JSON, jinak Prometheus text."""
+        kind = "json" if path.lower().endswith(".json") else "prometheus"
+        content = json.dumps(self.snapshot(), indent=2, ensure_ascii=False) if kind == "json" else self.prometheus()
+        return kind, content
+
+    def dump(self, path: str) -> str:
+        """Zapíše metriky do souboru (synchronně, např. při ukončení). Vrací použitý formát."""
+        kind, content = self.export(path)
+        write_metrics(path, content)
+        return kind
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Formát a velikost výsledků nástrojů.
+Výsledek lze vrátit jako čitelný text (odsazený JSON s ✓ hlavičkou), kompaktní JSON
+nebo strukturovaný obsah MCP (structuredContent + kompaktní JSON jako text). Výsledek
+nad rozpočtem velikosti se zkrátí a zbytek se čte po částech přes kurzor pokračování;
+packed data (base64 float32) se nezkracují.
+"""
+
+import contextvars
+import itertools
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+
+OUTPUT_MODES = ("text", "json", "structured")
+# Počet zkrácených výsledků, jejichž zbytek zůstává k dispozici pro pokračování
+MAX_STORED_OUTPUTS = 16
+
+
+def compact(payload) -> str:
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+@dataclass
+class OutputOptions:
+    """
+    Formát a rozpočet jednoho volání. `structured` nastaví emit() výsledného payloadu,
+    `whole` vyjme výsledek z rozpočtu (packed data rozdělená uprostřed řetězce nejdou použít),
+    `failed` označí neúspěch i u výsledku, který nezačíná '✗' (JSON payload, částečný import).
+    """
+    mode: str = "text"
+    budget: int = 0
+    structured: dict | None = None
+    whole: bool = False
+    failed: bool = False
+
+    def emit(self, payload: dict) -> str:
+        """
+        Výsledek celého volání - v režimu structured zároveň jeho structuredContent.
+        Složené nástroje (batch, import po regionech) dílčí odpovědi jen skládají do jednoho payloadu.
+        """
+        if self.mode == "structured":
+            self.structured = payload
+        self.failed = self.failed or payload.get("status", "ok") != "ok"
+        return compact(payload)
+
+
+# Volby výstupu volání, v jehož kontextu se výsledek formátuje (None = text, např. v úloze)
+current_output: contextvars.ContextVar[OutputOptions | None] = contextvars.ContextVar("current_output", default=None)
+
+
+def keep_whole():
+    """Výsledek aktuálního volání se nezkracuje (base64 float32 apod.)."""
+    options = current_output.get()
+    if options is not None:
+        options.whole = True
+
+
+def mark_failed():
+    """Aktuální volání skončilo neúspěchem, i když text výsledku začíná '✓' (metriky, stav úlohy)."""
+    options = current_output.get()
+    if options is not None:
+        options.failed = True
+
+
+def result_failed(result: str | None) -> bool:
+    """Neúspěch volání podle stavu odpovědi, ne jen podle prefixu textu (JSON režimy prefix nemají)."""
+    options = current_output.get()
+    return result is None or result.startswith("✗") or (options is not None and options.failed)
+
+
+def text_mode() -> bool:
+    options = current_output.get()
+    return options is None or options.mode == "text"
+
+
+def render(header: str, key: str, value) -> str:
+    """
+    Úspěšný výsledek s daty: v textovém režimu '✓ hlavička:' a odsazený JSON,
+    jinak kompaktní {"status": "ok", "message": hlavička, key: data}.
+    """
+    options = current_output.get()
+    if options is None or options.mode == "text":
+        return f"✓ {header}:\n{json.dumps(value, indent=2, ensure_ascii=False)}"
+    return options.emit({"status": "ok", "message": header, key: value})
+
+
+def outline(value) -> dict:
+    """Tvar velkého výsledku pro zkrácený strukturovaný obsah: klíče, délky seznamů a malé hodnoty."""
+    if not isinstance(value, dict):
+        return {"type": type(value).__name__}
+    shape = {}
+    for key, item in value.items():
+        if isinstance(item, list):
+            shape[key] = f"list[{len(item)}]"
+        elif isinstance(item, dict):
+            shape[key] = f"object[{len(item)}]"
+        elif isinstance(item, str) and len(item) > 200:
+            shape[key] = f"str[{len(item)}]"
+        else:
+            shape[key] = item
+    return shape
+
+
+def _cut(data: bytes, start: int, budget: int) -> int:
+    """
+    Konec části od `start` nejvýše `budget` bajtů - za koncem řádku, jinak za čárkou
+    (hranice položky jednořádkového JSON), v nejhorším případě na hranici znaku UTF-8.
+    """
+    end = start + budget
+    if end >= len(data):
+        return len(data)
+    while end > start and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    for separator in (b"\n", b","):
+        boundary = data.rfind(separator, start + budget // 2, end)
+        if boundary >= 0:
+            return boundary + 1
+    return end
+
+
+class OutputStore:
+    """Zbytky zkrácených výsledků (posledních MAX_STORED_OUTPUTS) pro čtení přes kurzor 'out-N:offset'."""
+
+    def __init__(self, capacity: int = MAX_STORED_OUTPUTS):
+        self.capacity = capacity
+        self._outputs: OrderedDict[str, bytes] = OrderedDict()
+        self._ids = itertools.count(1)
+        self.truncated = 0
+
+    def limit(self, text: str, options: OutputOptions) -> tuple[str, dict | None]:
+        """Výsledek (text, strukturovaný obsah) zkrácený na rozpočet volání."""
+        structured = options.structured
+        if options.budget <= 0 or options.whole:
+            return text, structured
+        data = text.encode("utf-8")
+        if len(data) <= options.budget:
+            return text, structured
+        output_id = f"out-{next(self._ids)}"
+        self._outputs[output_id] = data
+        while len(self._outputs) > self.capacity:
+            self._outputs.popitem(last=False)
+        self.truncated += 1
+        end = _cut(data, 0, options.budget)
+        cursor = f"{output_id}:{end}"
+        if structured is not None:
+            # Strukturovaný obsah nejde rozdělit na platné části - zůstane jen jeho tvar a kurzor
+            structured = {"truncated": True, "total_bytes": len(data), "returned_bytes": end,
+                          "cursor": cursor, "outline": outline(structured)}
+        return data[:end].decode("utf-8", "replace") + self._footer(end, len(data), cursor), structured
+
+    def read(self, cursor: str, budget: int) -> str:
+        """Další část zkráceného výsledku; KeyError/ValueError pro neznámý nebo poškozený kurzor."""
+        output_id, _, offset = cursor.rpartition(":")
+        data = self._outputs[output_id]
+        self._outputs.move_to_end(output_id)
+        start = int(offset)
+        if not 0 <= start <= len(data):
+            raise ValueError(f"pozice {start} mimo výsledek ({len(data)} B)")
+        end = _cut(data, start, budget) if budget > 0 else len(data)
+        chunk = data[start:end].decode("utf-8", "replace")
+        if end < len(data):
+            return chunk + self._footer(end, len(data), f"{output_id}:{end}")
+        return chunk
+
+    @staticmethod
+    def _footer(end: int, total: int, cursor: str) -> str:
+        return f"\n… zkráceno ({end}/{total} B), pokračování: godot_read_output cursor=\"{cursor}\""
+
+    def stats(self) -> dict:
+        return {"stored": len(self._outputs), "truncated": self.truncated,
+                "stored_bytes": sum(len(data) for data in self._outputs.values())}
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Zrcadlo stromu scény v procesu MCP serveru.
+Čtecí nástroje (strom scény, info o uzlu, vlastnosti) se obsluhují z cache,
+měnící příkazy invalidují jen dotčený podstrom.
+"""
+
+import fnmatch
+import logging
+
+logger = logging.getLogger("godot-mcp.mirror")
+
+# Příkazy, jejichž odpověď lze uložit do zrcadla
+READ_COMMANDS = {"get_scene_tree", "get_node_info", "get_prop"}
+
+# Příkazy, které scénu nemění (soubory, projektová nastavení, dotazy na terén)
+NEUTRAL_COMMANDS = {
+    "save_scene", "search_files", "list_dir", "make_dir", "remove_file", "rename_file",
+    "get_collision_layers", "set_collision_layer_name", "create_script", "get_script_content",
+    "terrain_get_height", "terrain_get_heights", "terrain_raycast", "terrain_bake_mesh", "terrain_bake_navmesh", "terrain_task"
+}
+
+# Příkaz -> (co invalidovat, klíč s cestou uzlu; None = kořen scény)
+#   "children": změnil se seznam potomků uzlu (podstrom uzlu je zastaralý)
+#   "node":     změnily se vlastnosti uzlu (info a vlastnosti celého podstromu)
+#   "owner":    změnil se rodič uzlu na jeho vlastním rodiči (přejmenování, duplikace)
+INVALIDATION_RULES = {
+    "create_node": ("children", "parent"),
+    "create_node_2d": ("children", "parent_path"),
+    "add_child_scene": ("children", "parent"),
+    "add_collision_shape": ("children", "parent"),
+    "create_terrain": ("children", "parent_path"),
+    "duplicate_node": ("owner", "path"),
+    "rename_node": ("owner", "path"),
+    "set_owner_recursive": ("node", "path"),
+    "set_mesh": ("node", "path"),
+    "set_collision_layer": ("node", "path"),
+    "set_collision_mask": ("node", "path"),
+    "attach_script": ("node", "path"),
+    "detach_script": ("node", "path"),
+    "set_transform_2d": ("node", "node_path"),
+    "ui_set_layout": ("node", "node_path"),
+    "connect_signal": ("node", "source_path"),
+    "terrain_configure": ("node", "node_path"),
+    "terrain_physics": ("node", "node_path"),
+    "terrain_rendering": ("node", "node_path"),
+    "terrain_visuals": ("node", "node_path"),
+    "terrain_add_texture": ("node", "node_path"),
+    "terrain_add_mesh": ("node", "node_path"),
+    "terrain_place_instances": ("node", "node_path"),
+    "terrain_place_instances_packed": ("node", "node_path"),
+    "terrain_import_heightmap": ("node", "node_path"),
+    # WorldEnvironment vzniká pod kořenem, jeho cestu ostatní env příkazy neuvádějí
+    "env_create": ("children", None),
+    "env_set_background": ("node", None),
+    "env_set_effect": ("node", None),
+    "env_set_camera_attributes": ("node", None),
+}
+
+# Vlastnosti, jejichž změna mění i strukturu stromu
+STRUCTURAL_PROPERTIES = {"name", "script", "owner"}
+
+
+def normalize_path(path) -> str:
+    return str(path or "").strip("/")
+
+
+def parent_of(path: str) -> str:
+    return path.rsplit("/", 1)[0] if "/" in path else ""
+
+
+def join_path(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+
+def in_subtree(path: str, root: str) -> bool:
+    return not root or path == root or path.startswith(root + "/")
+
+
+def find_node(node: dict, relative_path: str) -> dict | None:
+    """Najde uzel podle cesty relativní k `node` (uzly mají 'name' a 'children')."""
+    for name in relative_path.split("/") if relative_path else []:
+        children = node.get("children") if isinstance(node, dict) else None
+        if not isinstance(children, list):
+            return None
+        node = next((c for c in children if isinstance(c, dict) and c.get("name") == name), None)
+        if node is None:
+            return None
+    return node if isinstance(node, dict) else None
+
+
+def relative_to(path: str, root: str) -> str:
+    return path[len(root):].lstrip("/") if root else path
+
+
+def query_tree(node: dict, root_path: str, max_depth: int | None = None, node_type: str | None = None,
+               name_glob: str | None = None, cursor: int = 0, page_size: int | None = None) -> dict:
+    """
+    Vybere ze stromu jen požadovaný výřez.
+
+    Bez filtrů vrací vnořený strom oříznutý na `max_depth` (oříznuté uzly
+    mají místo 'children' jen 'children_count'). S filtrem typu, globem
+    názvu nebo stránkováním vrací plochý seznam uzlů s cestami a kurzorem.
+    """
+    if node_type is None and name_glob is None and page_size is None and not cursor:
+        def trim(current: dict, depth: int) -> dict:
+            out = {k: v for k, v in current.items() if k != "children"}
+            children = [c for c in current.get("children", []) if isinstance(c, dict)]
+            if max_depth is not None and depth >= max_depth:
+                if children:
+                    out["children_count"] = len(children)
+            else:
+                out["children"] = [trim(c, depth + 1) for c in children]
+            return out
+        return {"root_path": root_path, "tree": trim(node, 0)}
+
+    matches = []
+    stack = [(node, root_path, 0)]
+    while stack:
+        current, path, depth = stack.pop()
+        children = [c for c in current.get("children", []) if isinstance(c, dict)]
+        if (node_type is None or current.get("type") == node_type) and \
+                (name_glob is None or fnmatch.fnmatchcase(str(current.get("name", "")), name_glob)):
+            entry = {k: v for k, v in current.items() if k != "children"}
+            entry["path"] = path
+            entry["children_count"] = len(children)
+            matches.append(entry)
+        if max_depth is None or depth < max_depth:
+            # Obrácené pořadí na zásobníku zachová pořadí uzlů ve scéně
+            for child in reversed(children):
+                stack.append((child, join_path(path, str(child.get("name", ""))), depth + 1))
+
+    size = page_size or len(matches) or 1
+    page = matches[cursor:cursor + size]
+    next_cursor = cursor + size if cursor + size < len(matches) else None
+    return {"root_path": root_path, "total": len(matches), "nodes": page, "next_cursor": next_cursor}
+
+
+class SceneMirror:
+    """
+    Cache odpovědí čtecích příkazů s invalidací podle měnících příkazů.
+
+    Strom se drží jako sada načtených podstromů (kořenová cesta -> uzel),
+    takže dotaz na jednu větev nevyžaduje celý strom a po změně se
+    znovu načte jen zastaralý podstrom. Každý měnící příkaz zvýší
+    generaci - odpověď čtení, během kterého proběhla změna, se neuloží,
+    aby do zrcadla nepronikl zastaralý stav.
+    """
+
+    def __init__(self):
+        self.trees: dict[str, dict] = {}
+        self.node_info: dict[str, dict] = {}
+        self.properties: dict[tuple[str, str], dict] = {}
+        # Podstromy, jejichž struktura se od posledního načtení změnila
+        self.stale: set[str] = set()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Strom scény
+    # ------------------------------------------------------------------
+    def _cached_root(self, path: str) -> str | None:
+        """Nejvyšší načtený podstrom, který obsahuje `path`."""
+        roots = [root for root in self.trees if in_subtree(path, root)]
+        return min(roots, key=len) if roots else None
+
+    def tree_state(self, root_path: str) -> tuple[dict | None, list[str]]:
+        """
+        Vrátí (uzel, seznam podstromů k načtení). Prázdný seznam a None
+        znamená, že strom je aktuální, ale uzel v něm neexistuje.
+        """
+        cached = self._cached_root(root_path)
+        if cached is None:
+            self.misses += 1
+            return None, [root_path]
+        # Zastaralé podstromy, které zasahují do požadovaného výřezu
+        affected = [s for s in self.stale if in_subtree(s, root_path) or in_subtree(root_path, s)]
+        if affected:
+            self.misses += 1
+            return None, sorted(s for s in affected if not any(o != s and in_subtree(s, o) for o in affected))
+        self.hits += 1
+        return find_node(self.trees[cached], relative_to(root_path, cached)), []
+
+    def _store_tree(self, root_path: str, tree):
+        if not isinstance(tree, dict):
+            return
+        last_name = root_path.rsplit("/", 1)[-1]
+        if root_path and tree.get("name") != last_name:
+            # Bridge parametr root_path nezná a vrátil celý strom
+            root_path = ""
+        cached = self._cached_root(root_path)
+        if cached is not None and cached != root_path:
+            parent = find_node(self.trees[cached], relative_to(parent_of(root_path), cached))
+            children = parent.get("children") if parent else None
+            if not isinstance(children, list):
+                self.stale.add(parent_of(root_path))
+                return
+            parent["children"] = [c for c in children if not (isinstance(c, dict) and c.get("name") == last_name)]
+            parent["children"].append(tree)
+        else:
+            # Nový kořen pohltí dříve načtené podstromy uvnitř sebe
+            self.trees = {r: t for r, t in self.trees.items() if not in_subtree(r, root_path)}
+            self.trees[root_path] = tree
+        self.stale = {s for s in self.stale if not in_subtree(s, root_path)}
+
+    # ------------------------------------------------------------------
+    # Čtení
+    # ------------------------------------------------------------------
+    def lookup(self, command: dict) -> dict | None:
+        """Vrátí odpověď ze zrcadla, nebo None (miss / příkaz se necachuje)."""
+        cmd = command.get("cmd")
+        if cmd not in READ_COMMANDS:
+            return None
+        response = None
+        if cmd == "get_scene_tree":
+            node, missing = self.tree_state(normalize_path(command.get("root_path")))
+            return {"status": "ok", "tree": node} if node is not None and not missing else None
+        elif cmd == "get_node_info":
+            response = self.node_info.get(normalize_path(command.get("path")))
+        elif cmd == "get_prop":
+            response = self.properties.get((normalize_path(command.get("path")), command.get("prop")))
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return response
+
+    def begin(self, command: dict) -> int:
+        """
+        Volá se před odesláním příkazu, vrací generaci pro finish().
+        Měnící příkaz posune generaci hned, aby se neuložila čtení běžící souběžně s ním.
+        """
+        if command.get("cmd") not in READ_COMMANDS:
+            self.generation += 1
+        return self.generation
+
+    def finish(self, command: dict, response: dict, generation: int):
+        """Volá se po odpovědi Godot - uloží čtení nebo invaliduje po změně."""
+        cmd = command.get("cmd")
+        if cmd not in READ_COMMANDS:
+            self.apply(command)
+            return
+        if generation != self.generation or response.get("status") != "ok":
+            return
+        if cmd == "get_scene_tree":
+            self._store_tree(normalize_path(command.get("root_path")), response.get("tree"))
+        elif cmd == "get_node_info":
+            self.node_info[normalize_path(command.get("path"))] = response
+        elif cmd == "get_prop":
+            self.properties[(normalize_path(command.get("path")), command.get("prop"))] = response
+
+    # ------------------------------------------------------------------
+    # Invalidace
+    # ------------------------------------------------------------------
+    def clear(self):
+        self.trees.clear()
+        self.node_info.clear()
+        self.properties.clear()
+        self.stale.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def _drop_node_data(self, root: str):
+        """Zahodí info a vlastnosti všech uzlů v podstromu."""
+        self.node_info = {p: v for p, v in self.node_info.items() if not in_subtree(p, root)}
+        self.properties = {k: v for k, v in self.properties.items() if not in_subtree(k[0], root)}
+
+    def _children_changed(self, path: str):
+        """Změnil se seznam potomků uzlu - jeho info i struktura podstromu jsou zastaralé."""
+        self.node_info.pop(path, None)
+        if self._cached_root(path) is not None:
+            self.stale.add(path)
+
+    def _remove_from_tree(self, path: str) -> bool:
+        """Odebere uzel z načtených podstromů. False, pokud ho nelze najít."""
+        self.trees = {r: t for r, t in self.trees.items() if not (r and in_subtree(r, path))}
+        self.stale = {s for s in self.stale if not in_subtree(s, path)}
+        cached = self._cached_root(path)
+        if cached is None:
+            return True
+        parent = find_node(self.trees[cached], relative_to(parent_of(path), cached))
+        children = parent.get("children") if parent else None
+        if not path or not isinstance(children, list):
+            return False
+        name = path.rsplit("/", 1)[-1]
+        kept = [c for c in children if not (isinstance(c, dict) and c.get("name") == name)]
+        if len(kept) == len(children):
+            return False
+        parent["children"] = kept
+        return True
+
+    def _node_removed(self, path: str):
+        self._drop_node_data(path)
+        self.node_info.pop(parent_of(path), None)
+        if not self._remove_from_tree(path):
+            self._children_changed(parent_of(path))
+
+    def apply(self, command: dict):
+        """Zneplatní část zrcadla dotčenou měnícím příkazem."""
+        cmd = command.get("cmd")
+        if cmd in NEUTRAL_COMMANDS or cmd in READ_COMMANDS:
+            return
+        self.generation += 1
+        self.invalidations += 1
+
+        if cmd == "batch":
+            for item in command.get("commands", []):
+                self.apply(item)
+            return
+        if cmd in ("load_scene", "create_scene"):
+            self.clear()
+            return
+        if cmd == "delete_node":
+            self._node_removed(normalize_path(command.get("path")))
+            return
+        if cmd == "reparent_node":
+            path = normalize_path(command.get("path"))
+            self._node_removed(path)
+            self._children_changed(normalize_path(command.get("new_parent")))
+            return
+        if cmd in ("set_prop", "set_property"):
+            path = normalize_path(command.get("path"))
+            base = str(command.get("prop") or "").split(":", 1)[0]
+            # Vlastnosti na sobě závisí (transform/position/rotation/basis/global_*,
+            # size/offset/anchors u Control) a globální hodnoty potomků se odvozují
+            # od rodiče - zahodí se všechny vlastnosti a info celého podstromu
+            self._drop_node_data(path)
+            if base in STRUCTURAL_PROPERTIES:
+                self._children_changed(parent_of(path))
+            return
+
+        rule = INVALIDATION_RULES.get(cmd)
+        if rule is None:
+            # Neznámý dopad (např. call_method) - bezpečně zahodíme vše
+            logger.debug(f"Příkaz {cmd} zneplatňuje celé zrcadlo scény")
+            self.clear()
+            return
+        kind, key = rule
+        path = normalize_path(command.get(key)) if key else ""
+        if kind == "children":
+            self._children_changed(path)
+        elif kind == "node":
+            self._drop_node_data(path)
+        elif kind == "owner":
+            self._drop_node_data(path)
+            self._children_changed(parent_of(path))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "cached_subtrees": sorted(self.trees),
+            "stale_subtrees": sorted(self.stale),
+            "node_info_entries": len(self.node_info),
+            "property_entries": len(self.properties)
+        }
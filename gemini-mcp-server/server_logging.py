@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Logování serveru mimo event loop.
+Loggery zapisují jen do fronty (QueueHandler), formátování a zápis do souboru dělá
+vlákno QueueListener. Výstup je JSON Lines s rotací podle velikosti, velké payloady
+(pozice instancí, obsah skriptů) se místo celé hodnoty logují jako velikost a hash
+a úroveň logování lze nastavit zvlášť pro každý subsystém.
+"""
+
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Any, Callable
+
+# Kořenový logger serveru; subsystémy jsou jeho potomci (godot-mcp.connection, godot-mcp.jobs, ...)
+ROOT_LOGGER = "godot-mcp"
+# Rotace logu: velikost jednoho souboru a počet starších souborů
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+# Hodnoty delší než tento počet bajtů (v UTF-8, resp. JSON) se logují jen jako souhrn
+PAYLOAD_LIMIT = 512
+# Delší seznamy se pro souhrn serializují po částech této délky
+LIST_CHUNK = 1024
+
+# Atributy, které má každý LogRecord - ostatní pocházejí z `extra` a jdou do výstupu jako pole
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def summarize_payload(value: Any, limit: int = PAYLOAD_LIMIT) -> Any:
+    """
+    Hodnota pro log: malé hodnoty beze změny, velké řetězce a seznamy jako
+    {"size": bajty, "items"/"chars": délka, "blake2b": hash}. Slovníky se procházejí po klíčích,
+    takže i u velkého volání zůstanou vidět malé argumenty (node_path, cmd, ...).
+    """
+    if isinstance(value, dict):
+        return {str(key): summarize_payload(item, limit) for key, item in value.items()}
+    if isinstance(value, str):
+        data = value.encode("utf-8", "replace")
+        length = {"chars": len(value)}
+    elif isinstance(value, (list, tuple)):
+        if len(value) > LIST_CHUNK:
+            return _summarize_list(value)
+        data = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        length = {"items": len(value)}
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        # Binární data v JSON logu nejsou čitelná ani malá
+        data = bytes(value)
+        length = {}
+        limit = -1
+    else:
+        return value
+    if len(data) <= limit:
+        return value
+    return {"size": len(data), **length, "blake2b": hashlib.blake2b(data, digest_size=8).hexdigest()}
+
+
+def _summarize_list(value: list | tuple) -> dict:
+    """
+    Souhrn dlouhého seznamu se stejnou velikostí a hashem jako u celého JSON, ale serializuje
+    se po částech - jedno volání json.dumps drží GIL a zdrželo by event loop po celou dobu.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(b"[")
+    size = 2
+    for start in range(0, len(value), LIST_CHUNK):
+        chunk = json.dumps(value[start:start + LIST_CHUNK], separators=(",", ":"), ensure_ascii=False,
+                           default=str).encode("utf-8")[1:-1]
+        if start:
+            digest.update(b",")
+            size += 1
+        digest.update(chunk)
+        size += len(chunk)
+    digest.update(b"]")
+    return {"size": size, "items": len(value), "blake2b": digest.hexdigest()}
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    """
+    'connection=DEBUG,jobs=WARNING' -> {'godot-mcp.connection': 10, 'godot-mcp.jobs': 30}.
+    Jména bez tečky se berou jako subsystémy serveru, jména s tečkou (mcp.server) jako celá jména loggerů.
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if not name or not level:
+            continue
+        if not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Neznámá úroveň logování '{level}' pro '{name}'")
+        if name != ROOT_LOGGER and "." not in name:
+            name = f"{ROOT_LOGGER}.{name}"
+        levels[name] = logging.getLevelName(level)
+    return levels
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Jeden záznam = jeden JSON objekt na řádku; pole z `extra` se přidají (velké hodnoty jako souhrn)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = summarize_payload(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Doplní do záznamu hodnoty z kontextu volajícího (nástroj, úloha). Běží ještě ve vlákně,
+    které loguje - ve vlákně zapisovače už contextvars volání nejsou k dispozici.
+    """
+
+    def __init__(self, fields: dict[str, Callable[[], Any]]):
+        super().__init__()
+        self.fields = fields
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, getter in self.fields.items():
+            value = getter()
+            if value is not None and not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Na straně volajícího jen složí zprávu a uloží traceback jako text; pole z `extra`
+    (např. argumenty volání) se do souhrnu a JSON převádí až ve vlákně zapisovače.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class LogPipeline:
+    """Fronta, vlákno zapisovače a rotovaný soubor; `stop()` dopíše zbytek fronty."""
+
+    def __init__(self, listener: logging.handlers.QueueListener, handler: logging.Handler, path: str):
+        self.listener = listener
+        self.handler = handler
+        self.path = path
+        self.running = True
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.listener.stop()
+            self.handler.close()
+
+
+def setup_logging(path: str, level: int = logging.INFO, levels: dict[str, int] | None = None,
+                  context: dict[str, Callable[[], Any]] | None = None,
+                  max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS) -> LogPipeline:
+    """
+    Nahradí handlery kořenového loggeru frontou a spustí vlákno zapisovače.
+    Log z předchozího běhu se při startu odrotuje (dřív se soubor přepisoval).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                        encoding="utf-8", delay=True)
+    if backups and os.path.exists(path) and os.path.getsize(path) > 0:
+        file_handler.doRollover()
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    if context:
+        queue_handler.addFilter(ContextFilter(context))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    for name, subsystem_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return LogPipeline(listener, file_handler, path)
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Lokální dlaždicová kopie výšek Terrain3D.
+Výšky jsou uložené jako memory-mapped float32 dlaždice o velikosti regionu
+(region_size x region_size vertexů) a v paměti je jen LRU naposledy použitých,
+takže dotazy na výšku, sklon a raycast se obslouží bez editoru i u velkých světů.
+Plní se ze zdrojových obrázků importů a exportů, importy invalidují dotčené regiony.
+Cache patří jednomu běhu serveru nad jedním projektem: každý projekt má vlastní podsložku,
+při startu serveru a po načtení nebo založení scény se zahodí (terén mohl být mezitím
+změněn v editoru, neuložen nebo je to jiný terén se stejnou cestou uzlu).
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+
+from heightfield import HeightField, HeightmapError, np, open_source, require_numpy
+from scene_mirror import join_path, normalize_path
+
+logger = logging.getLogger("godot-mcp.terrain-cache")
+
+DEFAULT_REGION_SIZE = 256
+
+# Počet dlaždic držených otevřených (memory-mapped) současně
+MAX_HOT_TILES = 64
+
+# Příkazy, po kterých se cache plní nebo invaliduje
+TRACKED_COMMANDS = {"batch", "create_terrain", "terrain_configure", "terrain_import_heightmap", "terrain_task",
+                    "load_scene", "create_scene"}
+# Příkazy, po kterých už nakešované terény nemusí odpovídat scéně v editoru
+SCENE_COMMANDS = {"load_scene", "create_scene"}
+
+# Jednobodové dotazy, které lze obsloužit z cache
+QUERY_COMMANDS = {"terrain_get_height", "terrain_raycast"}
+
+
+def project_scope(project_dir: str) -> str:
+    """Podsložka cache pro projekt - servery nad různými projekty nesdílí index ani dlaždice."""
+    if not project_dir:
+        return "_default"
+    path = os.path.normcase(os.path.abspath(project_dir))
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", os.path.basename(path.rstrip("\\/"))) or "project"
+    return f"{name}-{hashlib.blake2b(path.encode('utf-8'), digest_size=4).hexdigest()}"
+
+
+def resolve_path(path: str, project_dir: str) -> str | None:
+    """Lokální cesta k souboru; res:// jen se známou složkou projektu."""
+    if not path:
+        return None
+    if path.startswith("res://"):
+        if not project_dir:
+            return None
+        path = os.path.join(project_dir, path[len("res://"):])
+    return path if os.path.isfile(path) else None
+
+
+def vertex_origin(position, spacing: float) -> tuple[int, int]:
+    """Vertex (sloupec, řádek), na který připadá levý horní roh heightmapy na `position`."""
+    return int(round(float(position[0]) / spacing)), int(round(float(position[2]) / spacing))
+
+
+def region_blocks(shape: tuple[int, int], c0: int, r0: int, size: int):
+    """
+    Rozdělí zdroj (řádky, sloupce) umístěný od vertexu (c0, r0) podle regionů.
+    Vrací (rx, rz, řádky zdroje, sloupce zdroje) pro každý zasažený region.
+    """
+    rows, cols = shape
+    for rz in range(r0 // size, (r0 + rows - 1) // size + 1):
+        for rx in range(c0 // size, (c0 + cols - 1) // size + 1):
+            row_start, row_end = max(r0, rz * size), min(r0 + rows, (rz + 1) * size)
+            col_start, col_end = max(c0, rx * size), min(c0 + cols, (rx + 1) * size)
+            yield rx, rz, slice(row_start - r0, row_end - r0), slice(col_start - c0, col_end - c0)
+
+
+class _TileView(HeightField):
+    """Výšky jedné cache terénu s rozhraním HeightField (sample, gradient, normals)."""
+
+    def __init__(self, cache: "TerrainTileCache", key: str, spacing: float):
+        self.cache = cache
+        self.key = key
+        self.origin_x = self.origin_z = 0.0
+        self.spacing = spacing
+
+    @property
+    def bounds(self):
+        return (-np.inf, -np.inf, np.inf, np.inf)
+
+    def sample(self, x, z):
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        u = x / self.spacing
+        v = z / self.spacing
+        c0 = np.floor(u).astype(np.int64)
+        r0 = np.floor(v).astype(np.int64)
+        fu = u - c0
+        fv = v - r0
+        values = self.cache._gather(self.key, np.stack([c0, c0 + 1, c0, c0 + 1]), np.stack([r0, r0, r0 + 1, r0 + 1]))
+        top = _lerp(values[0], values[1], fu)
+        bottom = _lerp(values[2], values[3], fu)
+        return _lerp(top, bottom, fv)
+
+    def gradient(self, x, z):
+        """Centrální diference jedním průchodem přes dlaždice (cache nemá pevné hranice)."""
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        d = self.spacing
+        samples = self.sample(np.stack([x + d, x - d, x, x]), np.stack([z, z, z + d, z - d]))
+        return (samples[0] - samples[1]) / (2 * d), (samples[2] - samples[3]) / (2 * d)
+
+
+def _lerp(a, b, t):
+    # Na přesné hraně dat je sousední vertex NaN, ale má nulovou váhu
+    return np.where(t == 0, a, a * (1 - t) + b * t)
+
+
+class TerrainTileCache:
+    """
+    Cache výšek terénů. Terén je identifikován cestou uzlu nebo datovou složkou
+    (create_terrain je propojí), rozložení dlaždic odpovídá regionům Terrain3D:
+    region (rx, rz) pokrývá vertexy [rx * region_size, (rx + 1) * region_size).
+    """
+
+    def __init__(self, cache_dir: str, project_dir: str = "", max_hot_tiles: int = MAX_HOT_TILES):
+        self.cache_dir = os.path.join(cache_dir, project_scope(project_dir))
+        self.project_dir = project_dir
+        self.max_hot_tiles = max_hot_tiles
+        self._hot: OrderedDict[tuple[str, int, int], "np.memmap"] = OrderedDict()
+        self._tiles: dict[str, set[tuple[int, int]]] = {}
+        # Plnění běží ve vlákně, dotazy ze smyčky zámek jen zkouší
+        self._lock = threading.RLock()
+        # Dlaždice z minulého běhu nemusí odpovídat terénu v editoru - začíná se s prázdnou cache
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        # Aliasy cest uzlů na datové složky a rozložení regionů terénů (jen v paměti)
+        self.index = {"aliases": {}, "terrains": {}}
+        self.hits = 0
+        self.misses = 0
+        self.tile_loads = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # Úložiště
+    # ------------------------------------------------------------------
+    def _key(self, name) -> str:
+        name = normalize_path(name)
+        return self.index["aliases"].get(name, name)
+
+    def _layout(self, key: str) -> dict:
+        return self.index["terrains"].get(key, {"region_size": DEFAULT_REGION_SIZE, "vertex_spacing": 1.0})
+
+    def terrain_key(self, name) -> str:
+        """Klíč terénu - cesta uzlu se převede na jeho datovou složku, pokud je známá."""
+        return self._key(name)
+
+    def layout(self, name) -> dict:
+        return dict(self._layout(self._key(name)))
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", key) or "_root")
+
+    def _tile_path(self, key: str, rx: int, rz: int) -> str:
+        return os.path.join(self._dir(key), f"tile_{rx}_{rz}.f32")
+
+    def _known_tiles(self, key: str) -> set[tuple[int, int]]:
+        if key not in self._tiles:
+            tiles = set()
+            if os.path.isdir(self._dir(key)):
+                for name in os.listdir(self._dir(key)):
+                    match = re.fullmatch(r"tile_(-?\d+)_(-?\d+)\.f32", name)
+                    if match:
+                        tiles.add((int(match.group(1)), int(match.group(2))))
+            self._tiles[key] = tiles
+        return self._tiles[key]
+
+    def _tile(self, key: str, rx: int, rz: int, create: bool = False):
+        """Memory-mapped dlaždice z LRU, případně ji otevře (nebo založí plnou NaN)."""
+        hot_key = (key, rx, rz)
+        tile = self._hot.get(hot_key)
+        if tile is not None:
+            self._hot.move_to_end(hot_key)
+            return tile
+        known = self._known_tiles(key)
+        if (rx, rz) not in known and not create:
+            return None
+        size = self._layout(key)["region_size"]
+        path = self._tile_path(key, rx, rz)
+        if (rx, rz) in known:
+            tile = np.memmap(path, dtype="<f4", mode="r+", shape=(size, size))
+        else:
+            os.makedirs(self._dir(key), exist_ok=True)
+            tile = np.memmap(path, dtype="<f4", mode="w+", shape=(size, size))
+            tile[:] = np.nan
+            known.add((rx, rz))
+        self.tile_loads += 1
+        self._hot[hot_key] = tile
+        while len(self._hot) > self.max_hot_tiles:
+            _, evicted = self._hot.popitem(last=False)
+            evicted.flush()
+            self.evictions += 1
+        return tile
+
+    def _gather(self, key: str, cols, rows) -> "np.ndarray":
+        """Výšky ve vertexech (cols, rows) napříč dlaždicemi; chybějící dlaždice = NaN."""
+        size = self._layout(key)["region_size"]
+        out = np.full(cols.shape, np.nan)
+        if not out.size:
+            return out
+        flat_cols, flat_rows, flat_out = cols.ravel(), rows.ravel(), out.reshape(-1)
+        tile_x, tile_z = flat_cols // size, flat_rows // size
+        # Dlaždice se rozliší jedním celočíselným klíčem (rychlejší než unique po řádcích)
+        tile_keys = (tile_x << 32) + (tile_z & 0xFFFFFFFF)
+        if (tile_keys == tile_keys[0]).all():
+            tiles, inverse = tile_keys[:1], np.zeros(tile_keys.size, dtype=np.intp)
+        else:
+            tiles, inverse = np.unique(tile_keys, return_inverse=True)
+        for index, tile_key in enumerate(tiles.tolist()):
+            rx, rz = tile_key >> 32, ((tile_key & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000
+            tile = self._tile(key, rx, rz)
+            if tile is None:
+                continue
+            selected = inverse == index
+            flat_out[selected] = tile[flat_rows[selected] - rz * size, flat_cols[selected] - rx * size]
+        return out
+
+    # ------------------------------------------------------------------
+    # Plnění a invalidace
+    # ------------------------------------------------------------------
+    def _drop_tiles(self, key: str, tiles):
+        for rx, rz in list(tiles):
+            tile = self._hot.pop((key, rx, rz), None)
+            del tile
+            try:
+                os.remove(self._tile_path(key, rx, rz))
+            except OSError:
+                pass
+            self._known_tiles(key).discard((rx, rz))
+
+    def invalidate(self, name, area: tuple[int, int, int, int] | None = None):
+        """Zahodí dlaždice terénu; s `area` (sloupec, řádek, šířka, výška ve vertexech) jen dotčené."""
+        with self._lock:
+            key = self._key(name)
+            tiles = self._known_tiles(key)
+            if area is not None:
+                size = self._layout(key)["region_size"]
+                c0, r0, width, height = area
+                tiles = {(rx, rz) for rx, rz in tiles
+                         if rx * size < c0 + width and (rx + 1) * size > c0
+                         and rz * size < r0 + height and (rz + 1) * size > r0}
+            if tiles:
+                logger.info(f"Invalidace {len(tiles)} dlaždic terénu '{key}'")
+            self._drop_tiles(key, tiles)
+
+    def ingest(self, name, path: str, min_height: float, max_height: float, position=(0.0, 0.0, 0.0),
+               r16_dim=None) -> int:
+        """
+        Zapíše heightmapu ze souboru do dlaždic (po dlaždicích, zdroj RAW/R16/NPY se čte
+        memory-mapped). Hodnota 0..1 se mapuje na min_height..max_height; position[1] Terrain3D
+        při importu ignoruje, proto se nepřičítá. Vrací počet dlaždic.
+        """
+        require_numpy()
+        source, factor = open_source(path, r16_dim)
+        with self._lock:
+            key = self._key(name)
+            layout = self._layout(key)
+            size, spacing = layout["region_size"], layout["vertex_spacing"]
+            c0, r0 = vertex_origin(position, spacing)
+            scale = np.float32(factor * (max_height - min_height))
+            written = 0
+            for rx, rz, rows, cols in region_blocks(source.shape, c0, r0, size):
+                tile = self._tile(key, rx, rz, create=True)
+                tile[rows.start + r0 - rz * size:rows.stop + r0 - rz * size,
+                     cols.start + c0 - rx * size:cols.stop + c0 - rx * size] = (
+                    source[rows, cols].astype(np.float32) * scale + np.float32(min_height))
+                tile.flush()
+                written += 1
+            self.index["terrains"].setdefault(key, layout)
+            logger.info(f"Terén '{key}': {written} dlaždic z {path}")
+            return written
+
+    def configure(self, name, region_size: int | None = None, vertex_spacing: float | None = None):
+        """Změna rozložení regionů zneplatní všechny dlaždice terénu."""
+        with self._lock:
+            key = self._key(name)
+            layout = dict(self._layout(key))
+            if region_size is not None:
+                layout["region_size"] = int(region_size)
+            if vertex_spacing is not None:
+                layout["vertex_spacing"] = float(vertex_spacing)
+            if layout != self._layout(key):
+                self._drop_tiles(key, self._known_tiles(key))
+                self.index["terrains"][key] = layout
+
+    def alias(self, node_path, data_dir):
+        """Propojí cestu uzlu terénu s jeho datovou složkou (terrain_task zná jen složku)."""
+        with self._lock:
+            node_path, data_dir = normalize_path(node_path), normalize_path(data_dir)
+            if node_path and data_dir:
+                self.index["aliases"][node_path] = data_dir
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.index["terrains"]) + list(self._tiles):
+                self._drop_tiles(key, self._known_tiles(key))
+            self._hot.clear()
+            self._tiles.clear()
+            self.index = {"aliases": {}, "terrains": {}}
+
+    # ------------------------------------------------------------------
+    # Napojení na příkazy Godot
+    # ------------------------------------------------------------------
+    def tracks(self, command: dict) -> bool:
+        return command.get("cmd") in TRACKED_COMMANDS
+
+    def _import(self, name, file_path: str, min_height: float, max_height: float, position, r16_dim):
+        """Import do terénu: dotčené dlaždice se přepíšou ze zdroje, jinak zneplatní."""
+        path = resolve_path(file_path, self.project_dir)
+        if path is not None:
+            try:
+                self.ingest(name, path, min_height, max_height, position, r16_dim)
+                return
+            except HeightmapError as e:
+                logger.warning(f"Zdroj importu nelze načíst do cache: {e}")
+        if r16_dim:
+            spacing = self._layout(self._key(name))["vertex_spacing"]
+            self.invalidate(name, (int(round(position[0] / spacing)), int(round(position[2] / spacing)),
+                                   int(r16_dim[0]), int(r16_dim[1])))
+        else:
+            self.invalidate(name)
+
+    def finish(self, command: dict, response: dict):
+        """
+        Volá se po odpovědi Godot (mimo smyčku událostí - import může číst velký soubor).
+        Neúspěšný import mohl terén změnit částečně, proto se dotčený terén zneplatní.
+        """
+        cmd = command.get("cmd")
+        ok = response.get("status") == "ok"
+        if cmd in SCENE_COMMANDS:
+            # Jiná scéna: stejná cesta uzlu může být jiný terén, neuložené úpravy se zahodily
+            logger.info(f"{cmd}: cache výšek terénů se zahazuje")
+            self.clear()
+        elif cmd == "batch":
+            results = response.get("results") or []
+            for index, item in enumerate(command.get("commands", [])):
+                self.finish(item, results[index] if index < len(results) else {"status": "error"})
+        elif cmd == "create_terrain" and ok:
+            node_path = join_path(normalize_path(command.get("parent_path")), command.get("name") or "Terrain3D")
+            self.alias(node_path, command.get("storage_path"))
+            self.invalidate(node_path)
+        elif cmd == "terrain_configure" and ok:
+            self.configure(command.get("node_path"), command.get("region_size"), command.get("vertex_spacing"))
+        elif cmd == "terrain_import_heightmap":
+            if not ok:
+                self.invalidate(command.get("node_path"))
+                return
+            self._import(command.get("node_path"), command.get("file_path"),
+                         command.get("min_height", 0.0), command.get("max_height", 100.0),
+                         command.get("position") or [0, 0, 0], command.get("r16_dim"))
+        elif cmd == "terrain_task" and command.get("map_type") == "height":
+            params = command.get("params") or {}
+            name = command.get("data_dir")
+            if command.get("task_type") == "import":
+                if not ok:
+                    self.invalidate(name)
+                    return
+                self._import(name, command.get("file_path"),
+                             params.get("min_height", params.get("offset", 0.0)),
+                             params.get("max_height", params.get("offset", 0.0) + params.get("scale", 1.0)),
+                             params.get("position") or [0, 0, 0], params.get("r16_dim"))
+            elif ok and "position" in params:
+                # Export celého terénu - jeho počátek zná jen volající
+                path = resolve_path(command.get("file_path"), self.project_dir)
+                if path is not None:
+                    try:
+                        self.ingest(name, path, params.get("min_height", 0.0), params.get("max_height", 1.0),
+                                    params["position"], params.get("r16_dim"))
+                    except HeightmapError as e:
+                        logger.warning(f"Export nelze načíst do cache: {e}")
+
+    # ------------------------------------------------------------------
+    # Dotazy
+    # ------------------------------------------------------------------
+    def view(self, name) -> _TileView:
+        key = self._key(name)
+        return _TileView(self, key, self._layout(key)["vertex_spacing"])
+
+    def sample(self, name, x, z, normals: bool = False):
+        """Výšky (a normály) z cache; body mimo nakešované regiony jsou NaN."""
+        with self._lock:
+            field = self.view(name)
+            heights = field.sample(x, z)
+            return heights, field.normals(x, z) if normals else None
+
+    def _height_at(self, key: str, x: float, z: float) -> float:
+        """Bilineární výška v jednom bodě bez numpy vektorů (jednobodové dotazy v řádu µs)."""
+        layout = self._layout(key)
+        size, spacing = layout["region_size"], layout["vertex_spacing"]
+        u, v = x / spacing, z / spacing
+        col, row = math.floor(u), math.floor(v)
+        fu, fv = u - col, v - row
+
+        def vertex(c: int, r: int) -> float:
+            tile = self._tile(key, c // size, r // size)
+            return math.nan if tile is None else float(tile[r % size, c % size])
+
+        def lerp(a: float, b: float, t: float) -> float:
+            return a if t == 0 else a * (1 - t) + b * t
+
+        top = lerp(vertex(col, row), vertex(col + 1, row) if fu else 0.0, fu)
+        if not fv:
+            return top
+        return lerp(top, lerp(vertex(col, row + 1), vertex(col + 1, row + 1) if fu else 0.0, fu), fv)
+
+    def lookup(self, command: dict) -> dict | None:
+        """Odpověď na jednobodový dotaz z cache, nebo None (miss, probíhá plnění)."""
+        if command.get("cmd") not in QUERY_COMMANDS or np is None:
+            return None
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            x, z = float(command.get("x", 0.0)), float(command.get("z", 0.0))
+            key = self._key(command.get("node_path"))
+            height = self._height_at(key, x, z)
+            if math.isnan(height):
+                self.misses += 1
+                return None
+            d = self._layout(key)["vertex_spacing"]
+            dx = (self._height_at(key, x + d, z) - self._height_at(key, x - d, z)) / (2 * d)
+            dz = (self._height_at(key, x, z + d) - self._height_at(key, x, z - d)) / (2 * d)
+            self.hits += 1
+        finally:
+            self._lock.release()
+        normal, slope = None, None
+        if not (math.isnan(dx) or math.isnan(dz)):
+            length = math.sqrt(dx * dx + 1.0 + dz * dz)
+            normal = [round(-dx / length, 4), round(1.0 / length, 4), round(-dz / length, 4)]
+            slope = round(math.degrees(math.atan(math.hypot(dx, dz))), 2)
+        return {"status": "ok", "data": {
+            "height": round(height, 4),
+            "position": [x, round(height, 4), z],
+            "normal": normal,
+            "slope_degrees": slope,
+            "source": "cache"
+        }}
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "terrains": {
+                    key: {**self._layout(key), "tiles": len(self._known_tiles(key))}
+                    for key in sorted(set(self.index["terrains"]) | set(self._tiles))
+                },
+                "aliases": dict(self.index["aliases"]),
+                "hot_tiles": len(self._hot),
+                "max_hot_tiles": self.max_hot_tiles,
+                "tile_loads": self.tile_loads,
+                "evictions": self.evictions
+            }
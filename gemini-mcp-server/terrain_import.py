@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Inkrementální import heightmap do Terrain3D.
+Zdroj se rozdělí podle regionů terénu a obsah každého regionu se zahešuje.
+Manifest si pamatuje, co bylo naposledy importováno do které datové složky,
+a do Godot se posílají jen výřezy regionů, které se od té doby změnily. Manifest
+platí jen po dobu běhu serveru a jen pro aktuální scénu (load_scene/create_scene ho
+zahodí) - terén v editoru se mohl mezitím změnit, i když zdroj zůstal stejný.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+from heightfield import HeightmapError, Image, np, open_source
+from terrain_cache import SCENE_COMMANDS, TerrainTileCache, region_blocks, resolve_path, vertex_origin
+
+logger = logging.getLogger("godot-mcp.terrain-import")
+
+# Parametry importu, které nemají vliv na obsah regionu (zachycuje ho umístění bloku a data)
+_PLACEMENT_KEYS = {"cmd", "node_path", "data_dir", "file_path", "position", "r16_dim", "params"}
+
+
+def import_target(command: dict | None) -> str | None:
+    """Terén (node_path nebo data_dir), do kterého příkaz importuje heightmapu, jinak None."""
+    if not command:
+        return None
+    if command.get("cmd") == "terrain_import_heightmap":
+        return command.get("node_path")
+    if command.get("cmd") == "terrain_task" and command.get("task_type") == "import" \
+            and command.get("map_type") == "height":
+        return command.get("data_dir")
+    return None
+
+
+def _placement(command: dict) -> dict:
+    """Parametry s pozicí a rozměry RAW (u terrain_task jsou v 'params')."""
+    return (command.get("params") or {}) if command.get("cmd") == "terrain_task" else command
+
+
+def _read_source(path: str, r16_dim) -> tuple["np.ndarray", str] | None:
+    """
+    Celočíselná data zdroje a přípona výřezů. Výřez musí mít stejný formát a bitovou
+    hloubku jako zdroj, aby ho Terrain3D naškáloval stejně; jiné formáty (EXR) se importují celé.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".r16", ".raw"):
+        return open_source(path, r16_dim)[0], ".r16"
+    if extension == ".png" and Image is not None:
+        try:
+            with Image.open(path) as img:
+                if img.mode == "L":
+                    return np.asarray(img), ".png"
+                if img.mode in ("I;16", "I;16L", "I;16B", "I"):
+                    return np.asarray(img).astype(np.uint16), ".png"
+        except OSError as e:
+            raise HeightmapError(f"Nelze načíst {path}: {e}") from e
+    return None
+
+
+@dataclass
+class Region:
+    rx: int
+    rz: int
+    rows: slice
+    cols: slice
+    digest: str
+
+
+@dataclass
+class ImportPlan:
+    """Rozdělení jednoho importu na regiony a porovnání s manifestem."""
+    command: dict
+    key: str
+    layout: dict
+    source: "np.ndarray"
+    extension: str
+    regions: list[Region]
+    changed: list[Region]
+    previous: dict = field(default_factory=dict)
+
+    @property
+    def skipped(self) -> int:
+        return len(self.regions) - len(self.changed)
+
+
+class RegionImportLog:
+    """
+    Manifest importů: pro každý terén (datovou složku, cesty uzlů se převádí přes aliasy
+    cache výšek) rozložení regionů a hash obsahu každého importovaného regionu.
+    Drží se jen v paměti; výřezy regionů se zapisují do složky projektu v cache výšek.
+    """
+
+    def __init__(self, cache: TerrainTileCache):
+        self.cache = cache
+        self.cache_dir = cache.cache_dir
+        self._lock = threading.Lock()
+        self.manifest = {}
+        self.imported = 0
+        self.skipped = 0
+
+    def plan(self, command: dict) -> ImportPlan | None:
+        """
+        Zahešuje regiony zdroje (čte se memory-mapped). None, pokud zdroj nelze číst
+        lokálně nebo ho nelze rozřezat - pak se importuje celý jako dřív.
+        """
+        placement = _placement(command)
+        path = resolve_path(command.get("file_path"), self.cache.project_dir)
+        if path is None or np is None:
+            return None
+        try:
+            source = _read_source(path, placement.get("r16_dim"))
+        except HeightmapError as e:
+            logger.warning(f"Zdroj importu nelze rozdělit na regiony: {e}")
+            return None
+        if source is None:
+            return None
+        data, extension = source
+
+        key = self.cache.terrain_key(import_target(command))
+        layout = self.cache.layout(key)
+        size, spacing = layout["region_size"], layout["vertex_spacing"]
+        position = placement.get("position") or [0, 0, 0]
+        c0, r0 = vertex_origin(position, spacing)
+        # Výškové mapování mění výsledek všech regionů stejně (Y z pozice Terrain3D ignoruje)
+        settings = {k: v for k, v in {**command, **placement}.items() if k not in _PLACEMENT_KEYS}
+        header = json.dumps(settings, sort_keys=True).encode("utf-8") + str(data.dtype).encode("ascii")
+
+        regions = []
+        for rx, rz, rows, cols in region_blocks(data.shape, c0, r0, size):
+            digest = hashlib.blake2b(header, digest_size=16)
+            # Poloha bloku uvnitř regionu - posunutý zdroj mění obsah, i když jsou data stejná
+            digest.update(f"{rows.start + r0 - rz * size},{cols.start + c0 - rx * size},"
+                          f"{rows.stop - rows.start},{cols.stop - cols.start}".encode("ascii"))
+            digest.update(np.ascontiguousarray(data[rows, cols]).data)
+            regions.append(Region(rx, rz, rows, cols, digest.hexdigest()))
+
+        with self._lock:
+            entry = self.manifest.get(key)
+            previous = entry["regions"] if entry and entry.get("layout") == layout else {}
+        changed = [r for r in regions if previous.get(f"{r.rx},{r.rz}") != r.digest]
+        return ImportPlan(command, key, layout, data, extension, regions, changed, dict(previous))
+
+    def region_command(self, plan: ImportPlan, region: Region) -> dict:
+        """Zapíše výřez regionu a vrátí importní příkaz, který ho umístí na stejné místo."""
+        block = np.ascontiguousarray(plan.source[region.rows, region.cols])
+        directory = os.path.join(self.cache_dir, "imports", re.sub(r"[^A-Za-z0-9_.-]", "_", plan.key) or "_root")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"region_{region.rx}_{region.rz}{plan.extension}")
+        if plan.extension == ".r16":
+            block.astype("<u2").tofile(path)
+        else:
+            Image.fromarray(block).save(path)
+
+        command = json.loads(json.dumps(plan.command))
+        placement = _placement(command)
+        if command.get("cmd") == "terrain_task":
+            command["params"] = placement
+        position = list(placement.get("position") or [0, 0, 0])
+        spacing = plan.layout["vertex_spacing"]
+        position[0] = float(position[0]) + region.cols.start * spacing
+        position[2] = float(position[2]) + region.rows.start * spacing
+        placement["position"] = position
+        if plan.extension == ".r16":
+            placement["r16_dim"] = [block.shape[1], block.shape[0]]
+        command["file_path"] = path
+        return command
+
+    def record(self, plan: ImportPlan, imported: list[Region]):
+        """Zapamatuje úspěšně importované regiony; neúspěšné se při příštím importu pošlou znovu."""
+        with self._lock:
+            regions = dict(plan.previous)
+            for region in plan.changed:
+                regions.pop(f"{region.rx},{region.rz}", None)
+            for region in imported:
+                regions[f"{region.rx},{region.rz}"] = region.digest
+            self.manifest[plan.key] = {"layout": plan.layout, "regions": regions}
+            self.imported += len(imported)
+            self.skipped += plan.skipped
+
+    def forget(self, name):
+        """Terén se změnil mimo sledované importy - další import půjde celý."""
+        with self._lock:
+            self.manifest.pop(self.cache.terrain_key(name), None)
+
+    def tracks(self, command: dict) -> bool:
+        return command.get("cmd") in ("batch", "create_terrain") or command.get("cmd") in SCENE_COMMANDS
+
+    def finish(self, command: dict):
+        """
+        Importy v dávce a nově založený terén zneplatní záznam dotčeného terénu,
+        načtení nebo založení scény celý manifest (neuložený terén se zahodil).
+        """
+        if command.get("cmd") in SCENE_COMMANDS:
+            self.clear()
+        elif command.get("cmd") == "batch":
+            for item in command.get("commands", []):
+                self.finish(item)
+        elif command.get("cmd") == "create_terrain":
+            self.forget(command.get("storage_path"))
+        elif import_target(command) is not None:
+            self.forget(import_target(command))
+
+    def clear(self):
+        with self._lock:
+            self.manifest = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "regions_imported": self.imported,
+                "regions_skipped": self.skipped,
+                "terrains": {key: len(entry["regions"]) for key, entry in self.manifest.items()}
+            }
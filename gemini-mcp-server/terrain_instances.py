@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Binární rychlá cesta pro hromadné rozmístění instancí na Terrain3D.
+Instance jsou řádky float32 [x, y, z (, rot_y (, scale))] v jednom souvislém bloku
+(little-endian), který se posílá do bridge po částech zakódovaných base64
+místo vnořených JSON seznamů.
+"""
+
+import array
+import base64
+import binascii
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Počet float32 hodnot na instanci -> význam sloupců
+LAYOUTS = {
+    3: "x, y, z",
+    4: "x, y, z, rot_y",
+    5: "x, y, z, rot_y, scale"
+}
+
+# Výchozí počet instancí v jednom příkazu pro bridge (~80 kB dat při 5 sloupcích)
+DEFAULT_CHUNK_SIZE = 4096
+
+
+class InstanceDataError(ValueError):
+    """Vstupní data instancí nemají platný formát."""
+
+
+def _check_stride(stride: int):
+    if stride not in LAYOUTS:
+        raise InstanceDataError(f"Nepodporovaný počet sloupců {stride} (povoleno: {', '.join(map(str, LAYOUTS))})")
+
+
+def _to_float32(values: array.array) -> bytes:
+    """array('f') v nativním pořadí bajtů -> little-endian bajty."""
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def from_base64(data: str, stride: int) -> bytes:
+    """Dekóduje base64 blok float32 hodnot a ověří, že obsahuje celé řádky."""
+    _check_stride(stride)
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise InstanceDataError(f"Neplatná base64 data: {e}") from e
+    if len(raw) % (4 * stride):
+        raise InstanceDataError(f"Délka dat ({len(raw)} B) není násobkem řádku {stride} x float32")
+    return raw
+
+
+def from_npy(path: str) -> tuple[bytes, int]:
+    """Načte pole tvaru (N, 3|4|5) ze souboru .npy (vyžaduje numpy)."""
+    if np is None:
+        raise InstanceDataError("Načítání .npy vyžaduje balíček numpy (pip install numpy)")
+    try:
+        data = np.load(path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError) as e:
+        raise InstanceDataError(f"Nelze načíst {path}: {e}") from e
+    if data.ndim != 2:
+        raise InstanceDataError(f"Očekáváno 2D pole (N, sloupce), soubor má tvar {data.shape}")
+    _check_stride(data.shape[1])
+    return np.ascontiguousarray(data, dtype="<f4").tobytes(), data.shape[1]
+
+
+def from_lists(positions: list, rotations: list | None = None, scales: list | None = None) -> tuple[bytes, int]:
+    """Sestaví blok ze seznamů (pro menší dávky zadané přímo v JSON)."""
+    stride = 5 if scales is not None else 4 if rotations is not None else 3
+    for name, column in (("rotations", rotations), ("scales", scales)):
+        if column is not None and len(column) != len(positions):
+            raise InstanceDataError(f"'{name}' má {len(column)} hodnot, pozic je {len(positions)}")
+    values = array.array("f")
+    for index, position in enumerate(positions):
+        if len(position) != 3:
+            raise InstanceDataError(f"Pozice {index} nemá tvar [x, y, z]")
+        values.extend(position)
+        if stride >= 4:
+            values.append(rotations[index] if rotations is not None else 0.0)
+        if stride == 5:
+            values.append(scales[index])
+    return _to_float32(values), stride
+
+
+def load_instances(arguments: dict) -> tuple[bytes, int]:
+    """
+    Vrátí (little-endian float32 bajty, počet sloupců) podle zadaného zdroje:
+    'data' (base64), 'npy_path' nebo 'positions' (+ 'rotations', 'scales').
+    """
+    sources = [key for key in ("data", "npy_path", "positions") if arguments.get(key) is not None]
+    if len(sources) != 1:
+        raise InstanceDataError("Zadejte právě jeden zdroj instancí: 'data', 'npy_path' nebo 'positions'")
+    if sources[0] == "data":
+        stride = arguments.get("stride", 3)
+        return from_base64(arguments["data"], stride), stride
+    if sources[0] == "npy_path":
+        return from_npy(arguments["npy_path"])
+    return from_lists(arguments["positions"], arguments.get("rotations"), arguments.get("scales"))
+
+
+def iter_chunks(raw: bytes, stride: int, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Rozdělí blok na části po `chunk_size` instancích.
+    Vrací (index první instance, počet instancí, base64 text).
+    """
+    row = 4 * stride
+    total = len(raw) // row
+    view = memoryview(raw)
+    for start in range(0, total, chunk_size):
+        count = min(chunk_size, total - start)
+        yield start, count, base64.b64encode(view[start * row:(start + count) * row]).decode("ascii")
+
+
+def unpack_rows(encoded: str, stride: int) -> list[list[float]]:
+    """Zpětný převod části na seznamy řádků (pro bridge bez binární podpory)."""
+    values = array.array("f")
+    values.frombytes(base64.b64decode(encoded))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return [values[i:i + stride].tolist() for i in range(0, len(values), stride)]
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Dávkové dotazy na výšku terénu.
+Body se zadávají seznamem, packed float32 blokem nebo mřížkou a výšky
+(volitelně i normály) se vrací v jedné odpovědi jako JSON nebo base64 float32.
+"""
+
+import base64
+import binascii
+import math
+
+from heightfield import HeightmapError, np, require_numpy
+
+# Horní limit počtu bodů v jednom dotazu
+MAX_POINTS = 1_000_000
+
+# Do tohoto počtu bodů se v režimu 'auto' vrací čitelné JSON seznamy
+JSON_POINT_LIMIT = 1000
+
+
+def parse_points(arguments: dict) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Souřadnice (x, z) z právě jednoho zdroje: 'points' [[x, z], ...],
+    'points_data' (base64 float32 dvojic x, z) nebo 'grid' {origin, step, count}.
+    """
+    require_numpy()
+    sources = [key for key in ("points", "points_data", "grid") if arguments.get(key) is not None]
+    if len(sources) != 1:
+        raise HeightmapError("Zadejte právě jeden zdroj bodů: 'points', 'points_data' nebo 'grid'")
+
+    if sources[0] == "points":
+        points = np.asarray(arguments["points"], dtype=np.float64)
+        if points.size == 0:
+            points = points.reshape(0, 2)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise HeightmapError("'points' musí mít tvar [[x, z], ...]")
+        x, z = points[:, 0], points[:, 1]
+    elif sources[0] == "points_data":
+        try:
+            raw = base64.b64decode(arguments["points_data"], validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise HeightmapError(f"Neplatná base64 data: {e}") from e
+        if len(raw) % 8:
+            raise HeightmapError("'points_data' musí obsahovat dvojice float32 (x, z)")
+        points = np.frombuffer(raw, dtype="<f4").reshape(-1, 2).astype(np.float64)
+        x, z = points[:, 0], points[:, 1]
+    else:
+        grid = arguments["grid"]
+        origin = grid.get("origin", [0.0, 0.0])
+        step = grid.get("step", 1.0)
+        step_x, step_z = (step, step) if isinstance(step, (int, float)) else step
+        count_x, count_z = grid.get("count", [0, 0])
+        if count_x * count_z > MAX_POINTS:
+            raise HeightmapError(f"Mřížka má víc než {MAX_POINTS} bodů")
+        # Řádky podle z, v řádku rostoucí x (row-major jako heightmapa)
+        z, x = np.meshgrid(origin[1] + np.arange(count_z) * step_z,
+                           origin[0] + np.arange(count_x) * step_x, indexing="ij")
+        x, z = x.ravel(), z.ravel()
+
+    if x.size > MAX_POINTS:
+        raise HeightmapError(f"Příliš mnoho bodů ({x.size}, limit {MAX_POINTS})")
+    return x, z
+
+
+def encode_floats(values: "np.ndarray") -> str:
+    return base64.b64encode(np.ascontiguousarray(values, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_floats(encoded: str, columns: int = 1) -> "np.ndarray":
+    values = np.frombuffer(base64.b64decode(encoded), dtype="<f4").astype(np.float64)
+    return values.reshape(-1, columns) if columns > 1 else values
+
+
+def extract_height(response: dict) -> float:
+    """Výška z odpovědi jednobodového příkazu ('height' nebo Y z 'position', případně v 'data')."""
+    for source in (response, response.get("data")):
+        if not isinstance(source, dict):
+            continue
+        if isinstance(source.get("height"), (int, float)):
+            return float(source["height"])
+        position = source.get("position")
+        if isinstance(position, (list, tuple)) and len(position) == 3:
+            return float(position[1])
+    return math.nan
+
+
+def normals_from_samples(center, left, right, back, front, step: float) -> "np.ndarray":
+    """Normály z výšek v okolních bodech (x - step, x + step, z - step, z + step)."""
+    normals = np.stack([(left - right) / (2 * step), np.ones_like(center), (back - front) / (2 * step)], axis=-1)
+    return normals / np.linalg.norm(normals, axis=-1, keepdims=True)
+
+
+def sample_payload(count: int, heights: "np.ndarray", normals: "np.ndarray | None", encoding: str) -> dict:
+    """
+    Výsledek dotazu. 'base64' = little-endian float32 (normály po trojicích),
+    'json' = seznamy (NaN mimo terén jako null), 'auto' volí podle počtu bodů.
+    """
+    if encoding == "auto":
+        encoding = "json" if count <= JSON_POINT_LIMIT else "base64"
+    payload = {"count": count, "encoding": encoding}
+    if encoding == "base64":
+        payload["heights"] = encode_floats(heights)
+        if normals is not None:
+            payload["normals"] = encode_floats(normals)
+        return payload
+
+    def clean(values):
+        return [None if math.isnan(v) else round(v, 4) for v in values]
+
+    payload["heights"] = clean(heights.tolist())
+    if normals is not None:
+        payload["normals"] = [clean(row) for row in normals.tolist()]
+    return payload
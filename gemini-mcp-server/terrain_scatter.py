@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Procedurální rozptyl instancí na terénu přímo v MCP serveru.
+Body se generují vektorově (Poisson-disk nebo jitterovaná mřížka) v obdélníku,
+filtrují se podle výšky a sklonu z lokální heightmapy, masky a mapy hustoty
+a výsledek je blok float32 řádků pro binární rozmístění (terrain_instances).
+"""
+
+import math
+
+from heightfield import HeightField, HeightmapError, load_mask, np, require_numpy
+
+METHODS = ("poisson", "jittered_grid")
+
+# Počet kol pokusů o vložení bodu do každé prázdné buňky (Poisson-disk)
+POISSON_ATTEMPTS = 30
+
+# Offsety sousedních buněk, které mohou obsahovat bod bližší než poloměr
+_NEIGHBOURS = [(di, dj) for di in range(-2, 3) for dj in range(-2, 3) if (di, dj) != (0, 0)]
+
+
+def _region(region) -> tuple[float, float, float, float]:
+    if len(region) != 4:
+        raise HeightmapError("region musí mít tvar [x_min, z_min, x_max, z_max]")
+    x_min, z_min, x_max, z_max = map(float, region)
+    if x_max <= x_min or z_max <= z_min:
+        raise HeightmapError("region musí mít kladnou šířku i hloubku")
+    return x_min, z_min, x_max, z_max
+
+
+def jittered_grid(region, spacing: float, jitter: float, rng) -> tuple["np.ndarray", "np.ndarray"]:
+    """Jeden bod v každé buňce mřížky `spacing`, posunutý náhodně o až `jitter` velikosti buňky."""
+    x_min, z_min, x_max, z_max = region
+    cols = max(1, int((x_max - x_min) / spacing))
+    rows = max(1, int((z_max - z_min) / spacing))
+    j, i = np.meshgrid(np.arange(cols), np.arange(rows))
+    offset = 0.5 + (rng.random((2, rows, cols)) - 0.5) * jitter
+    x = x_min + (j + offset[0]) * spacing
+    z = z_min + (i + offset[1]) * spacing
+    keep = (x < x_max) & (z < z_max)
+    return x[keep], z[keep]
+
+
+def poisson_disk(region, radius: float, rng, attempts: int = POISSON_ATTEMPTS) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Poisson-disk vzorkování (žádné dva body blíž než `radius`) bez sekvenční smyčky přes body.
+
+    Pomocná mřížka má buňky o úhlopříčce `radius`, takže v buňce je nejvýš jeden bod
+    a konflikty hrozí jen se sousedy do vzdálenosti dvou buněk. Buňky se zpracují
+    v devíti fázích (řádek a sloupec modulo 3) - kandidáti ve stejné fázi jsou od sebe
+    dál než `radius`, takže se testují najednou jen proti už přijatým bodům.
+    """
+    x_min, z_min, x_max, z_max = region
+    cell = radius / math.sqrt(2)
+    cols = max(1, math.ceil((x_max - x_min) / cell))
+    rows = max(1, math.ceil((z_max - z_min) / cell))
+    # Souřadnice bodu v buňce (NaN = prázdná), okraj 2 buňky kvůli sousedům
+    px = np.full((rows + 4, cols + 4), np.nan)
+    pz = np.full((rows + 4, cols + 4), np.nan)
+    radius2 = radius * radius
+    stride = cols + 4
+    # Sousedé jako posun v plochém poli - np.take je výrazně rychlejší než 2D indexování
+    neighbour_offsets = [di * stride + dj for di, dj in _NEIGHBOURS]
+    flat_x = px.ravel()
+    flat_z = pz.ravel()
+    phases = []
+    for a in range(3):
+        for b in range(3):
+            i, j = np.meshgrid(np.arange(a, rows, 3), np.arange(b, cols, 3), indexing="ij")
+            phases.append((i.ravel(), j.ravel()))
+
+    for _ in range(attempts):
+        for index, (i, j) in enumerate(phases):
+            if not i.size:
+                continue
+            cx = x_min + (j + rng.random(i.size)) * cell
+            cz = z_min + (i + rng.random(i.size)) * cell
+            ok = (cx < x_max) & (cz < z_max)
+            flat = (i + 2) * stride + j + 2
+            for offset in neighbour_offsets:
+                nx = np.take(flat_x, flat + offset)
+                nz = np.take(flat_z, flat + offset)
+                # Porovnání s NaN (prázdný soused) je False, takže bod neblokuje
+                ok &= ~((cx - nx) ** 2 + (cz - nz) ** 2 < radius2)
+            flat_x[flat[ok]] = cx[ok]
+            flat_z[flat[ok]] = cz[ok]
+            # Obsazené buňky se v dalších kolech už nezkoušejí
+            phases[index] = (i[~ok], j[~ok])
+
+    filled = ~np.isnan(px)
+    return px[filled], pz[filled]
+
+
+def _sample_region_map(values: "np.ndarray", region, x, z) -> "np.ndarray":
+    """Hodnota masky/mapy hustoty roztažené přes celý region (nejbližší pixel)."""
+    x_min, z_min, x_max, z_max = region
+    rows, cols = values.shape
+    col = np.clip(((x - x_min) / (x_max - x_min) * cols).astype(np.intp), 0, cols - 1)
+    row = np.clip(((z - z_min) / (z_max - z_min) * rows).astype(np.intp), 0, rows - 1)
+    return values[row, col]
+
+
+def scatter(arguments: dict) -> tuple[bytes, int, dict]:
+    """
+    Vygeneruje instance podle pravidel v `arguments`.
+    Vrací (little-endian float32 bajty, počet sloupců, statistiky filtrů).
+    """
+    require_numpy()
+    region = _region(arguments.get("region", []))
+    method = arguments.get("method", "poisson")
+    if method not in METHODS:
+        raise HeightmapError(f"Neznámá metoda '{method}' (povoleno: {', '.join(METHODS)})")
+    spacing = float(arguments.get("spacing", 2.0))
+    if spacing <= 0:
+        raise HeightmapError("spacing musí být kladné")
+    area = (region[2] - region[0]) * (region[3] - region[1])
+    if area / (spacing * spacing) > 50_000_000:
+        raise HeightmapError("Příliš mnoho buněk - zvětšete spacing nebo zmenšete region")
+    rng = np.random.default_rng(arguments.get("seed"))
+
+    if method == "poisson":
+        x, z = poisson_disk(region, spacing, rng)
+    else:
+        x, z = jittered_grid(region, spacing, float(arguments.get("jitter", 1.0)), rng)
+    stats = {"candidates": int(x.size)}
+    keep = np.ones(x.size, dtype=bool)
+
+    if arguments.get("exclusion_mask"):
+        excluded = _sample_region_map(load_mask(arguments["exclusion_mask"]), region, x, z) >= 0.5
+        stats["excluded_by_mask"] = int(np.count_nonzero(keep & excluded))
+        keep &= ~excluded
+    if arguments.get("density_map"):
+        density = _sample_region_map(load_mask(arguments["density_map"]), region, x, z)
+        thinned = rng.random(x.size) >= density
+        stats["thinned_by_density"] = int(np.count_nonzero(keep & thinned))
+        keep &= ~thinned
+
+    y = np.zeros(x.size)
+    if arguments.get("heightmap_path"):
+        field = HeightField.from_arguments(arguments)
+        y = field.sample(x, z)
+        outside = np.isnan(y)
+        stats["outside_heightmap"] = int(np.count_nonzero(keep & outside))
+        keep &= ~outside
+        if arguments.get("height_range"):
+            low, high = arguments["height_range"]
+            rejected = ~((y >= low) & (y <= high))
+            stats["rejected_by_height"] = int(np.count_nonzero(keep & rejected))
+            keep &= ~rejected
+        if arguments.get("slope_range"):
+            low, high = arguments["slope_range"]
+            slope = field.slope_degrees(x, z)
+            rejected = ~((slope >= low) & (slope <= high))
+            stats["rejected_by_slope"] = int(np.count_nonzero(keep & rejected))
+            keep &= ~rejected
+    elif arguments.get("height_range") or arguments.get("slope_range"):
+        raise HeightmapError("height_range a slope_range vyžadují heightmap_path")
+
+    x, y, z = x[keep], y[keep], z[keep]
+    max_instances = arguments.get("max_instances")
+    if max_instances is not None and x.size > max_instances:
+        # Náhodný výběr zachová rovnoměrné pokrytí regionu
+        chosen = np.sort(rng.choice(x.size, size=max_instances, replace=False))
+        x, y, z = x[chosen], y[chosen], z[chosen]
+        stats["capped"] = True
+
+    columns = [x, y, z]
+    scale_range = arguments.get("scale_range")
+    if arguments.get("random_rotation", True) or scale_range:
+        columns.append(rng.uniform(0.0, 2 * math.pi, x.size) if arguments.get("random_rotation", True) else np.zeros(x.size))
+    if scale_range:
+        columns.append(rng.uniform(scale_range[0], scale_range[1], x.size))
+    rows = np.stack(columns, axis=1).astype("<f4")
+    stats["instances"] = int(rows.shape[0])
+    return rows.tobytes(), rows.shape[1], stats
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Test skript pro ověření Godot MCP serveru
+Test skript pro ověření Godot MCP serveru (interaktivní, vyžaduje běžící Godot).
+Testy bez Godot: python -m unittest discover -s tests
 """
 
 import socket
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Rámcování a párování odpovědí Godot bridge bez sítě (StreamReader plněný ručně).
+Spuštění: python -m unittest discover -s tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from godot_connection import FrameReader, GodotConnectionError, GodotConnectionPool, _Connection
+
+
+class FakeWriter:
+    """Transport, který jen zaznamenává zapsané rámce."""
+
+    def __init__(self):
+        self.written = []
+        self.closing = False
+
+    def write(self, data: bytes):
+        self.written.append(data)
+
+    async def drain(self):
+        pass
+
+    def is_closing(self) -> bool:
+        return self.closing
+
+    def close(self):
+        self.closing = True
+
+    async def wait_closed(self):
+        pass
+
+
+def frame(response: dict) -> bytes:
+    return (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class FrameReaderTest(unittest.IsolatedAsyncioTestCase):
+    async def test_frames_split_across_chunks(self):
+        reader = asyncio.StreamReader()
+        frames = FrameReader(reader, chunk_size=5)
+        data = '{"a": 1}\n\n{"název": "Strom č. 1"}\n{"b": 2}'.encode("utf-8")
+        # Hranice čtení i uprostřed vícebajtového znaku UTF-8
+        for start in range(0, len(data), 3):
+            reader.feed_data(data[start:start + 3])
+        reader.feed_eof()
+        self.assertEqual(await frames.read_frame(), b'{"a": 1}')
+        self.assertEqual(json.loads(await frames.read_frame()), {"název": "Strom č. 1"})
+        # Poslední rámec bez oddělovače se vrátí při uzavření spojení
+        self.assertEqual(await frames.read_frame(), b'{"b": 2}')
+        self.assertIsNone(await frames.read_frame())
+
+    async def test_frame_returned_before_rest_arrives(self):
+        reader = asyncio.StreamReader()
+        frames = FrameReader(reader)
+        reader.feed_data(b'{"first": true}\n{"sec')
+        self.assertEqual(await frames.read_frame(), b'{"first": true}')
+        pending = asyncio.ensure_future(frames.read_frame())
+        await asyncio.sleep(0)
+        self.assertFalse(pending.done())
+        reader.feed_data(b'ond": true}\n')
+        self.assertEqual(await pending, b'{"second": true}')
+
+
+class ConnectionMatchingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.reader = asyncio.StreamReader()
+        self.writer = FakeWriter()
+        self.conn = _Connection(self.reader, self.writer)
+        self.addAsyncCleanup(self.conn.close)
+
+    async def test_replies_matched_by_request_id(self):
+        futures = {request_id: self.conn.send(request_id, b"{}\n") for request_id in (1, 2, 3)}
+        self.reader.feed_data(frame({"status": "ok", "request_id": 3, "n": 3}) +
+                              frame({"status": "ok", "request_id": 1, "n": 1}) +
+                              frame({"status": "ok", "request_id": 2, "n": 2}))
+        results = await asyncio.gather(*futures.values())
+        self.assertEqual([result["n"] for result in results], [1, 2, 3])
+        self.assertTrue(self.conn.echoes_ids)
+
+    async def test_replies_without_id_matched_in_order(self):
+        first, second = self.conn.send(1, b"{}\n"), self.conn.send(2, b"{}\n")
+        self.reader.feed_data(frame({"status": "ok", "n": 1}) + frame({"status": "ok", "n": 2}))
+        self.assertEqual((await first)["n"], 1)
+        self.assertEqual((await second)["n"], 2)
+
+    async def test_late_reply_without_id_keeps_its_slot(self):
+        timed_out = self.conn.send(1, b"{}\n")
+        timed_out.cancel()
+        self.conn.abandon(1)
+        following = self.conn.send(2, b"{}\n")
+        self.reader.feed_data(frame({"status": "ok", "n": 1}) + frame({"status": "ok", "n": 2}))
+        self.assertEqual((await following)["n"], 2)
+
+    async def test_close_fails_pending_requests(self):
+        future = self.conn.send(1, b"{}\n")
+        self.reader.feed_eof()
+        with self.assertRaises(GodotConnectionError):
+            await future
+        self.assertFalse(self.conn.closed_after_reply)
+
+    async def test_clean_close_after_idle_reply(self):
+        future = self.conn.send(1, b"{}\n")
+        self.reader.feed_data(frame({"status": "ok", "request_id": 1}))
+        await future
+        self.reader.feed_eof()
+        await asyncio.sleep(0)
+        self.assertTrue(self.conn.closed)
+        self.assertTrue(self.conn.closed_after_reply)
+
+
+class SingleShotDetectionTest(unittest.IsolatedAsyncioTestCase):
+    async def closed_connection(self, replies: int, pending: bool) -> _Connection:
+        reader = asyncio.StreamReader()
+        conn = _Connection(reader, FakeWriter())
+        for request_id in range(1, replies + 1):
+            reader.feed_data(frame({"status": "ok", "request_id": request_id}))
+            await conn.send(request_id, b"{}\n")
+        if pending:
+            conn.send(replies + 1, b"{}\n").add_done_callback(lambda future: future.exception())
+        reader.feed_eof()
+        await asyncio.sleep(0)
+        return conn
+
+    async def test_only_clean_close_after_first_idle_reply(self):
+        cases = [((1, False), True), ((3, False), False), ((1, True), False)]
+        for (replies, pending), expected in cases:
+            with self.subTest(replies=replies, pending=pending):
+                pool = GodotConnectionPool("127.0.0.1", 0)
+                pool._note_closed(await self.closed_connection(replies, pending))
+                self.assertEqual(pool._single_shot, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Rozpočet výstupu: dělení na hranicích řádků a znaků UTF-8, pokračování přes kurzory 'out-N:offset'.
+Spuštění: python -m unittest discover -s tests
+"""
+
+import json
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_format import OutputOptions, OutputStore, _cut, compact
+
+CURSOR = re.compile(r'cursor="(out-\d+:\d+)"')
+
+
+def read_all(store: OutputStore, text: str, budget: int) -> list[str]:
+    """Části výsledku bez patiček tak, jak by je agent postupně přečetl."""
+    first, _ = store.limit(text, OutputOptions("text", budget))
+    parts = [first]
+    while (match := CURSOR.search(parts[-1])) is not None:
+        parts[-1] = parts[-1][:parts[-1].index("\n… zkráceno")]
+        parts.append(store.read(match.group(1), budget))
+    return parts
+
+
+class CutTest(unittest.TestCase):
+    def test_cut_after_newline(self):
+        data = b"line one\nline two\nline three\n"
+        self.assertEqual(_cut(data, 0, 20), len(b"line one\nline two\n"))
+
+    def test_cut_after_comma_in_single_line_json(self):
+        data = compact({"values": list(range(100))}).encode("utf-8")
+        end = _cut(data, 0, 64)
+        self.assertLessEqual(end, 64)
+        self.assertEqual(data[end - 1:end], b",")
+
+    def test_cut_never_splits_utf8_character(self):
+        data = ("č" * 50).encode("utf-8")
+        for budget in range(1, 40):
+            end = _cut(data, 0, budget)
+            data[:end].decode("utf-8")
+            self.assertLessEqual(end, budget)
+
+    def test_remaining_tail_is_returned_whole(self):
+        self.assertEqual(_cut(b"short", 0, 100), 5)
+
+
+class OutputStoreTest(unittest.TestCase):
+    def test_within_budget_is_unchanged(self):
+        store = OutputStore()
+        self.assertEqual(store.limit("✓ hotovo", OutputOptions("text", 100)), ("✓ hotovo", None))
+        self.assertEqual(store.stats()["stored"], 0)
+
+    def test_whole_result_is_not_cut(self):
+        text = "x" * 1000
+        self.assertEqual(OutputStore().limit(text, OutputOptions("text", 100, whole=True))[0], text)
+
+    def test_cursors_continue_where_previous_part_ended(self):
+        store = OutputStore()
+        text = "\n".join(f"Uzel č. {i}: Stromy a keře" for i in range(200))
+        parts = read_all(store, text, 256)
+        self.assertGreater(len(parts), 10)
+        self.assertEqual("".join(parts), text)
+        for part in parts[:-1]:
+            self.assertLessEqual(len(part.encode("utf-8")), 256)
+            self.assertTrue(part.endswith("\n"))
+
+    def test_cursor_offsets_are_byte_positions(self):
+        store = OutputStore()
+        text = "ž" * 300
+        first, _ = store.limit(text, OutputOptions("text", 101))
+        output_id, _, offset = CURSOR.search(first).group(1).rpartition(":")
+        self.assertEqual(output_id, "out-1")
+        self.assertEqual(int(offset), 100)
+        self.assertEqual(store.read(f"{output_id}:{offset}", 0), "ž" * 250)
+
+    def test_structured_result_keeps_only_outline(self):
+        store = OutputStore()
+        payload = {"status": "ok", "heights": [1.5] * 500}
+        options = OutputOptions("structured", 200)
+        text = options.emit(payload)
+        _, structured = store.limit(text, options)
+        self.assertTrue(structured["truncated"])
+        self.assertEqual(structured["outline"]["heights"], "list[500]")
+        self.assertEqual(structured["total_bytes"], len(text.encode("utf-8")))
+
+    def test_unknown_or_invalid_cursor(self):
+        store = OutputStore()
+        store.limit("a\n" * 100, OutputOptions("text", 20))
+        with self.assertRaises(KeyError):
+            store.read("out-9:0", 20)
+        with self.assertRaises(ValueError):
+            store.read("out-1:5000", 20)
+
+    def test_oldest_outputs_are_evicted(self):
+        store = OutputStore(capacity=2)
+        for _ in range(3):
+            store.limit("a\n" * 100, OutputOptions("text", 20))
+        with self.assertRaises(KeyError):
+            store.read("out-1:20", 20)
+        self.assertEqual(store.stats()["stored"], 2)
+
+
+class EmitTest(unittest.TestCase):
+    def test_error_payload_marks_call_failed(self):
+        options = OutputOptions("json")
+        self.assertEqual(json.loads(options.emit({"status": "ok"})), {"status": "ok"})
+        self.assertFalse(options.failed)
+        options.emit({"status": "error", "message": "Batch: 1/2"})
+        self.assertTrue(options.failed)
+
+
+if __name__ == "__main__":
+    unittest.main()
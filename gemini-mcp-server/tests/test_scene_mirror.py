@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Invalidace zrcadla scény po měnících příkazech (bez Godot).
+Spuštění: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scene_mirror import SceneMirror
+
+
+def run(mirror: SceneMirror, command: dict, response: dict):
+    mirror.finish(command, response, mirror.begin(command))
+
+
+class SceneMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.mirror = SceneMirror()
+        stale = {"status": "ok", "data": {"value": [0, 0, 0]}}
+        for path, prop in (("TestNode", "position"), ("TestNode", "global_position"),
+                           ("TestNode/Child", "global_position"), ("Other", "position")):
+            run(self.mirror, {"cmd": "get_prop", "path": path, "prop": prop}, stale)
+
+    def cached(self, path: str, prop: str) -> bool:
+        return self.mirror.lookup({"cmd": "get_prop", "path": path, "prop": prop}) is not None
+
+    def test_read_is_served_from_mirror(self):
+        self.assertTrue(self.cached("TestNode", "position"))
+
+    def test_set_transform_drops_coupled_properties_of_subtree(self):
+        run(self.mirror, {"cmd": "set_prop", "path": "TestNode", "prop": "transform",
+                          "val": [1, 0, 0, 0, 1, 0, 0, 0, 1, 5, 0, 0]}, {"status": "ok"})
+        self.assertFalse(self.cached("TestNode", "position"))
+        self.assertFalse(self.cached("TestNode", "global_position"))
+        self.assertFalse(self.cached("TestNode/Child", "global_position"))
+        self.assertTrue(self.cached("Other", "position"))
+
+    def test_scene_load_clears_everything(self):
+        run(self.mirror, {"cmd": "load_scene", "path": "res://other.tscn"}, {"status": "ok"})
+        self.assertFalse(self.cached("Other", "position"))
+
+
+if __name__ == "__main__":
+    unittest.main()
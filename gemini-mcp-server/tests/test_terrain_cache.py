@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Cache výšek terénu proti lokálnímu vzorkování heightmapy (bez Godot).
+Spuštění: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from heightfield import HeightField
+from terrain_cache import TerrainTileCache
+
+
+class TerrainCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.project = os.path.join(self.tmp.name, "project")
+        os.makedirs(self.project)
+        rng = np.random.default_rng(7)
+        np.save(os.path.join(self.project, "height.npy"), rng.random((40, 48), dtype=np.float32))
+        self.cache = TerrainTileCache(os.path.join(self.tmp.name, "cache"), self.project)
+        self.cache.configure("/root/Terrain3D", region_size=16)
+
+    def import_command(self, position):
+        return {"cmd": "terrain_import_heightmap", "node_path": "/root/Terrain3D",
+                "file_path": "res://height.npy", "min_height": 10.0, "max_height": 50.0, "position": position}
+
+    def test_import_ignores_position_y_like_heightfield(self):
+        # Terrain3DData.import_images bere z global_position jen X/Z: výška = hodnota * scale + offset
+        command = self.import_command([8.0, 25.0, 4.0])
+        self.cache.finish(command, {"status": "ok"})
+        field = HeightField.from_file(os.path.join(self.project, "height.npy"), 10.0, 50.0, command["position"])
+
+        for x, z in [(8.0, 4.0), (20.5, 17.25), (33.0, 30.75), (54.9, 42.6)]:
+            cached = self.cache.lookup({"cmd": "terrain_get_height", "node_path": "/root/Terrain3D", "x": x, "z": z})
+            self.assertIsNotNone(cached)
+            self.assertAlmostEqual(cached["data"]["height"], float(field.sample(x, z)), places=3)
+
+        heights, _ = self.cache.sample("/root/Terrain3D", [12.0, 40.0], [9.0, 21.0])
+        np.testing.assert_allclose(heights, field.sample([12.0, 40.0], [9.0, 21.0]), rtol=1e-5)
+
+    def test_position_y_does_not_change_heights(self):
+        low = HeightField.from_file(os.path.join(self.project, "height.npy"), 10.0, 50.0, [0.0, 0.0, 0.0])
+        high = HeightField.from_file(os.path.join(self.project, "height.npy"), 10.0, 50.0, [0.0, 100.0, 0.0])
+        np.testing.assert_array_equal(low.sample([3.5, 17.0], [2.0, 30.5]), high.sample([3.5, 17.0], [2.0, 30.5]))
+
+    def test_scene_change_drops_cached_heights(self):
+        self.cache.finish(self.import_command([0.0, 0.0, 0.0]), {"status": "ok"})
+        query = {"cmd": "terrain_get_height", "node_path": "/root/Terrain3D", "x": 5.0, "z": 5.0}
+        self.assertIsNotNone(self.cache.lookup(query))
+        self.cache.finish({"cmd": "load_scene", "path": "res://other.tscn"}, {"status": "ok"})
+        self.assertIsNone(self.cache.lookup(query))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Plánování inkrementálního importu heightmapy po regionech (bez Godot).
+Spuštění: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from terrain_cache import TerrainTileCache
+from terrain_import import RegionImportLog
+
+
+class RegionPlanTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.project = os.path.join(tmp.name, "project")
+        os.makedirs(self.project)
+        cache = TerrainTileCache(os.path.join(tmp.name, "cache"), self.project)
+        cache.configure("/root/Terrain3D", region_size=16)
+        self.log = RegionImportLog(cache)
+        self.heights = np.random.default_rng(3).integers(0, 65535, size=(40, 40), dtype=np.uint16)
+        self.write()
+
+    def write(self):
+        self.heights.astype("<u2").tofile(os.path.join(self.project, "height.r16"))
+
+    def command(self, **changes) -> dict:
+        command = {"cmd": "terrain_import_heightmap", "node_path": "/root/Terrain3D",
+                   "file_path": "res://height.r16", "min_height": 0.0, "max_height": 100.0,
+                   "position": [0, 0, 0], "r16_dim": [40, 40]}
+        return {**command, **changes}
+
+    def imported(self, command: dict):
+        plan = self.log.plan(command)
+        self.log.record(plan, plan.changed)
+        return plan
+
+    def test_first_import_sends_every_region(self):
+        plan = self.log.plan(self.command())
+        # 40 vertexů v regionech po 16: tři sloupce a tři řádky regionů
+        self.assertEqual(len(plan.regions), 9)
+        self.assertEqual(len(plan.changed), 9)
+
+    def test_unchanged_source_is_skipped(self):
+        self.imported(self.command())
+        plan = self.log.plan(self.command())
+        self.assertEqual(plan.changed, [])
+        self.assertEqual(plan.skipped, 9)
+
+    def test_only_edited_region_changes(self):
+        self.imported(self.command())
+        self.heights[20, 20] ^= 0xFFFF
+        self.write()
+        plan = self.log.plan(self.command())
+        self.assertEqual([(r.rx, r.rz) for r in plan.changed], [(1, 1)])
+
+    def test_height_mapping_changes_every_region(self):
+        self.imported(self.command())
+        self.assertEqual(len(self.log.plan(self.command(max_height=200.0)).changed), 9)
+
+    def test_position_y_does_not_change_regions(self):
+        self.imported(self.command())
+        self.assertEqual(self.log.plan(self.command(position=[0, 50, 0])).changed, [])
+
+    def test_shifted_source_changes_block_placement(self):
+        self.imported(self.command())
+        plan = self.log.plan(self.command(position=[8, 0, 0]))
+        self.assertEqual(len(plan.regions), 9)
+        self.assertEqual(len(plan.changed), 9)
+
+    def test_failed_regions_are_sent_again(self):
+        plan = self.log.plan(self.command())
+        self.log.record(plan, plan.changed[:4])
+        self.assertEqual(len(self.log.plan(self.command()).changed), 5)
+
+    def test_region_command_places_block(self):
+        plan = self.log.plan(self.command(position=[-8, 0, 4]))
+        region = plan.regions[-1]
+        command = self.log.region_command(plan, region)
+        rows, cols = region.rows.stop - region.rows.start, region.cols.stop - region.cols.start
+        self.assertEqual(command["r16_dim"], [cols, rows])
+        self.assertEqual(command["position"], [-8.0 + region.cols.start, 0, 4.0 + region.rows.start])
+        block = np.fromfile(command["file_path"], dtype="<u2").reshape(rows, cols)
+        np.testing.assert_array_equal(block, self.heights[region.rows, region.cols])
+
+    def test_scene_change_forgets_manifest(self):
+        self.imported(self.command())
+        self.log.finish({"cmd": "load_scene", "path": "res://other.tscn"})
+        self.assertEqual(len(self.log.plan(self.command()).changed), 9)
+
+
+if __name__ == "__main__":
+    unittest.main()